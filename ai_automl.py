@@ -1,53 +1,25 @@
-import pandas as pd
-import ta
-import random
+from trading.market_store import load_market_frame
+from trading.param_search import random_search
 
-def optimize_strategy(symbol="BTCUSDT", data_file="market_data_BTCUSDT.csv", iterations=50):
+def optimize_strategy(symbol="BTCUSDT", data_file=None, iterations=50, workers=None, seed=None):
     """AI AutoML – optymalizacja strategii tradingowej"""
     
-    df = pd.read_csv(data_file)
-    if df.empty or "close" not in df:
+    df = load_market_frame(symbol, columns=["close"], data_file=data_file)
+    if df is None or df.empty or "close" not in df:
         print(f"🚨 Brak poprawnych danych dla {symbol}!")
         return
 
-    best_config = None
-    best_profit = -float("inf")
-
-    for _ in range(iterations):
-        # Losowanie parametrów strategii
-        ema_short = random.randint(5, 15)
-        ema_long = random.randint(20, 50)
-        macd_short = random.randint(10, 20)
-        macd_long = random.randint(26, 40)
-        rsi_period = random.randint(10, 20)
-
-        # Obliczenie wskaźników technicznych
-        df["EMA_Short"] = ta.trend.EMAIndicator(df["close"], window=ema_short).ema_indicator()
-        df["EMA_Long"] = ta.trend.EMAIndicator(df["close"], window=ema_long).ema_indicator()
-        df["MACD"] = ta.trend.MACD(df["close"], window_slow=macd_long, window_fast=macd_short).macd()
-        df["RSI"] = ta.momentum.RSIIndicator(df["close"], window=rsi_period).rsi()
-
-        balance = 1000
-        position = 0
-
-        for i in range(1, len(df)):
-            price = df["close"].iloc[i]
-            if position == 0 and df["EMA_Short"].iloc[i] > df["EMA_Long"].iloc[i] and df["MACD"].iloc[i] > 0 and df["RSI"].iloc[i] < 70:
-                position = balance / price
-                balance -= position * price
-            elif position > 0 and df["EMA_Short"].iloc[i] < df["EMA_Long"].iloc[i] and df["MACD"].iloc[i] < 0 and df["RSI"].iloc[i] > 30:
-                balance += position * price
-                position = 0
-
-        final_profit = balance + (position * df["close"].iloc[-1] if position > 0 else 0)
-
-        if final_profit > best_profit:
-            best_profit = final_profit
-            best_config = (ema_short, ema_long, macd_short, macd_long, rsi_period)
+    # Próby liczone równolegle na wszystkich rdzeniach, wskaźniki współdzielone między próbami.
+    report = random_search(df["close"].to_numpy(dtype=float), iterations=iterations, workers=workers, seed=seed)
+    best = report.best
+    best_config = best.params.as_tuple()
+    best_profit = best.final_balance
 
     print(f"🏆 Najlepsza konfiguracja dla {symbol}: EMA ({best_config[0]}/{best_config[1]}), MACD ({best_config[2]}/{best_config[3]}), RSI ({best_config[4]})")
     print(f"📈 Zysk: {best_profit:.2f} USDT")
+    print(f"⏱️ {len(report.results)} prób w {report.elapsed_seconds:.2f}s ({report.trials_per_second:.0f} prób/s, procesy: {report.workers})")
     return best_config
 
-# Testowanie optymalizacji na danych BTCUSDT
-optimize_strategy("BTCUSDT")
+if __name__ == "__main__":
+    # Testowanie optymalizacji na danych BTCUSDT
+    optimize_strategy("BTCUSDT")
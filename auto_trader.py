@@ -1,16 +1,45 @@
 import json
 import os
 import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from decimal import Decimal, ROUND_DOWN
+from threading import Lock
+from typing import Dict, Optional
 
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
 
-from trading.signal_engine import build_signal
-from trading.strategy_engine import RiskConfig, build_trade_plan
+from trading.account_state import AccountState, UserDataStream
+from trading.exchange_info import SymbolFilters, exchange_info, quantize_to_step
+from trading.indicator_engine import IndicatorEngine
+from trading.market_stream import MarketStream
+from trading.rate_limiter import (
+    ACCOUNT_WEIGHT,
+    ORDER_WEIGHT,
+    PRIORITY_ORDER,
+    PRIORITY_RESERVE,
+    PRIORITY_TRADING,
+    endpoint_weight,
+    rate_limiter,
+)
+from trading.scheduler import CandleScheduler, ServerClock
+from trading.signal_engine import SignalResult, build_signal, kline_cache
+from trading.strategy_engine import RiskConfig, TradePlan, build_trade_plan
 
 CONFIG_FILE = "config.json"
 
+# Szacunkowa waga REST analizy jednego symbolu: świece + order book.
+# Saldo konta to jeden snapshot na pętlę (ACCOUNT_WEIGHT).
+KLINES_LIMIT = 200
+KLINES_WEIGHT = endpoint_weight("/api/v3/klines")
+DEPTH_WEIGHT = endpoint_weight("/api/v3/depth", {"limit": 100})
+
+# Czas (monotonic) ostatniej analizy symbolu – przy ograniczonym budżecie
+# wagi najpierw analizowane są symbole, które czekają najdłużej.
+_last_evaluated: Dict[str, float] = {}
+
 
 def load_config():
     if not os.path.exists(CONFIG_FILE):
@@ -27,52 +56,220 @@ def get_client(config):
     return Client(api_key, api_secret)
 
 
+# python-binance trzyma ostatnią odpowiedź w `client.response`, więc wywołanie
+# i odczyt jej nagłówków idą pod jedną blokadą klienta – przy CONCURRENCY > 1
+# wątki nie czytają wtedy cudzych odpowiedzi.
+_response_locks = weakref.WeakKeyDictionary()
+_response_locks_guard = Lock()
+
+
+def _response_lock(client):
+    with _response_locks_guard:
+        lock = _response_locks.get(client)
+        if lock is None:
+            lock = _response_locks[client] = Lock()
+        return lock
+
+
+def call_exchange(client, weight, priority, method, *args, orders=0, **kwargs):
+    """Wywołuje metodę klienta python-binance przez wspólny limiter wagi."""
+    rate_limiter.acquire(weight, priority, orders=orders)
+    with _response_lock(client):
+        try:
+            result = method(*args, **kwargs)
+        except BinanceAPIException as exc:
+            # Nagłówki z odpowiedzi błędu – `client.response` może być z poprzedniego wywołania.
+            rate_limiter.observe_response(exc.status_code, getattr(exc.response, "headers", None))
+            raise
+        response = getattr(client, "response", None)
+    if response is not None:
+        rate_limiter.observe_response(200, response.headers)
+    return result
+
+
 def get_symbol_filters(client, symbol):
-    info = client.get_symbol_info(symbol)
-    if not info:
-        raise ValueError(f"Nie znaleziono informacji o symbolu {symbol}.")
-    lot_size = next((f for f in info["filters"] if f["filterType"] == "LOT_SIZE"), None)
-    if not lot_size:
-        raise ValueError(f"Brak filtra LOT_SIZE dla {symbol}.")
-    return Decimal(lot_size["stepSize"]), Decimal(lot_size["minQty"])
+    filters = exchange_info.get(symbol)
+    return filters.step_size, filters.min_qty
 
 
 def quantize_qty(quantity, step_size):
-    return quantity.quantize(step_size, rounding=ROUND_DOWN)
+    return quantize_to_step(quantity, step_size, ROUND_DOWN)
 
 
 def get_last_price(client, symbol):
-    ticker = client.get_symbol_ticker(symbol=symbol)
+    ticker = call_exchange(
+        client,
+        endpoint_weight("/api/v3/ticker/price", {"symbol": symbol}),
+        PRIORITY_TRADING,
+        client.get_symbol_ticker,
+        symbol=symbol,
+    )
     return Decimal(ticker["price"])
 
 
-def get_available_quote_balance(client, quote_asset):
-    balance = client.get_asset_balance(asset=quote_asset)
+def get_available_quote_balance(client, quote_asset, priority=PRIORITY_TRADING):
+    balance = call_exchange(client, ACCOUNT_WEIGHT, priority, client.get_asset_balance, asset=quote_asset)
     if not balance:
         return Decimal("0")
     return Decimal(balance["free"])
 
 
+def load_account_snapshot(client, priority=PRIORITY_TRADING):
+    return call_exchange(client, ACCOUNT_WEIGHT, priority, client.get_account)
+
+
 def place_order(client, symbol, side, quantity, dry_run):
     if dry_run:
         return {"dry_run": True, "symbol": symbol, "side": side, "quantity": str(quantity)}
     if side == "BUY":
-        return client.order_market_buy(symbol=symbol, quantity=str(quantity))
+        return call_exchange(
+            client, ORDER_WEIGHT, PRIORITY_ORDER, client.order_market_buy, symbol=symbol, quantity=str(quantity), orders=1
+        )
     if side == "SELL":
-        return client.order_market_sell(symbol=symbol, quantity=str(quantity))
+        return call_exchange(
+            client, ORDER_WEIGHT, PRIORITY_ORDER, client.order_market_sell, symbol=symbol, quantity=str(quantity), orders=1
+        )
     raise ValueError("Nieobsługiwany typ zlecenia.")
 
 
-def run_once(client, config):
+def submit_order(client, symbol, side, quantity, dry_run):
+    try:
+        return place_order(client, symbol, side, quantity, dry_run)
+    except BinanceAPIException as exc:
+        # Odrzucenie przez filtr (-1013) oznacza nieaktualne reguły symbolu.
+        exchange_info.handle_order_error(exc)
+        raise
+
+
+@dataclass
+class SymbolEvaluation:
+    symbol: str
+    quote_asset: str
+    available_quote: Decimal
+    signal: Optional[SignalResult] = None
+    plan: Optional[TradePlan] = None
+    filters: Optional[SymbolFilters] = None
+    last_price: Optional[Decimal] = None
+    error: Optional[Exception] = None
+
+    @property
+    def action(self):
+        return self.plan.action if self.plan else self.signal.action
+
+
+@dataclass
+class LoopReport:
+    symbols: int
+    concurrency: int
+    elapsed_seconds: float
+    orders: int = 0
+
+
+_account_locks = {}
+_account_locks_guard = Lock()
+
+
+def _account_lock(client):
+    key = getattr(client, "API_KEY", None) or id(client)
+    with _account_locks_guard:
+        if key not in _account_locks:
+            _account_locks[key] = Lock()
+        return _account_locks[key]
+
+
+def _live_engine(source, symbol, interval):
+    # Strumień z IndicatorEngine ma wskaźniki aktualizowane przy każdej
+    # świecy – wtedy nie przeliczamy SMA/RSI/ATR z pełnej listy świec.
+    indicator_engine = getattr(source, "indicator_engine", None)
+    return indicator_engine(symbol, interval) if indicator_engine is not None else None
+
+
+def evaluate_symbol(client, symbol, trading_rules, risk, use_trade_plan, source=None, account=None):
+    interval = trading_rules.get("INTERVAL", "1m")
+    quote_asset = symbol[-4:] if symbol.endswith("USDT") else symbol[-3:]
+    evaluation = SymbolEvaluation(symbol=symbol, quote_asset=quote_asset, available_quote=Decimal("0"))
+    try:
+        engine = _live_engine(source, symbol, interval)
+        if engine is not None:
+            imbalance = source.orderbook_imbalance(symbol)
+            evaluation.signal = engine.build_signal(symbol, interval, imbalance)
+        else:
+            evaluation.signal = build_signal(symbol, interval, trading_rules, source=source)
+        if account is not None:
+            evaluation.available_quote = account.free(quote_asset)
+        else:
+            evaluation.available_quote = get_available_quote_balance(client, quote_asset)
+        if use_trade_plan and engine is not None:
+            evaluation.plan = engine.build_trade_plan(symbol, interval, imbalance, risk, evaluation.available_quote)
+        elif use_trade_plan:
+            evaluation.plan = build_trade_plan(
+                symbol,
+                interval,
+                trading_rules,
+                risk,
+                evaluation.available_quote,
+                signal=evaluation.signal,
+                source=source,
+            )
+        if evaluation.action != "HOLD":
+            evaluation.filters = exchange_info.get(symbol)
+            evaluation.last_price = get_last_price(client, symbol)
+    except Exception as exc:
+        evaluation.error = exc
+    return evaluation
+
+
+def evaluation_weight(symbol, interval, source=None):
+    """Waga REST analizy symbolu – świece i order book obsłużone ze strumienia lub cache są darmowe."""
+    weight = 0
+    serves_klines = getattr(source, "serves_klines", None)
+    if not (serves_klines and serves_klines(symbol, interval, KLINES_LIMIT)) and not kline_cache.cached(
+        symbol, interval, KLINES_LIMIT
+    ):
+        weight += KLINES_WEIGHT
+    serves_depth = getattr(source, "serves_depth", None)
+    if not (serves_depth and serves_depth(symbol)):
+        weight += DEPTH_WEIGHT
+    return weight
+
+
+def select_within_budget(symbols, weights, usable):
+    """Symbole mieszczące się w budżecie, od najdłużej czekających; wynik w kolejności `symbols`."""
+    chosen = set()
+    spent = 0
+    for symbol in sorted(symbols, key=lambda symbol: _last_evaluated.get(symbol, float("-inf"))):
+        if spent + weights[symbol] <= usable:
+            chosen.add(symbol)
+            spent += weights[symbol]
+    return [symbol for symbol in symbols if symbol in chosen]
+
+
+def build_scheduler(config, server_clock=None):
+    """Harmonogram wyrównany do zamknięcia świec (AUTO_TRADING.ALIGN_TO_CANDLE) albo None."""
+    auto_trading = config.get("AUTO_TRADING", {})
+    if not auto_trading.get("ALIGN_TO_CANDLE", False):
+        return None
+    return CandleScheduler.for_symbols(
+        auto_trading.get("SYMBOLS", []),
+        config.get("TRADING_RULES", {}).get("INTERVAL", "1m"),
+        jitter_seconds=float(auto_trading.get("JITTER_SECONDS", 0)),
+        server_clock=server_clock,
+    )
+
+
+def run_once(client, config, source=None, account=None, symbols=None):
+    started = time.perf_counter()
     trading_rules = config.get("TRADING_RULES", {})
     auto_trading = config.get("AUTO_TRADING", {})
     risk_cfg = config.get("RISK_MANAGEMENT", {})
 
-    symbols = auto_trading.get("SYMBOLS", [])
+    if symbols is None:
+        symbols = auto_trading.get("SYMBOLS", [])
     order_size_usdt = Decimal(str(auto_trading.get("ORDER_SIZE_USDT", 0)))
     max_slippage_pct = Decimal(str(auto_trading.get("MAX_SLIPPAGE_PCT", 0)))
     dry_run = bool(auto_trading.get("DRY_RUN", True))
     use_trade_plan = bool(auto_trading.get("USE_TRADE_PLAN", False))
+    concurrency = max(int(auto_trading.get("CONCURRENCY", 1)), 1)
 
     if not symbols:
         raise ValueError("AUTO_TRADING.SYMBOLS jest puste.")
@@ -86,84 +283,202 @@ def run_once(client, config):
         min_signal_score=int(risk_cfg.get("MIN_SIGNAL_SCORE", 2)),
     )
 
+    # Przy wyczerpanym budżecie wagi analizujemy tylko tyle symboli, ile się
+    # zmieści, zamiast czekać w kolejce limitera (lub ryzykować ban).
+    # Symbole obsłużone ze strumienia/cache nic nie kosztują, a pozostałe
+    # są wybierane od najdłużej czekających, żeby żaden nie był pomijany
+    # w każdej pętli.
+    budget = rate_limiter.budget()
+    usable = budget.available - budget.capacity * PRIORITY_RESERVE[PRIORITY_TRADING] - ACCOUNT_WEIGHT
+    interval = trading_rules.get("INTERVAL", "1m")
+    weights = {symbol: evaluation_weight(symbol, interval, source) for symbol in symbols}
+    selected = select_within_budget(symbols, weights, usable) if budget.paused_for == 0 else []
+    if len(selected) < len(symbols):
+        print(
+            f"⚠️ Budżet wagi API {budget.available:.0f}/{budget.capacity:.0f} "
+            f"(pauza {budget.paused_for:.0f}s) – analiza {len(selected)} z {len(symbols)} symboli."
+        )
+        symbols = selected
+    now = time.monotonic()
     for symbol in symbols:
-        signal = build_signal(symbol, trading_rules.get("INTERVAL", "1m"), trading_rules)
-        plan = None
-        quote_asset = symbol[-4:] if symbol.endswith("USDT") else symbol[-3:]
-        available_quote = get_available_quote_balance(client, quote_asset)
-        if use_trade_plan:
-            plan = build_trade_plan(
-                symbol,
-                trading_rules.get("INTERVAL", "1m"),
-                trading_rules,
-                risk,
-                available_quote,
-            )
-            print(
-                f"[{symbol}] plan={plan.action} score={plan.score} order_usdt={plan.order_size_usdt} "
-                f"sl={plan.stop_loss} tp={plan.take_profit} reasons={plan.reasons}"
-            )
-        else:
-            print(
-                f"[{symbol}] action={signal.action} score={signal.score} price={signal.last_price} reasons={signal.reasons}"
-            )
+        _last_evaluated[symbol] = now
 
-        action = plan.action if plan else signal.action
-        if action == "HOLD":
-            continue
-
-        step_size, min_qty = get_symbol_filters(client, symbol)
-        last_price = get_last_price(client, symbol)
-
-        if action == "BUY":
-            if plan and plan.order_size_usdt > 0:
-                effective_order_size = plan.order_size_usdt
+    # Jeden snapshot sald na pętlę; przy działającym strumieniu user data
+    # salda są już aktualne i zapytanie jest zbędne.
+    if account is None:
+        account = AccountState()
+    if dry_run:
+        # Zlecenia DRY_RUN nie zmieniają sald na giełdzie, więc żadne
+        # zdarzenie strumienia nie zwolni ich rezerwacji – obowiązują tylko
+        # w obrębie jednej pętli.
+        account.clear_reservations()
+    if symbols and not account.live:
+        account.load_snapshot(load_account_snapshot(client))
+
+    # Faza 1: pobranie danych i scoring – równolegle, gdy CONCURRENCY > 1.
+    if concurrency > 1 and symbols:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(symbols))) as executor:
+            evaluations = list(
+                executor.map(
+                    lambda symbol: evaluate_symbol(
+                        client, symbol, trading_rules, risk, use_trade_plan, source, account
+                    ),
+                    symbols,
+                )
+            )
+    else:
+        evaluations = (
+            evaluate_symbol(client, symbol, trading_rules, risk, use_trade_plan, source, account)
+            for symbol in symbols
+        )
+
+    # Faza 2: składanie zleceń – zawsze sekwencyjnie i pod blokadą konta,
+    # w kolejności AUTO_TRADING.SYMBOLS. Każde zlecenie rezerwuje środki
+    # w AccountState, więc kolejne symbole widzą pomniejszone saldo.
+    orders = 0
+    with _account_lock(client):
+        for evaluation in evaluations:
+            if evaluation.error is not None:
+                raise evaluation.error
+            symbol = evaluation.symbol
+            signal = evaluation.signal
+            plan = evaluation.plan
+            quote_asset = evaluation.quote_asset
+            available_quote = account.free(quote_asset)
+            if plan:
+                print(
+                    f"[{symbol}] plan={plan.action} score={plan.score} order_usdt={plan.order_size_usdt} "
+                    f"sl={plan.stop_loss} tp={plan.take_profit} reasons={plan.reasons}"
+                )
             else:
-                effective_order_size = order_size_usdt
-            if effective_order_size <= 0:
-                raise ValueError("AUTO_TRADING.ORDER_SIZE_USDT musi być > 0.")
-            if available_quote < effective_order_size:
-                print(f"[{symbol}] Brak wystarczających środków: {available_quote} {quote_asset}")
-                continue
-
-            slippage_price = last_price * (Decimal("1") + max_slippage_pct / Decimal("100"))
-            quantity = effective_order_size / slippage_price
-            quantity = quantize_qty(quantity, step_size)
-
-            if quantity < min_qty:
-                print(f"[{symbol}] Ilość poniżej minQty: {quantity} < {min_qty}")
-                continue
-
-            result = place_order(client, symbol, "BUY", quantity, dry_run)
-            print(f"[{symbol}] BUY: {result}")
+                print(
+                    f"[{symbol}] action={signal.action} score={signal.score} price={signal.last_price} reasons={signal.reasons}"
+                )
 
-        elif action == "SELL":
-            base_asset = symbol.replace(quote_asset, "")
-            balance = client.get_asset_balance(asset=base_asset)
-            available_base = Decimal(balance["free"]) if balance else Decimal("0")
-            quantity = quantize_qty(available_base, step_size)
-
-            if quantity < min_qty:
-                print(f"[{symbol}] Brak wolumenu do sprzedaży: {quantity} < {min_qty}")
+            action = evaluation.action
+            if action == "HOLD":
                 continue
 
-            result = place_order(client, symbol, "SELL", quantity, dry_run)
-            print(f"[{symbol}] SELL: {result}")
+            filters = evaluation.filters
+            min_qty = filters.min_qty
+            last_price = evaluation.last_price
+
+            if action == "BUY":
+                if plan and plan.order_size_usdt > 0:
+                    effective_order_size = plan.order_size_usdt
+                else:
+                    effective_order_size = order_size_usdt
+                if effective_order_size <= 0:
+                    raise ValueError("AUTO_TRADING.ORDER_SIZE_USDT musi być > 0.")
+                if available_quote < effective_order_size:
+                    print(f"[{symbol}] Brak wystarczających środków: {available_quote} {quote_asset}")
+                    continue
+
+                slippage_price = last_price * (Decimal("1") + max_slippage_pct / Decimal("100"))
+                quantity = filters.quantize_qty(effective_order_size / slippage_price)
+
+                if quantity < min_qty:
+                    print(f"[{symbol}] Ilość poniżej minQty: {quantity} < {min_qty}")
+                    continue
+                if not filters.meets_notional(quantity, last_price):
+                    print(f"[{symbol}] Wartość zlecenia poniżej minNotional: {quantity * last_price} < {filters.min_notional}")
+                    continue
+
+                submitted_ms = account.clock()
+                result = submit_order(client, symbol, "BUY", quantity, dry_run)
+                account.reserve(quote_asset, effective_order_size, reserved_ms=submitted_ms)
+                orders += 1
+                print(f"[{symbol}] BUY: {result}")
+
+            elif action == "SELL":
+                base_asset = symbol.replace(quote_asset, "")
+                available_base = account.free(base_asset)
+                quantity = filters.quantize_qty(available_base)
+
+                if quantity < min_qty:
+                    print(f"[{symbol}] Brak wolumenu do sprzedaży: {quantity} < {min_qty}")
+                    continue
+                if not filters.meets_notional(quantity, last_price):
+                    print(f"[{symbol}] Wartość sprzedaży poniżej minNotional: {quantity * last_price} < {filters.min_notional}")
+                    continue
+
+                submitted_ms = account.clock()
+                result = submit_order(client, symbol, "SELL", quantity, dry_run)
+                account.reserve(base_asset, quantity, reserved_ms=submitted_ms)
+                orders += 1
+                print(f"[{symbol}] SELL: {result}")
+
+    cache_stats = kline_cache.stats()
+    print(
+        f"[cache] klines hits={cache_stats.hits} misses={cache_stats.misses} "
+        f"hit_ratio={cache_stats.hit_ratio:.0%}"
+    )
+    report = LoopReport(
+        symbols=len(symbols),
+        concurrency=concurrency,
+        elapsed_seconds=time.perf_counter() - started,
+        orders=orders,
+    )
+    budget = rate_limiter.budget()
+    print(
+        f"[loop] symbols={report.symbols} concurrency={report.concurrency} "
+        f"orders={report.orders} time={report.elapsed_seconds:.2f}s "
+        f"weight_budget={budget.available:.0f}/{budget.capacity:.0f}"
+    )
+    return report
 
 
 def main():
     config = load_config()
     client = get_client(config)
-    loop_seconds = int(config.get("AUTO_TRADING", {}).get("LOOP_SECONDS", 60))
+    auto_trading = config.get("AUTO_TRADING", {})
+    loop_seconds = int(auto_trading.get("LOOP_SECONDS", 60))
+
+    # Jeden zegar serwera dla harmonogramu i rezerwacji sald (porównywanych
+    # z czasem zdarzeń giełdy).
+    server_clock = ServerClock()
+    account = AccountState(clock=server_clock.now_ms)
+    if auto_trading.get("USE_USER_STREAM", False):
+        UserDataStream(client, account, lambda: load_account_snapshot(client)).start()
+
+    stream = None
+    if auto_trading.get("USE_STREAMS", False):
+        trading_rules = config.get("TRADING_RULES", {})
+        # Wskaźniki aktualizowane przyrostowo przy każdej świecy ze strumienia;
+        # okres ATR musi zgadzać się z RiskConfig budowanym w run_once.
+        engine = IndicatorEngine(
+            trading_rules,
+            atr_period=int(config.get("RISK_MANAGEMENT", {}).get("ATR_PERIOD", 14)),
+        )
+        stream = MarketStream(
+            auto_trading.get("SYMBOLS", []),
+            trading_rules.get("INTERVAL", "1m"),
+            engine=engine,
+        ).start()
+
+    scheduler = build_scheduler(config, server_clock)
+    # Wpisy cache świec wygasają w chwili zamknięcia świecy w czasie giełdy –
+    # ten sam zegar co harmonogram, żeby wybudzenie po zamknięciu nie
+    # dostało z cache listy kończącej się poprzednią świecą.
+    kline_cache.clock = server_clock.time
 
     while True:
+        due = scheduler.wait() if scheduler is not None else None
         try:
-            run_once(client, config)
+            report = run_once(client, config, source=stream, account=account, symbols=due)
+            if scheduler is not None:
+                print(f"[schedule] {scheduler.format_stats()}")
+            elif report.elapsed_seconds > loop_seconds:
+                print(
+                    f"⚠️ Pętla trwała {report.elapsed_seconds:.2f}s > LOOP_SECONDS={loop_seconds}s. "
+                    "Rozważ zwiększenie AUTO_TRADING.CONCURRENCY."
+                )
         except BinanceAPIException as exc:
             print(f"Błąd Binance API: {exc}")
         except Exception as exc:
             print(f"Błąd: {exc}")
-        time.sleep(loop_seconds)
+        if scheduler is None:
+            time.sleep(loop_seconds)
 
 
 if __name__ == "__main__":
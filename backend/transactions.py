@@ -1,23 +1,235 @@
+import atexit
+import os
+import queue
 import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
 import config
 
-def init_db():
-    conn = sqlite3.connect(config.DATABASE_PATH)
-    c = conn.cursor()
-    c.execute("""CREATE TABLE IF NOT EXISTS transactions (
-                  id INTEGER PRIMARY KEY, 
-                  symbol TEXT, 
-                  side TEXT, 
-                  quantity REAL, 
-                  price REAL, 
-                  timestamp TEXT)""")
-    conn.commit()
-    conn.close()
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.2  # s
+RETRY_DELAY = 0.5  # s
+SHUTDOWN_RETRIES = 5
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS transactions (
+                  id INTEGER PRIMARY KEY,
+                  symbol TEXT,
+                  side TEXT,
+                  quantity REAL,
+                  price REAL,
+                  timestamp TEXT)""",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_symbol_timestamp ON transactions (symbol, timestamp)",
+)
+INSERT_SQL = "INSERT INTO transactions (symbol, side, quantity, price, timestamp) VALUES (?, ?, ?, ?, ?)"
+
+Row = Tuple[str, str, float, float, str]
+
+_STOP = object()
+
+# Błędy danych wiersza (np. typ, którego sqlite3 nie zwiąże) – ponowienie
+# całej paczki nic nie da, więc taki wiersz jest odkładany na bok.
+ROW_ERRORS = (sqlite3.InterfaceError, sqlite3.ProgrammingError, sqlite3.IntegrityError)
+
+
+def make_row(symbol, side, quantity, price, timestamp) -> Row:
+    """Normalizuje transakcję do typów SQLite (np. `Decimal` -> float).
+
+    Niepoprawne wartości zgłaszają `ValueError`/`TypeError` od razu
+    wołającemu, a nie dopiero w wątku zapisującym.
+    """
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    elif not isinstance(timestamp, (str, int, float)):
+        raise TypeError(f"Nieobsługiwany typ czasu transakcji: {type(timestamp).__name__}")
+    return str(symbol), str(side), float(quantity), float(price), str(timestamp)
+
+
+def connect(path: Optional[str] = None, synchronous: str = "FULL") -> sqlite3.Connection:
+    """Połączenie w trybie WAL ze schematem i indeksem (symbol, timestamp)."""
+    path = path or config.DATABASE_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    with conn:
+        for statement in SCHEMA:
+            conn.execute(statement)
+    return conn
+
+
+class TransactionJournal:
+    """Zapis transakcji przez jedno połączenie i wątek w tle.
+
+    `add()` tylko wstawia wiersz do kolejki; wątek zapisujący zbiera wiersze
+    i zapisuje je jednym `executemany` w jednej transakcji SQLite, gdy
+    uzbiera się `batch_size` wierszy albo minie `flush_interval` od
+    pierwszego niezapisanego wiersza. Przy WAL i `synchronous=FULL` każda
+    paczka to jeden fsync zamiast jednego na transakcję.
+
+    Gwarancje trwałości: po powrocie z `flush()` wszystkie wcześniej dodane
+    wiersze są zatwierdzone; `close()` (wołane też przy wyjściu z
+    interpretera przez `atexit`) zapisuje resztę kolejki i robi checkpoint
+    WAL. Nieudana paczka (np. zablokowana baza) zostaje w pamięci i jest
+    ponawiana (przy zamykaniu najwyżej `SHUTDOWN_RETRIES` razy). Gdy baza
+    odrzuca dane wiersza, paczka jest zapisywana wiersz po wierszu, a błędne
+    wiersze trafiają do `rejected` zamiast blokować kolejne.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        synchronous: str = "FULL",
+    ):
+        self.path = path
+        self.batch_size = max(int(batch_size), 1)
+        self.flush_interval = float(flush_interval)
+        self.synchronous = synchronous
+        self.written = 0
+        self.batches = 0
+        self.last_error: Optional[Exception] = None
+        self.rejected: List[Tuple[Row, Exception]] = []
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            conn = connect(self.path, self.synchronous)
+            self._thread = threading.Thread(target=self._run, args=(conn,), name="transaction-journal", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def add(self, symbol: str, side: str, quantity: float, price: float, timestamp: str) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        self._queue.put(make_row(symbol, side, quantity, price, timestamp))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Czeka, aż wszystkie dodane wcześniej wiersze zostaną zatwierdzone."""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            atexit.unregister(self.close)
+        self._queue.put(_STOP)
+        thread.join()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[Row]) -> bool:
+        try:
+            with conn:
+                conn.executemany(INSERT_SQL, batch)
+        except ROW_ERRORS as exc:
+            self.last_error = exc
+            return self._write_rows(conn, batch)
+        except sqlite3.Error as exc:
+            self.last_error = exc
+            print(f"⚠️ Zapis {len(batch)} transakcji nieudany, ponowienie: {exc}")
+            return False
+        self.written += len(batch)
+        self.batches += 1
+        batch.clear()
+        return True
+
+    def _write_rows(self, conn: sqlite3.Connection, batch: List[Row]) -> bool:
+        """Zapis pojedynczych wierszy po odrzuceniu paczki; zapisane i odrzucone znikają z `batch`."""
+        while batch:
+            row = batch[0]
+            try:
+                with conn:
+                    conn.execute(INSERT_SQL, row)
+            except ROW_ERRORS as exc:
+                self.rejected.append((row, exc))
+                print(f"🚨 Odrzucono transakcję {row}: {exc}")
+            except sqlite3.Error as exc:
+                self.last_error = exc
+                print(f"⚠️ Zapis {len(batch)} transakcji nieudany, ponowienie: {exc}")
+                return False
+            else:
+                self.written += 1
+            batch.pop(0)
+        self.batches += 1
+        return True
+
+    def _run(self, conn: sqlite3.Connection) -> None:
+        batch: List[Row] = []
+        waiters: List[threading.Event] = []
+        deadline = None
+        stopping = False
+        shutdown_retries = SHUTDOWN_RETRIES
+        while True:
+            timeout = max(deadline - time.monotonic(), 0) if deadline is not None else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            # Dobieramy od razu wszystko, co już czeka w kolejce (do rozmiaru paczki).
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                if len(batch) >= self.batch_size or waiters or stopping:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if batch and (len(batch) >= self.batch_size or waiters or stopping or due):
+                if not self._write(conn, batch):
+                    deadline = time.monotonic() + RETRY_DELAY
+                    if stopping:
+                        shutdown_retries -= 1
+                        if shutdown_retries <= 0:
+                            print(f"🚨 Utracono {len(batch)} niezapisanych transakcji przy zamykaniu dziennika.")
+                            batch.clear()
+                        else:
+                            time.sleep(RETRY_DELAY)
+                    continue
+            if not batch:
+                deadline = None
+                for waiter in waiters:
+                    waiter.set()
+                waiters.clear()
+                if stopping:
+                    break
+
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+
+
+journal = TransactionJournal()
+
+
+def init_db(path: Optional[str] = None):
+    connect(path).close()
+
 
 def add_transaction(symbol, side, quantity, price, timestamp):
-    conn = sqlite3.connect(config.DATABASE_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO transactions (symbol, side, quantity, price, timestamp) VALUES (?, ?, ?, ?, ?)",
-              (symbol, side, quantity, price, timestamp))
-    conn.commit()
-    conn.close()
+    """Dodaje transakcję do dziennika (zapis w tle; `journal.flush()` czeka na zatwierdzenie).
+
+    `quantity`/`price` mogą być `Decimal`; zapisywane są jako REAL.
+    """
+    journal.add(symbol, side, quantity, price, timestamp)
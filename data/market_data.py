@@ -1,10 +1,10 @@
-import requests
+from trading.http_client import http_client
 
 BINANCE_API_URL = "https://api.binance.com/api/v3/klines"
 
 def get_market_data(symbol, interval="1h"):
     params = {"symbol": symbol, "interval": interval, "limit": 100}
-    response = requests.get(BINANCE_API_URL, params=params)
+    response = http_client.get(BINANCE_API_URL, params=params)
     
     if response.status_code == 200:
         return response.json()
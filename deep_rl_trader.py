@@ -1,24 +1,46 @@
 import gym
 import numpy as np
-import pandas as pd
 import ta
-import os
 from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import VecEnv
+
+from trading.market_store import load_market_frame
+
+def load_features(data_file=None, symbol="BTCUSDT"):
+    """Ceny i macierz cech (EMA 9, EMA 21, MACD, RSI) liczone raz dla całej historii.
+
+    Cechy to ciągła tablica float32 `(świece, 4)`, więc obserwacja jest
+    widokiem na jeden wiersz zamiast czterech odczytów z pandas.
+    """
+    df = load_market_frame(symbol, columns=["close"], data_file=data_file)
+    if df is None:
+        raise FileNotFoundError(f"🚨 Brak danych rynkowych: {data_file or symbol}")
+
+    df["EMA_9"] = ta.trend.EMAIndicator(df["close"], window=9).ema_indicator()
+    df["EMA_21"] = ta.trend.EMAIndicator(df["close"], window=21).ema_indicator()
+    df["MACD"] = ta.trend.MACD(df["close"]).macd()
+    df["RSI"] = ta.momentum.RSIIndicator(df["close"]).rsi()
+
+    features = np.ascontiguousarray(df[["EMA_9", "EMA_21", "MACD", "RSI"]].to_numpy(dtype=np.float32))
+    features.flags.writeable = False
+    prices = df["close"].to_numpy(dtype=np.float64)
+    return df, features, prices
+
+def first_complete_step(features):
+    """Pierwszy wiersz, w którym wszystkie cechy są skończone (po rozgrzewce EMA/MACD/RSI)."""
+    complete = np.flatnonzero(np.isfinite(features).all(axis=1))
+    if not len(complete):
+        raise ValueError("🚨 Za mało danych rynkowych, żeby policzyć wskaźniki.")
+    return int(complete[0])
 
 class TradingEnv(gym.Env):
     """Środowisko Reinforcement Learning dla tradingu"""
-    
-    def __init__(self, data_file="market_data_BTCUSDT.csv", initial_balance=1000):
+
+    def __init__(self, data_file=None, initial_balance=1000, symbol="BTCUSDT"):
         super(TradingEnv, self).__init__()
-        
-        if not os.path.exists(data_file):
-            raise FileNotFoundError(f"🚨 Brak danych rynkowych: {data_file}")
 
-        self.df = pd.read_csv(data_file)
-        self.df["EMA_9"] = ta.trend.EMAIndicator(self.df["close"], window=9).ema_indicator()
-        self.df["EMA_21"] = ta.trend.EMAIndicator(self.df["close"], window=21).ema_indicator()
-        self.df["MACD"] = ta.trend.MACD(self.df["close"]).macd()
-        self.df["RSI"] = ta.momentum.RSIIndicator(self.df["close"]).rsi()
+        self.df, self.features, self.prices = load_features(data_file, symbol)
+        self.first_step = first_complete_step(self.features)
 
         self.initial_balance = initial_balance
         self.balance = initial_balance
@@ -31,11 +53,11 @@ class TradingEnv(gym.Env):
     def reset(self):
         self.balance = self.initial_balance
         self.position = 0
-        self.current_step = 0
+        self.current_step = self.first_step
         return self._get_observation()
 
     def step(self, action):
-        price = self.df["close"].iloc[self.current_step]
+        price = self.prices[self.current_step]
 
         if action == 1 and self.position == 0:  # KUP
             self.position = self.balance / price
@@ -45,21 +67,120 @@ class TradingEnv(gym.Env):
             self.position = 0
 
         self.current_step += 1
-        done = self.current_step >= len(self.df) - 1
+        done = self.current_step >= len(self.prices) - 1
         reward = self.balance + (self.position * price) - self.initial_balance
 
         return self._get_observation(), reward, done, {}
 
     def _get_observation(self):
-        return np.array([
-            self.df["EMA_9"].iloc[self.current_step],
-            self.df["EMA_21"].iloc[self.current_step],
-            self.df["MACD"].iloc[self.current_step],
-            self.df["RSI"].iloc[self.current_step]
-        ])
+        return self.features[self.current_step]
+
+class VecTradingEnv(VecEnv):
+    """N niezależnych środowisk `TradingEnv` krokowanych jedną operacją NumPy.
+
+    Każde środowisko gra epizod długości `episode_length` od losowego
+    miejsca historii (domyślnie całą historię od początku, jak `TradingEnv`).
+    Epizody zaczynają się najwcześniej w pierwszym wierszu ze wszystkimi
+    cechami (`first_complete_step`), więc obserwacje nie zawierają NaN
+    z rozgrzewki wskaźników.
+    Salda, pozycje i kroki to tablice `(N,)`, a obserwacje to wiersze
+    wspólnej macierzy cech. Zakończone środowiska są resetowane od razu,
+    a ostatnia obserwacja trafia do `info["terminal_observation"]`
+    (konwencja `stable_baselines3`).
+    """
+
+    def __init__(
+        self,
+        num_envs=8,
+        data_file=None,
+        initial_balance=1000,
+        symbol="BTCUSDT",
+        episode_length=None,
+        seed=None,
+    ):
+        _, self.features, self.prices = load_features(data_file, symbol)
+        self.first_step = first_complete_step(self.features)
+        last_step = len(self.prices) - 1 - self.first_step
+        self.episode_length = min(int(episode_length), last_step) if episode_length else last_step
+        if self.episode_length <= 0:
+            raise ValueError(f"🚨 Za mało danych rynkowych dla {symbol}.")
+        self.initial_balance = float(initial_balance)
+        self.random_starts = episode_length is not None and self.episode_length < last_step
+        self.rng = np.random.default_rng(seed)
+
+        self.balance = np.full(num_envs, self.initial_balance)
+        self.position = np.zeros(num_envs)
+        self.current_step = np.zeros(num_envs, dtype=np.int64)
+        self.end_step = np.zeros(num_envs, dtype=np.int64)
+        self._actions = np.zeros(num_envs, dtype=np.int64)
+
+        action_space = gym.spaces.Discrete(3)  # 0 = NIC, 1 = KUP, 2 = SPRZEDAJ
+        observation_space = gym.spaces.Box(low=-np.inf, high=np.inf, shape=(4,), dtype=np.float32)
+        super().__init__(num_envs, observation_space, action_space)
+
+    def _start(self, envs):
+        if self.random_starts:
+            starts = self.rng.integers(self.first_step, len(self.prices) - self.episode_length, size=len(envs))
+        else:
+            starts = np.full(len(envs), self.first_step, dtype=np.int64)
+        self.current_step[envs] = starts
+        self.end_step[envs] = starts + self.episode_length
+        self.balance[envs] = self.initial_balance
+        self.position[envs] = 0
+
+    def reset(self):
+        self._start(np.arange(self.num_envs))
+        return self.features[self.current_step]
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions).reshape(self.num_envs)
+
+    def step_wait(self):
+        price = self.prices[self.current_step]
+        buy = (self._actions == 1) & (self.position == 0)  # KUP
+        sell = (self._actions == 2) & (self.position > 0)  # SPRZEDAJ
+
+        bought = self.balance[buy] / price[buy]
+        self.position[buy] = bought
+        self.balance[buy] -= bought * price[buy]
+        self.balance[sell] += self.position[sell] * price[sell]
+        self.position[sell] = 0
+
+        self.current_step += 1
+        dones = self.current_step >= self.end_step
+        rewards = (self.balance + self.position * price - self.initial_balance).astype(np.float32)
+        observations = self.features[self.current_step]
+
+        infos = [{} for _ in range(self.num_envs)]
+        finished = np.flatnonzero(dones)
+        if len(finished):
+            for env in finished:
+                infos[env]["terminal_observation"] = observations[env].copy()
+            self._start(finished)
+            observations[finished] = self.features[self.current_step[finished]]
+        return observations, rewards, dones, infos
+
+    def close(self):
+        pass
+
+    def seed(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        return [seed] * self.num_envs
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return [getattr(self, method_name)(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
 
 if __name__ == "__main__":
-    env = TradingEnv()
+    env = VecTradingEnv(num_envs=8, episode_length=10_000)
     model = PPO("MlpPolicy", env, verbose=1)
     model.learn(total_timesteps=100000)
     model.save("deep_rl_trading_model")
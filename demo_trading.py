@@ -7,6 +7,8 @@ import os
 import matplotlib.pyplot as plt
 from flask import Flask, render_template, request, jsonify
 
+from trading.market_store import load_market_frame
+
 CONFIG_FILE = "config.json"
 if not os.path.exists(CONFIG_FILE):
     print("🚨 Brak pliku config.json! Tworzenie domyślnej konfiguracji...")
@@ -24,13 +26,13 @@ with open(CONFIG_FILE) as config_file:
 
 app = Flask(__name__)
 
-def simulate_trade(strategy_name, start_balance=1000, trade_risk=0.02, data_file="market_data_BTCUSDT.csv"):
+def simulate_trade(strategy_name, start_balance=1000, trade_risk=0.02, data_file=None, symbol="BTCUSDT"):
     """Symulacja strategii tradingowej"""
     
-    if not os.path.exists(data_file):
+    df = load_market_frame(symbol, columns=["timestamp", "close"], data_file=data_file)
+    if df is None:
         return {"error": "Brak danych rynkowych!"}
 
-    df = pd.read_csv(data_file)
     df["EMA_9"] = ta.trend.EMAIndicator(df["close"], window=9).ema_indicator()
     df["EMA_21"] = ta.trend.EMAIndicator(df["close"], window=21).ema_indicator()
     df["RSI"] = ta.momentum.RSIIndicator(df["close"]).rsi()
@@ -38,6 +40,8 @@ def simulate_trade(strategy_name, start_balance=1000, trade_risk=0.02, data_file
     balance = start_balance
     position = 0
     history = []
+    # Czas jako typ Pythona: napis z CSV albo int (epoch ms) z market_store – oba przechodzą przez jsonify.
+    timestamps = df["timestamp"].tolist()
 
     for i in range(1, len(df)):
         price = df["close"].iloc[i]
@@ -46,10 +50,10 @@ def simulate_trade(strategy_name, start_balance=1000, trade_risk=0.02, data_file
         if position == 0 and rsi < 30:  # Kupno przy wyprzedaniu rynku
             position = (trade_risk * balance) / price
             balance -= position * price
-            history.append((df["timestamp"].iloc[i], "BUY", price, balance))
+            history.append((timestamps[i], "BUY", price, balance))
         elif position > 0 and rsi > 70:  # Sprzedaż przy wykupieniu rynku
             balance += position * price
-            history.append((df["timestamp"].iloc[i], "SELL", price, balance))
+            history.append((timestamps[i], "SELL", price, balance))
             position = 0
 
     final_balance = balance + (position * df["close"].iloc[-1] if position > 0 else 0)
@@ -39,6 +39,7 @@ def install_packages():
         "stable-baselines3",
         "openai",
         "requests",
+        "websocket-client",
         "matplotlib",
         "scipy",
         "numpy",
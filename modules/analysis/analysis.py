@@ -1,11 +1,11 @@
 def analysis_function():
     print('analysis module function executed')
 
-import requests
+from trading.http_client import http_client
 
 def analyze_binance_data():
     url = "https://api.binance.com/api/v3/ticker/24hr"
-    response = requests.get(url)
+    response = http_client.get(url)
     data = response.json()
 
     profitable_pairs = []
@@ -1,5 +1,5 @@
 
-import requests
+from trading.http_client import http_client
 
 class BinanceAPI:
     def __init__(self, api_key, secret_key):
@@ -9,7 +9,7 @@ class BinanceAPI:
 
     def get_market_data(self, symbol):
         url = f"{self.base_url}ticker/price?symbol={symbol}"
-        response = requests.get(url)
+        response = http_client.get(url)
         return response.json()
 
     def place_order(self, symbol, side, quantity):
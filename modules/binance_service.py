@@ -1,5 +1,5 @@
 
-import requests
+from trading.http_client import http_client
 
 class BinanceService:
     def __init__(self, api_key, secret_key):
@@ -8,5 +8,5 @@ class BinanceService:
         self.base_url = "https://api.binance.com/api/v3/"
 
     def test_connection(self):
-        response = requests.get(f"{self.base_url}ping")
+        response = http_client.get(f"{self.base_url}ping")
         return response.status_code == 200
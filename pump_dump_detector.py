@@ -1,27 +1,31 @@
-import pandas as pd
-import ta
-import os
+import time
 
-def detect_pump_and_dump(symbol="BTCUSDT", threshold=5, data_file="market_data_BTCUSDT.csv"):
+import numpy as np
+
+from trading.market_store import load_market_frame
+from trading.pump_detector import PumpDetector, PumpStream
+
+def detect_pump_and_dump(symbol="BTCUSDT", threshold=5, data_file=None):
     """Wykrywanie nagłych wzrostów/spadków cen (Pump & Dump)"""
     
-    if not os.path.exists(data_file):
+    df = load_market_frame(symbol, columns=["timestamp", "close"], data_file=data_file)
+    if df is None:
         print(f"🚨 Brak danych rynkowych dla {symbol}!")
         return
 
-    df = pd.read_csv(data_file)
     if df.empty or "close" not in df:
-        print(f"🚨 Plik {data_file} jest pusty lub uszkodzony!")
+        print(f"🚨 Dane rynkowe dla {symbol} są puste lub uszkodzone!")
         return
 
-    df["returns"] = df["close"].pct_change() * 100  # Obliczenie procentowej zmiany ceny
+    returns = df["close"].pct_change().to_numpy() * 100  # Obliczenie procentowej zmiany ceny
+    timestamps = df["timestamp"].to_numpy()
 
-    alerts = []
-    for i in range(1, len(df)):
-        if df["returns"].iloc[i] > threshold:
-            alerts.append((df["timestamp"].iloc[i], "🚀 Możliwy Pump!", df["returns"].iloc[i]))
-        elif df["returns"].iloc[i] < -threshold:
-            alerts.append((df["timestamp"].iloc[i], "⚠️ Możliwy Dump!", df["returns"].iloc[i]))
+    with np.errstate(invalid="ignore"):
+        moves = np.flatnonzero((returns > threshold) | (returns < -threshold))
+    alerts = [
+        (timestamps[i], "🚀 Możliwy Pump!" if returns[i] > threshold else "⚠️ Możliwy Dump!", returns[i])
+        for i in moves
+    ]
 
     if alerts:
         print(f"📢 Wykryto {len(alerts)} podejrzane ruchy na rynku dla {symbol}:")
@@ -32,7 +36,29 @@ def detect_pump_and_dump(symbol="BTCUSDT", threshold=5, data_file="market_data_B
 
     return alerts
 
-# Testowanie wykrywania Pump & Dump
-symbols = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
-for symbol in symbols:
-    detect_pump_and_dump(symbol)
+def monitor_market(mode="kline", quote_asset="USDT", interval="1m", symbols=None):
+    """Nasłuch pump/dump na żywo dla wszystkich par z `quote_asset` (z-score zwrotu i wolumenu)."""
+    detector = PumpDetector(interval=interval)
+    stream = PumpStream(
+        detector,
+        symbols=symbols,
+        mode=mode,
+        quote_asset=quote_asset,
+        on_alert=lambda alert: print(f"📢 {alert.format()}"),
+    ).start()
+    print(f"👀 Monitorowanie {len(stream.symbols)} par {quote_asset} ({mode}, {interval})...")
+    try:
+        while True:
+            time.sleep(60)
+            print(
+                f"[pump] świece={stream.batches} alerty={len(stream.alerts)} "
+                f"update={stream.last_update_ms:.2f}ms max={stream.max_update_ms:.2f}ms"
+            )
+    except KeyboardInterrupt:
+        stream.stop()
+
+if __name__ == "__main__":
+    # Testowanie wykrywania Pump & Dump
+    symbols = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
+    for symbol in symbols:
+        detect_pump_and_dump(symbol)
@@ -1,47 +1,104 @@
-import pandas as pd
-import ta
-import os
+from trading.market_store import load_market_frame
+from trading.monte_carlo import analyze_trade_log
+from trading.stop_simulator import StopParams, param_grid, rising_close_entries, simulate_stops
 
-def risk_management(symbol="BTCUSDT", initial_balance=1000, risk_per_trade=0.02, take_profit_factor=2):
-    """Strategia z dynamicznym stop-loss i take-profit"""
-    file_name = f"market_data_{symbol}.csv"
 
-    if not os.path.exists(file_name):
+def _load_ohlc(symbol):
+    df = load_market_frame(symbol, columns=["timestamp", "high", "low", "close"])
+
+    if df is None:
         print(f"🚨 Brak danych rynkowych dla {symbol}!")
-        return
+        return None
 
-    df = pd.read_csv(file_name)
     if df.empty or "close" not in df:
-        print(f"🚨 Plik {file_name} jest pusty lub uszkodzony!")
+        print(f"🚨 Dane rynkowe dla {symbol} są puste lub uszkodzone!")
+        return None
+    return df
+
+
+def risk_management(
+    symbol="BTCUSDT",
+    initial_balance=1000,
+    risk_per_trade=0.02,
+    take_profit_factor=2,
+    stop_loss_factor=1.5,
+    atr_period=14,
+):
+    """Strategia z dynamicznym stop-loss i take-profit"""
+    df = _load_ohlc(symbol)
+    if df is None:
         return
 
-    df["ATR"] = ta.volatility.AverageTrueRange(df["high"], df["low"], df["close"]).average_true_range()
+    close = df["close"].to_numpy(dtype=float)
+    # SL/TP ustalane przy wejściu i sprawdzane na high/low kolejnych świec.
+    result = simulate_stops(
+        df["high"].to_numpy(dtype=float),
+        df["low"].to_numpy(dtype=float),
+        close,
+        rising_close_entries(close),  # Warunek wejścia (można dodać strategię)
+        [StopParams(atr_period=atr_period, sl_multiplier=stop_loss_factor, tp_multiplier=take_profit_factor)],
+        initial_balance=initial_balance,
+        risk_per_trade=risk_per_trade,
+    )[0]
 
-    balance = initial_balance
-    position = 0
+    timestamps = df["timestamp"].to_numpy()
     trade_log = []
+    balance = initial_balance
+    for trade in result.trade_log(timestamps):
+        balance -= trade["quantity"] * trade["entry_price"]
+        trade_log.append(
+            (trade["entry_time"], "BUY", trade["entry_price"], trade["stop_loss"], trade["take_profit"], balance)
+        )
+        if trade["exit_reason"] == "end":
+            break  # Pozycja otwarta do końca danych – wyceniona w saldzie końcowym.
+        balance = trade["balance"]
+        trade_log.append((trade["exit_time"], "SELL", trade["exit_price"], balance))
+
+    print(
+        f"📊 Strategia ryzyka dla {symbol} zakończona! Start: {initial_balance} USDT, "
+        f"Koniec: {result.final_balance:.2f} USDT"
+    )
+    return trade_log
 
-    for i in range(1, len(df)):
-        price = df["close"].iloc[i]
-        atr = df["ATR"].iloc[i]
-        stop_loss = price - (atr * 1.5)  # Stop-loss na 1.5x ATR
-        take_profit = price + (atr * take_profit_factor)  # Take-profit na 2x ATR
 
-        if position == 0 and df["close"].iloc[i] > df["close"].iloc[i - 1]:  # Warunek wejścia (można dodać strategię)
-            position = (risk_per_trade * balance) / price  # Obliczenie pozycji
-            balance -= position * price
-            trade_log.append((df["timestamp"].iloc[i], "BUY", price, stop_loss, take_profit, balance))
+def optimize_risk_parameters(
+    symbol="BTCUSDT",
+    atr_periods=(7, 14, 21),
+    stop_loss_factors=(1.0, 1.5, 2.0, 3.0),
+    take_profit_factors=(1.5, 2.0, 3.0, 4.0),
+    initial_balance=1000,
+    risk_per_trade=0.02,
+):
+    """Przegląd siatki (okres ATR, mnożnik SL, mnożnik TP) w jednym przebiegu symulatora."""
+    df = _load_ohlc(symbol)
+    if df is None:
+        return
 
-        elif position > 0 and (price <= stop_loss or price >= take_profit):  # Warunek wyjścia
-            balance += position * price
-            trade_log.append((df["timestamp"].iloc[i], "SELL", price, balance))
-            position = 0
+    close = df["close"].to_numpy(dtype=float)
+    results = simulate_stops(
+        df["high"].to_numpy(dtype=float),
+        df["low"].to_numpy(dtype=float),
+        close,
+        rising_close_entries(close),
+        param_grid(atr_periods, stop_loss_factors, take_profit_factors),
+        initial_balance=initial_balance,
+        risk_per_trade=risk_per_trade,
+    )
+    results.sort(key=lambda result: result.final_balance, reverse=True)
+    best = results[0]
+    print(
+        f"🏆 Najlepsze parametry ryzyka dla {symbol}: ATR {best.params.atr_period}, "
+        f"SL {best.params.sl_multiplier}x, TP {best.params.tp_multiplier}x – "
+        f"Koniec: {best.final_balance:.2f} USDT ({best.trades} transakcji, skuteczność {best.win_rate:.0%})"
+    )
+    return results
 
-    final_balance = balance + (position * df["close"].iloc[-1] if position > 0 else 0)
-    print(f"📊 Strategia ryzyka dla {symbol} zakończona! Start: {initial_balance} USDT, Koniec: {final_balance:.2f} USDT")
-    return trade_log
 
-# Testowanie strategii zarządzania ryzykiem
-symbols = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
-for symbol in symbols:
-    risk_management(symbol)
+if __name__ == "__main__":
+    # Testowanie strategii zarządzania ryzykiem
+    symbols = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
+    for symbol in symbols:
+        trade_log = risk_management(symbol)
+        for result in analyze_trade_log(trade_log or []).values():
+            print(result.format())
+        optimize_risk_parameters(symbol)
@@ -1,10 +1,10 @@
 import numpy as np
 import pandas as pd
-import ta
 import openai
 import json
 import os
-from scipy.optimize import minimize
+
+from trading.param_search import trend_grid_search
 
 CONFIG_FILE = "config.json"
 
@@ -18,22 +18,20 @@ with open(CONFIG_FILE) as config_file:
 OPENAI_API_KEY = config["OPENAI_API_KEY"]
 openai.api_key = OPENAI_API_KEY
 
-def quantum_optimization(price_data):
-    """Wykorzystuje optymalizację kwantową do predykcji trendów rynkowych"""
-    
-    def loss_function(params):
-        ema_short, ema_long, rsi_period = params
-        df = price_data.copy()
-        df["EMA_Short"] = ta.trend.EMAIndicator(df["close"], window=int(ema_short)).ema_indicator()
-        df["EMA_Long"] = ta.trend.EMAIndicator(df["close"], window=int(ema_long)).ema_indicator()
-        df["RSI"] = ta.momentum.RSIIndicator(df["close"], window=int(rsi_period)).rsi()
-
-        signals = ((df["EMA_Short"] > df["EMA_Long"]) & (df["RSI"] < 70)).astype(int)
-        returns = df["close"].pct_change() * signals.shift(1)
-        return -returns.sum()  # Minimalizujemy stratę, maksymalizujemy zysk
+def quantum_optimization(price_data, workers=None):
+    """Wykorzystuje optymalizację kwantową do predykcji trendów rynkowych
 
-    result = minimize(loss_function, [9, 21, 14], bounds=[(5, 15), (20, 50), (10, 30)])
-    return {"EMA_Short": result.x[0], "EMA_Long": result.x[1], "RSI_Period": result.x[2]}
+    Pełna siatka okien (EMA krótka 5-15, EMA długa 20-50, RSI 10-30) z
+    pamięcią wskaźników zamiast `scipy.optimize.minimize` na obciętych do
+    `int` oknach – każda konfiguracja oceniana jest dokładnie raz.
+    """
+    report = trend_grid_search(price_data["close"].to_numpy(dtype=float), workers=workers)
+    best, score = report.best
+    print(
+        f"⏱️ {report.evaluations} konfiguracji w {report.elapsed_seconds:.2f}s "
+        f"({report.evaluations_per_second:.0f} ocen/s, wątki: {report.workers}, serie wskaźników: {report.cached_series})"
+    )
+    return {"EMA_Short": best.ema_short, "EMA_Long": best.ema_long, "RSI_Period": best.rsi_period, "Return": score}
 
 def analyze_market_with_ai(market_data):
     """AI GPT-4 Turbo analizuje sytuację rynkową"""
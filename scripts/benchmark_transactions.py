@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Benchmark zapisu transakcji: połączenie i commit na wiersz vs dziennik backend/transactions.
+
+Przykład:
+    python scripts/benchmark_transactions.py --rows 20000 --threads 4
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from transactions import INSERT_SQL, TransactionJournal, connect  # noqa: E402
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT"]
+
+
+def make_rows(count: int):
+    return [
+        (SYMBOLS[i % len(SYMBOLS)], "BUY" if i % 2 else "SELL", 0.001 * (i % 100 + 1), 30000.0 + i, f"{1700000000 + i}")
+        for i in range(count)
+    ]
+
+
+def per_row_insert(path: str, rows) -> None:
+    """Dawne `add_transaction`: nowe połączenie, jeden INSERT i commit na każdą transakcję."""
+    for row in rows:
+        conn = sqlite3.connect(path)
+        conn.execute(INSERT_SQL, row)
+        conn.commit()
+        conn.close()
+
+
+def run_threads(target, path: str, rows, threads: int) -> float:
+    parts = [rows[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=target, args=(path, part)) for part in parts]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def count_rows(path: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--legacy-rows", type=int, default=2000, help="wierszy dla wariantu commit-na-wiersz (wolny)")
+    parser.add_argument("--threads", type=int, default=4, help="wątki dodające transakcje (zapisy „burst”)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dir", help="katalog na bazy testowe (domyślnie tymczasowy)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        legacy_path = os.path.join(directory, "legacy.sqlite")
+        connect(legacy_path).close()
+        legacy_rows = make_rows(args.legacy_rows)
+        elapsed = run_threads(per_row_insert, legacy_path, legacy_rows, args.threads)
+        print(
+            f"commit na wiersz: {len(legacy_rows)} wierszy w {elapsed:.2f}s "
+            f"({len(legacy_rows) / elapsed:,.0f} wierszy/s), w bazie: {count_rows(legacy_path)}"
+        )
+
+        journal_path = os.path.join(directory, "journal.sqlite")
+        journal = TransactionJournal(journal_path, batch_size=args.batch_size)
+        journal.start()
+        rows = make_rows(args.rows)
+
+        def add_rows(_path, part):
+            for row in part:
+                journal.add(*row)
+
+        started = time.perf_counter()
+        run_threads(add_rows, journal_path, rows, args.threads)
+        journal.close()
+        elapsed = time.perf_counter() - started
+        print(
+            f"dziennik (WAL, executemany): {len(rows)} wierszy w {elapsed:.2f}s "
+            f"({len(rows) / elapsed:,.0f} wierszy/s, paczek: {journal.batches}), w bazie: {count_rows(journal_path)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Pobieranie historii świec Binance do magazynu trading/market_store (tylko brakujące zakresy).
+
+Przykład:
+    python scripts/download_history.py BTCUSDT ETHUSDT --interval 1m --start 2024-01-01 --csv
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from trading.history_downloader import HistoryDownloader, export_csv  # noqa: E402
+from trading.http_client import BINANCE_BASE_URL  # noqa: E402
+from trading.market_store import MARKET_STORE_DIR, MarketStore, to_epoch_ms  # noqa: E402
+
+
+def parse_date(value: str) -> int:
+    return int(to_epoch_ms(pd.Series([value]))[0])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--interval", default="1m")
+    parser.add_argument("--start", help="data początkowa (domyślnie pierwsza zapisana świeca albo --days wstecz)")
+    parser.add_argument("--end", help="data końcowa (domyślnie ostatnia zamknięta świeca)")
+    parser.add_argument("--days", type=int, default=30, help="historia dla symboli, których nie ma w magazynie")
+    parser.add_argument("--target", default=MARKET_STORE_DIR, help="katalog magazynu")
+    parser.add_argument("--base-url", default=BINANCE_BASE_URL, help="adres REST (np. lokalny serwer testowy)")
+    parser.add_argument("--concurrency", type=int, default=4, help="liczba symboli pobieranych równolegle")
+    parser.add_argument("--csv", action="store_true", help="zapisz też market_data_<SYMBOL>.csv")
+    args = parser.parse_args()
+
+    store = MarketStore(args.target)
+    downloader = HistoryDownloader(store=store, base_url=args.base_url, concurrency=args.concurrency)
+    start = parse_date(args.start) if args.start else None
+    end = parse_date(args.end) if args.end else None
+
+    started = time.perf_counter()
+    reports = downloader.download(args.symbols, args.interval, start, end, days=args.days)
+    elapsed = time.perf_counter() - started
+
+    for report in reports:
+        status = f"❌ {report.error}" if report.error else "✅"
+        print(
+            f"{status} {report.symbol} {report.interval}: +{report.rows} świec, {report.requests} zapytań, "
+            f"luki giełdy: {report.exchange_gaps}, duplikaty: {report.duplicates} ({report.elapsed_seconds:.1f}s)"
+        )
+        if args.csv and not report.error:
+            rows = export_csv(report.symbol, args.interval, store=store)
+            print(f"Zapisano market_data_{report.symbol}.csv ({rows} wierszy)")
+    total = sum(report.rows for report in reports)
+    print(f"Razem: {total} świec w {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Migracja plików market_data_<SYMBOL>.csv do kolumnowego magazynu trading/market_store.
+
+Przykład:
+    python scripts/migrate_market_data.py --source . --interval 1m
+"""
+import argparse
+import glob
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from trading.kline_cache import INTERVAL_MS  # noqa: E402
+from trading.market_store import MARKET_STORE_DIR, TIME_COLUMN, MarketStore, to_epoch_ms  # noqa: E402
+
+CHUNK_ROWS = 1_000_000
+
+
+def infer_interval(file_name: str):
+    """Interwał z mediany odstępów między świecami (pierwsze 1000 wierszy)."""
+    sample = pd.read_csv(file_name, usecols=[TIME_COLUMN], nrows=1000)
+    if len(sample) < 2:
+        return None
+    step = int(np.median(np.diff(to_epoch_ms(sample[TIME_COLUMN]))))
+    return next((name for name, ms in INTERVAL_MS.items() if ms == step), None)
+
+
+def migrate_file(store: MarketStore, file_name: str, interval=None) -> int:
+    symbol = os.path.basename(file_name)[len("market_data_"):-len(".csv")]
+    interval = interval or infer_interval(file_name)
+    if interval is None:
+        print(f"⚠️ {file_name}: nie udało się ustalić interwału – podaj --interval.")
+        return 0
+    rows = 0
+    for chunk in pd.read_csv(file_name, chunksize=CHUNK_ROWS):
+        if chunk.empty or "close" not in chunk:
+            print(f"🚨 Plik {file_name} jest pusty lub uszkodzony!")
+            return 0
+        store.write(symbol, interval, chunk)
+        rows += len(chunk)
+    months = store.partitions(symbol, interval)
+    print(f"✅ {symbol} {interval}: {rows} wierszy → {len(months)} partycji miesięcznych")
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default=".", help="katalog z plikami market_data_<SYMBOL>.csv")
+    parser.add_argument("--target", default=MARKET_STORE_DIR, help="katalog magazynu")
+    parser.add_argument("--interval", help="interwał świec (domyślnie wykrywany z danych)")
+    parser.add_argument("symbols", nargs="*", help="symbole do migracji (domyślnie wszystkie pliki)")
+    args = parser.parse_args()
+
+    store = MarketStore(args.target)
+    if args.symbols:
+        files = [os.path.join(args.source, f"market_data_{symbol}.csv") for symbol in args.symbols]
+    else:
+        files = sorted(glob.glob(os.path.join(args.source, "market_data_*.csv")))
+    if not files:
+        print("🚨 Brak plików market_data_<SYMBOL>.csv do migracji.")
+        return
+    for file_name in files:
+        if not os.path.exists(file_name):
+            print(f"🚨 Brak pliku {file_name}")
+            continue
+        migrate_file(store, file_name, args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Backtest reguł auto-tradera na wielu symbolach ze wspólnym saldem (trading/portfolio_backtest).
+
+Przykład:
+    python scripts/portfolio_backtest.py BTCUSDT ETHUSDT BNBUSDT --interval 1m --start 2024-01-01
+"""
+import argparse
+import csv
+import json
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from trading.market_store import to_epoch_ms  # noqa: E402
+from trading.portfolio_backtest import PortfolioBacktest, load_portfolio  # noqa: E402
+from trading.strategy_engine import RiskConfig  # noqa: E402
+
+
+def load_config(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as config_file:
+        return json.load(config_file)
+
+
+def parse_date(value: str) -> int:
+    return int(to_epoch_ms(pd.Series([value]))[0])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("symbols", nargs="*", help="symbole (domyślnie AUTO_TRADING.SYMBOLS)")
+    parser.add_argument("--interval", help="interwał świec (domyślnie TRADING_RULES.INTERVAL)")
+    parser.add_argument("--start", help="data początkowa")
+    parser.add_argument("--end", help="data końcowa")
+    parser.add_argument("--config", default=str(ROOT / "config.json"))
+    parser.add_argument("--initial-quote", type=float, default=1000)
+    parser.add_argument("--fee-pct", type=float, default=0.1)
+    parser.add_argument("--trades-csv", help="zapisz dziennik transakcji do CSV")
+    args = parser.parse_args()
+
+    config = load_config(Path(args.config))
+    rules = config.get("TRADING_RULES", {})
+    risk_cfg = config.get("RISK_MANAGEMENT", {})
+    risk = RiskConfig(
+        risk_per_trade_pct=Decimal(str(risk_cfg.get("RISK_PER_TRADE_PCT", 1))),
+        max_position_pct=Decimal(str(risk_cfg.get("MAX_POSITION_PCT", 10))),
+        atr_period=int(risk_cfg.get("ATR_PERIOD", 14)),
+        atr_multiplier_sl=Decimal(str(risk_cfg.get("ATR_MULTIPLIER_SL", 1.5))),
+        atr_multiplier_tp=Decimal(str(risk_cfg.get("ATR_MULTIPLIER_TP", 3.0))),
+        min_signal_score=int(risk_cfg.get("MIN_SIGNAL_SCORE", 2)),
+    )
+    symbols = args.symbols or config.get("AUTO_TRADING", {}).get("SYMBOLS", [])
+    if not symbols:
+        parser.error("podaj symbole albo ustaw AUTO_TRADING.SYMBOLS")
+
+    data = load_portfolio(
+        symbols,
+        interval=args.interval or rules.get("INTERVAL"),
+        start=parse_date(args.start) if args.start else None,
+        end=parse_date(args.end) if args.end else None,
+    )
+    backtest = PortfolioBacktest(rules=rules, risk=risk, initial_quote=args.initial_quote, fee_pct=args.fee_pct)
+    report = backtest.run(data)
+
+    print(
+        f"📈 Portfel {len(report.symbols)} symboli × {report.bars} świec w {report.elapsed_seconds:.2f}s "
+        f"({report.bars_per_second:,.0f} świec/s)"
+    )
+    print(
+        f"Transakcje: {report.trades}, skuteczność: {report.win_rate:.0%}, PnL: {report.total_pnl:.2f} "
+        f"(saldo {report.final_quote:.2f}), max drawdown: {report.max_drawdown_pct:.1f}%, "
+        f"max otwartych pozycji: {report.max_open_positions}"
+    )
+    for symbol, pnl in sorted(report.symbol_pnl().items(), key=lambda item: item[1], reverse=True):
+        print(f"  {symbol}: {pnl:+.2f}")
+    if args.trades_csv:
+        rows = report.trade_log()
+        with open(args.trades_csv, "w", newline="", encoding="utf-8") as trades_file:
+            writer = csv.DictWriter(trades_file, fieldnames=list(rows[0].keys()) if rows else ["symbol"])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Zapisano dziennik transakcji: {args.trades_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Backtest reguł auto-tradera (signal_engine + strategy_engine) na zapisanych świecach.
+
+Przykład:
+    python scripts/replay_backtest.py BTCUSDT --data market_data_BTCUSDT.csv --interval 1m
+"""
+import argparse
+import csv
+import json
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from trading.replay import ReplayHarness, klines_from_frame  # noqa: E402
+from trading.strategy_engine import RiskConfig  # noqa: E402
+
+
+def load_config(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as config_file:
+        return json.load(config_file)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("symbol")
+    parser.add_argument("--data", help="CSV z kolumnami timestamp/open_time, open, high, low, close, volume")
+    parser.add_argument("--orderbooks", help="JSON z listą snapshotów order booka (timestamp + imbalance lub bids/asks)")
+    parser.add_argument("--interval", help="interwał świec (domyślnie TRADING_RULES.INTERVAL)")
+    parser.add_argument("--config", default=str(ROOT / "config.json"))
+    parser.add_argument("--initial-quote", default="1000")
+    parser.add_argument("--fee-pct", default="0.1")
+    parser.add_argument("--exact", action="store_true", help="każda świeca przez build_signal/build_trade_plan")
+    parser.add_argument("--trades-csv", help="zapisz dziennik transakcji do CSV")
+    args = parser.parse_args()
+
+    config = load_config(Path(args.config))
+    rules = config.get("TRADING_RULES", {})
+    auto_trading = config.get("AUTO_TRADING", {})
+    risk_cfg = config.get("RISK_MANAGEMENT", {})
+    risk = RiskConfig(
+        risk_per_trade_pct=Decimal(str(risk_cfg.get("RISK_PER_TRADE_PCT", 1))),
+        max_position_pct=Decimal(str(risk_cfg.get("MAX_POSITION_PCT", 10))),
+        atr_period=int(risk_cfg.get("ATR_PERIOD", 14)),
+        atr_multiplier_sl=Decimal(str(risk_cfg.get("ATR_MULTIPLIER_SL", 1.5))),
+        atr_multiplier_tp=Decimal(str(risk_cfg.get("ATR_MULTIPLIER_TP", 3.0))),
+        min_signal_score=int(risk_cfg.get("MIN_SIGNAL_SCORE", 2)),
+    )
+
+    data_file = args.data or f"market_data_{args.symbol}.csv"
+    klines = klines_from_frame(pd.read_csv(data_file))
+    orderbooks = None
+    if args.orderbooks:
+        with open(args.orderbooks, "r", encoding="utf-8") as books_file:
+            orderbooks = json.load(books_file)
+
+    order_size_usdt = Decimal(str(auto_trading.get("ORDER_SIZE_USDT", 0)))
+    harness = ReplayHarness(
+        rules=rules,
+        risk=risk,
+        initial_quote=Decimal(args.initial_quote),
+        order_size_usdt=order_size_usdt,
+        # Bez stałej wielkości zlecenia jedynym źródłem wielkości pozycji jest plan ATR.
+        use_trade_plan=bool(auto_trading.get("USE_TRADE_PLAN", False)) or order_size_usdt <= 0,
+        fee_pct=Decimal(args.fee_pct),
+        exact=args.exact,
+    )
+    report = harness.run(args.symbol, klines, interval=args.interval, orderbooks=orderbooks)
+
+    print(
+        f"📈 {report.symbol}: {report.bars} świec w {report.elapsed_seconds:.2f}s "
+        f"({report.bars_per_second:,.0f} świec/s)"
+    )
+    print(
+        f"Transakcje: {len(report.trades)}, skuteczność: {report.win_rate:.0%}, "
+        f"PnL: {report.total_pnl:.2f} (saldo {report.final_quote:.2f})"
+    )
+    if args.trades_csv:
+        rows = report.trade_log()
+        with open(args.trades_csv, "w", newline="", encoding="utf-8") as trades_file:
+            writer = csv.DictWriter(trades_file, fieldnames=list(rows[0].keys()) if rows else ["symbol"])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Zapisano dziennik transakcji: {args.trades_csv}")
+
+
+if __name__ == "__main__":
+    main()
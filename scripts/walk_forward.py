@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Walk-forward optymalizacji strategii na zapisanych świecach (wyniki poza próbą per fold).
+
+Przykład:
+    python scripts/walk_forward.py BTCUSDT --interval 1m --train 20000 --test 5000 --strategy automl
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from trading.market_store import TIME_COLUMN, load_market_frame, to_epoch_ms  # noqa: E402
+from trading.walk_forward import STRATEGIES, STRATEGY_AUTOML, walk_forward  # noqa: E402
+
+
+def format_time(epoch_ms: int) -> str:
+    return pd.Timestamp(int(epoch_ms), unit="ms", tz="UTC").strftime("%Y-%m-%d %H:%M")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("symbol")
+    parser.add_argument("--interval", help="interwał z magazynu (domyślnie najkrótszy zapisany)")
+    parser.add_argument("--data", help="CSV zamiast magazynu (kolumny timestamp, close)")
+    parser.add_argument("--strategy", choices=STRATEGIES, default=STRATEGY_AUTOML)
+    parser.add_argument("--train", type=int, default=20000, help="długość okna treningowego (świece)")
+    parser.add_argument("--test", type=int, default=5000, help="długość okna testowego (świece)")
+    parser.add_argument("--step", type=int, help="przesunięcie okien (domyślnie --test)")
+    parser.add_argument("--iterations", type=int, default=50, help="liczba losowych prób (automl)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int, help="liczba procesów (domyślnie wszystkie rdzenie)")
+    args = parser.parse_args()
+
+    df = load_market_frame(args.symbol, columns=[TIME_COLUMN, "close"], interval=args.interval, data_file=args.data)
+    if df is None or df.empty:
+        parser.error(f"brak danych rynkowych dla {args.symbol}")
+    timestamps = to_epoch_ms(df[TIME_COLUMN])
+    report = walk_forward(
+        df["close"].to_numpy(dtype=float),
+        args.train,
+        args.test,
+        step=args.step,
+        strategy=args.strategy,
+        iterations=args.iterations,
+        seed=args.seed,
+        workers=args.workers,
+    )
+
+    for result in report.folds:
+        fold = result.fold
+        trades = f", transakcje {result.test_trades}" if result.test_trades is not None else ""
+        print(
+            f"Fold {fold.index}: test {format_time(timestamps[fold.test_start])} – "
+            f"{format_time(timestamps[fold.test_end - 1])} | {result.params} | "
+            f"trening {result.train_return_pct:+.2f}%, test {result.test_return_pct:+.2f}%{trades} "
+            f"| {result.evaluations} ocen w {result.seconds:.2f}s"
+        )
+    print(
+        f"📊 {args.symbol} ({report.strategy}): {len(report.folds)} foldów, wynik poza próbą "
+        f"{report.out_of_sample_return_pct:+.2f}%, zyskowne foldy {report.profitable_folds:.0%}, "
+        f"efektywność {report.efficiency:.2f}"
+    )
+    print(f"⏱️ {report.elapsed_seconds:.2f}s (procesy: {report.workers})")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,14 @@ import os
 import time
 from datetime import datetime, timezone
 
-import requests
 import telepot
 from binance.client import Client
 
-from auto_trader import run_once
-from trading.signal_engine import build_signal
+from auto_trader import build_scheduler, run_once
+from trading.http_client import http_client
+from trading.rate_limiter import rate_limiter
+from trading.scheduler import ServerClock
+from trading.signal_engine import build_signal, kline_cache
 
 CONFIG_FILE = "config.json"
 
@@ -24,6 +26,11 @@ CHAT_ID = int(config["CHAT_ID"])
 
 auto_trading_enabled = False
 last_auto_trade = None
+# Jeden zegar serwera dla harmonogramu i wygasania cache świec – jak w auto_trader.main,
+# żeby wybudzenie po zamknięciu świecy nie dostało z cache poprzedniej świecy.
+server_clock = ServerClock()
+scheduler = build_scheduler(config, server_clock)
+kline_cache.clock = server_clock.time
 
 def get_client():
     api_key = config.get("BINANCE_API_KEY")
@@ -33,13 +40,10 @@ def get_client():
     return Client(api_key, api_secret)
 
 def fetch_price(symbol):
-    response = requests.get(
+    return http_client.get_json(
         "https://api.binance.com/api/v3/ticker/price",
         params={"symbol": symbol},
-        timeout=10,
     )
-    response.raise_for_status()
-    return response.json()
 
 def send_telegram_message(message):
     """Wysyła powiadomienie do Telegrama z zapobieganiem spamowi"""
@@ -66,13 +70,20 @@ def handle_message(msg):
             "/price [SYMBOL] - kurs z Binance (np. /price BTCUSDT)\n"
             "/signal [SYMBOL] - sygnał z realnych danych (np. /signal ETHUSDT)\n"
             "/rules - pokaż aktywne warunki sygnału\n"
+            "/latency - czasy odpowiedzi API per endpoint\n"
             "/autotrade on|off|status - sterowanie auto-tradingiem\n"
             "/trade once - jednorazowe wykonanie auto-tradera"
         )
     elif text == "/status":
         status = "włączony" if auto_trading_enabled else "wyłączony"
         last_run = last_auto_trade.isoformat() if last_auto_trade else "brak"
-        send_telegram_message(f"✅ RLdC Trading Bot działa! Auto-trading: {status}. Ostatnie uruchomienie: {last_run}")
+        cache_stats = kline_cache.stats()
+        schedule = scheduler.format_stats() if scheduler is not None else "co LOOP_SECONDS"
+        send_telegram_message(
+            f"✅ RLdC Trading Bot działa! Auto-trading: {status}. Ostatnie uruchomienie: {last_run}\n"
+            f"Cache świec: trafienia={cache_stats.hits}, pobrania={cache_stats.misses}\n"
+            f"Harmonogram: {schedule}"
+        )
     elif text.startswith("/price"):
         symbol = text.split(" ")[1] if len(text.split(" ")) > 1 else "BTCUSDT"
         try:
@@ -99,6 +110,13 @@ def handle_message(msg):
     elif text == "/rules":
         rules = json.dumps(config.get("TRADING_RULES", {}), indent=2)
         send_telegram_message(f"⚙️ Aktywne warunki sygnału:\n{rules}")
+    elif text == "/latency":
+        stats = http_client.format_stats() or "brak zapytań"
+        budget = rate_limiter.budget()
+        send_telegram_message(
+            f"⏱️ Czasy odpowiedzi API:\n{stats}\n"
+            f"Budżet wagi: {budget.available:.0f}/{budget.capacity:.0f}, pauza: {budget.paused_for:.0f}s"
+        )
     elif text.startswith("/autotrade"):
         parts = text.split(" ")
         action = parts[1] if len(parts) > 1 else "status"
@@ -126,6 +144,7 @@ def handle_message(msg):
             "/price [SYMBOL] - kurs z Binance\n"
             "/signal [SYMBOL] - sygnał z realnych danych\n"
             "/rules - pokaż aktywne warunki sygnału\n"
+            "/latency - czasy odpowiedzi API per endpoint\n"
             "/autotrade on|off|status - sterowanie auto-tradingiem\n"
             "/trade once - jednorazowe wykonanie auto-tradera"
         )
@@ -136,11 +155,13 @@ print("✅ Telegram AI Bot działa!")
 send_telegram_message("🚀 RLdC Trading Bot aktywowany!")
 
 while True:
+    due = scheduler.wait() if scheduler is not None else None
     if auto_trading_enabled:
         try:
             client = get_client()
-            run_once(client, config)
+            run_once(client, config, symbols=due)
             last_auto_trade = datetime.now(timezone.utc)
         except Exception as exc:
             send_telegram_message(f"❌ Błąd auto-tradera: {exc}")
-    time.sleep(config.get("AUTO_TRADING", {}).get("LOOP_SECONDS", 60))
+    if scheduler is None:
+        time.sleep(config.get("AUTO_TRADING", {}).get("LOOP_SECONDS", 60))
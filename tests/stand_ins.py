@@ -0,0 +1,235 @@
+"""Lokalne zamienniki serwerów Binance do testów (tylko biblioteka standardowa)."""
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def wait_until(condition: Callable[[], bool], timeout: float = 5.0, interval: float = 0.01) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(interval)
+    return condition()
+
+
+class LocalWebSocketServer:
+    """Minimalny serwer WebSocket (RFC 6455) na 127.0.0.1.
+
+    Przyjmuje dowolną ścieżkę (zapamiętuje ją w `paths`), wysyła ramki
+    tekstowe do wszystkich klientów (`send_json`) i potrafi zerwać
+    połączenia bez ramki zamknięcia (`drop_clients`), żeby sprawdzić
+    ponowne łączenie.
+    """
+
+    def __init__(self):
+        self._server = socket.create_server(("127.0.0.1", 0))
+        self.port = self._server.getsockname()[1]
+        self.paths: List[str] = []
+        self._clients: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._accept_loop, name="ws-stand-in", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    @property
+    def connections(self) -> int:
+        with self._lock:
+            return len(self.paths)
+
+    def start(self) -> "LocalWebSocketServer":
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._closed = True
+        self._thread.join(timeout=1)
+        self._server.close()
+        self.drop_clients()
+
+    def drop_clients(self) -> None:
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.close()
+
+    def send_json(self, message) -> None:
+        frame = self._frame(0x1, json.dumps(message).encode())
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.sendall(frame)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _frame(opcode: int, payload: bytes) -> bytes:
+        header = bytes([0x80 | opcode])
+        if len(payload) < 126:
+            header += bytes([len(payload)])
+        elif len(payload) < 1 << 16:
+            header += bytes([126]) + struct.pack("!H", len(payload))
+        else:
+            header += bytes([127]) + struct.pack("!Q", len(payload))
+        return header + payload
+
+    def _accept_loop(self) -> None:
+        self._server.settimeout(0.05)
+        while not self._closed:
+            try:
+                client, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            client.settimeout(None)
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client: socket.socket) -> None:
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = client.recv(4096)
+            if not chunk:
+                client.close()
+                return
+            request += chunk
+        lines = request.decode().split("\r\n")
+        path = lines[0].split(" ")[1]
+        headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+        key = headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        client.sendall(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode()
+        )
+        with self._lock:
+            self._clients.append(client)
+            self.paths.append(path)
+        self._read_frames(client)
+
+    def _read_frames(self, client: socket.socket) -> None:
+        try:
+            while True:
+                head = self._recv_exact(client, 2)
+                if head is None:
+                    return
+                opcode, length = head[0] & 0x0F, head[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack("!H", self._recv_exact(client, 2))[0]
+                elif length == 127:
+                    length = struct.unpack("!Q", self._recv_exact(client, 8))[0]
+                mask = self._recv_exact(client, 4) if head[1] & 0x80 else b"\0\0\0\0"
+                data = self._recv_exact(client, length) or b""
+                payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(data))
+                if opcode == 0x8:
+                    client.sendall(self._frame(0x8, payload[:2]))
+                    return
+                if opcode == 0x9:
+                    client.sendall(self._frame(0xA, payload))
+        except OSError:
+            return
+        finally:
+            with self._lock:
+                if client in self._clients:
+                    self._clients.remove(client)
+            client.close()
+
+    @staticmethod
+    def _recv_exact(client: socket.socket, size: int) -> Optional[bytes]:
+        data = b""
+        while len(data) < size:
+            chunk = client.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+
+class LocalRestServer:
+    """Minimalny serwer `/api/v3/klines` na 127.0.0.1.
+
+    Świece są listą wierszy w formacie Binance (`candles`), a odpowiedź
+    respektuje `startTime`, `endTime` i `limit`. Parametry każdego
+    zapytania trafiają do `requests`. `fail_after` – po tylu zapytaniach
+    serwer odpowiada 500 (przerwane pobieranie), `overlap` – strona zaczyna
+    się tyle świec przed `startTime` (nachodzące na siebie strony).
+    """
+
+    def __init__(self, candles: Optional[List[List]] = None):
+        self.candles: List[List] = list(candles or [])
+        self.requests: List[Dict[str, str]] = []
+        self.fail_after: Optional[int] = None
+        self.overlap = 0
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                params = dict(parse_qsl(parts.query))
+                if parts.path != "/api/v3/klines":
+                    self.send_error(404)
+                    return
+                rows = stand_in._klines(params)
+                if rows is None:
+                    self.send_error(500)
+                    return
+                body = json.dumps(rows).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="rest-stand-in", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "LocalRestServer":
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=1)
+
+    def _klines(self, params: Dict[str, str]) -> Optional[List[List]]:
+        start = int(params.get("startTime", 0))
+        end = int(params.get("endTime", 2**63 - 1))
+        limit = int(params.get("limit", 500))
+        with self._lock:
+            self.requests.append(params)
+            if self.fail_after is not None and len(self.requests) > self.fail_after:
+                return None
+            candles = sorted(self.candles)
+        first = next((i for i, row in enumerate(candles) if row[0] >= start), len(candles))
+        rows = [row for row in candles[max(first - self.overlap, 0) :] if row[0] <= end]
+        return rows[:limit]
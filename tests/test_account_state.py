@@ -0,0 +1,57 @@
+from decimal import Decimal
+
+from trading.account_state import AccountState
+
+SUBMITTED_MS = 1_000
+FILLED_MS = 1_050
+RETURNED_MS = 1_200
+
+
+class Clock:
+    def __init__(self, now_ms):
+        self.now_ms = now_ms
+
+    def __call__(self):
+        return self.now_ms
+
+
+def account_with(usdt):
+    clock = Clock(900)
+    account = AccountState(clock=clock)
+    account.load_snapshot({"updateTime": 900, "balances": [{"asset": "USDT", "free": usdt, "locked": "0"}]})
+    return account, clock
+
+
+def position(updated_ms, usdt):
+    return {"e": "outboundAccountPosition", "E": updated_ms, "u": updated_ms, "B": [{"a": "USDT", "f": usdt, "l": "0"}]}
+
+
+def test_fill_event_after_reserve_releases_reservation():
+    account, clock = account_with("100")
+    clock.now_ms = RETURNED_MS
+    account.reserve("USDT", Decimal("40"), reserved_ms=SUBMITTED_MS)
+    assert account.free("USDT") == Decimal("60")
+
+    # Giełda przysyła saldo po wypełnieniu z `u` sprzed powrotu `submit_order`.
+    account.apply_event(position(FILLED_MS, "60"))
+
+    assert account.free("USDT") == Decimal("60")
+
+
+def test_fill_event_before_reserve_skips_reservation():
+    account, clock = account_with("100")
+    # Zdarzenie nałożone w wątku strumienia, zanim pętla zdążyła zarezerwować.
+    account.apply_event(position(FILLED_MS, "60"))
+    clock.now_ms = RETURNED_MS
+    account.reserve("USDT", Decimal("40"), reserved_ms=SUBMITTED_MS)
+
+    assert account.free("USDT") == Decimal("60")
+
+
+def test_older_event_keeps_reservation():
+    account, _ = account_with("100")
+    account.reserve("USDT", Decimal("40"), reserved_ms=SUBMITTED_MS)
+
+    account.apply_event(position(SUBMITTED_MS - 10, "100"))
+
+    assert account.free("USDT") == Decimal("60")
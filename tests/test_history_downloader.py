@@ -0,0 +1,132 @@
+import pytest
+
+from stand_ins import LocalRestServer
+from trading.history_downloader import HistoryDownloader
+from trading.http_client import RestClient
+from trading.market_store import TIME_COLUMN, MarketStore
+
+MINUTE = 60_000
+NOW_MS = 1_700_000_040_000 // MINUTE * MINUTE + 30_000  # w połowie bieżącej świecy
+CURRENT = NOW_MS // MINUTE * MINUTE
+START = CURRENT - 50 * MINUTE
+
+
+def candle(open_time):
+    price = str(100.0 + (open_time - START) / MINUTE)
+    return [open_time, price, price, price, price, "1.0", open_time + MINUTE - 1, "100.0", 10, "0", "0", "0"]
+
+
+def candles(start, end, skip=()):
+    return [candle(open_time) for open_time in range(start, end, MINUTE) if open_time not in skip]
+
+
+@pytest.fixture
+def server():
+    server = LocalRestServer().start()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MarketStore(str(tmp_path))
+
+
+@pytest.fixture
+def downloader(server, store):
+    return HistoryDownloader(
+        store=store,
+        client=RestClient(retries=0),
+        base_url=server.url,
+        concurrency=1,
+        page_limit=20,
+        clock=lambda: NOW_MS / 1000,
+    )
+
+
+def stored_times(store):
+    return list(store.read_arrays("BTCUSDT", "1m", columns=[TIME_COLUMN])[TIME_COLUMN])
+
+
+def test_downloads_closed_candles_in_pages_and_resumes(server, store, downloader):
+    server.candles = candles(START, CURRENT + MINUTE)
+
+    result = downloader.download_symbol("BTCUSDT", "1m", start=START)
+
+    assert result.error is None
+    assert result.rows == 50
+    assert result.requests == 3
+    # Bieżąca (niezamknięta) świeca nie jest pobierana.
+    assert stored_times(store) == list(range(START, CURRENT, MINUTE))
+
+    server.requests.clear()
+    again = downloader.download_symbol("BTCUSDT", "1m")
+    assert again.requests == 0
+    assert again.rows == 0
+
+
+def test_exchange_gap_is_remembered(server, store, downloader):
+    missing = {START + 10 * MINUTE, START + 11 * MINUTE}
+    server.candles = candles(START, CURRENT, skip=missing)
+
+    result = downloader.download_symbol("BTCUSDT", "1m", start=START)
+
+    assert result.exchange_gaps == 1
+    assert downloader.known_gaps("BTCUSDT", "1m") == [(START + 10 * MINUTE, START + 12 * MINUTE)]
+    assert downloader.missing_ranges("BTCUSDT", "1m", START) == []
+
+
+def test_unpublished_recent_candles_are_fetched_later(server, store, downloader):
+    # Giełda nie opublikowała jeszcze dwóch ostatnich zamkniętych świec.
+    server.candles = candles(START, CURRENT - 2 * MINUTE)
+
+    result = downloader.download_symbol("BTCUSDT", "1m", start=START)
+
+    assert result.exchange_gaps == 0
+    assert downloader.known_gaps("BTCUSDT", "1m") == []
+    assert downloader.missing_ranges("BTCUSDT", "1m", START) == [(CURRENT - 2 * MINUTE, CURRENT)]
+
+    server.candles = candles(START, CURRENT)
+    server.requests.clear()
+    again = downloader.download_symbol("BTCUSDT", "1m")
+
+    assert again.rows == 2
+    assert [request["startTime"] for request in server.requests] == [str(CURRENT - 2 * MINUTE)]
+    assert stored_times(store) == list(range(START, CURRENT, MINUTE))
+
+
+def test_only_settled_part_of_tail_gap_is_remembered(server, store, downloader):
+    server.candles = candles(START, CURRENT - 10 * MINUTE)
+
+    downloader.download_symbol("BTCUSDT", "1m", start=START)
+
+    settled = downloader.settled_end_ms("1m")
+    assert settled == CURRENT - 3 * MINUTE
+    assert downloader.known_gaps("BTCUSDT", "1m") == [(CURRENT - 10 * MINUTE, settled)]
+    assert downloader.missing_ranges("BTCUSDT", "1m", START) == [(settled, CURRENT)]
+
+
+def test_resumes_after_interrupted_download_without_duplicates(server, store, downloader):
+    server.candles = candles(START, CURRENT)
+    server.overlap = 2
+    server.fail_after = 2
+    downloader.flush_rows = 10
+
+    interrupted = downloader.download_symbol("BTCUSDT", "1m", start=START)
+
+    assert interrupted.error is not None
+    # Druga strona zaczyna się dwie świece przed kursorem – zapisane są tylko nowe.
+    assert interrupted.requests == 2
+    assert stored_times(store) == list(range(START, START + 38 * MINUTE, MINUTE))
+
+    server.fail_after = None
+    server.requests.clear()
+    resumed = downloader.download_symbol("BTCUSDT", "1m")
+
+    assert resumed.error is None
+    # Tylko brakujący ogon: 12 świec, jedna strona od pierwszej brakującej.
+    assert [request["startTime"] for request in server.requests] == [str(START + 38 * MINUTE)]
+    times = stored_times(store)
+    assert times == list(range(START, CURRENT, MINUTE))
+    assert len(set(times)) == len(times)
+    assert downloader.known_gaps("BTCUSDT", "1m") == []
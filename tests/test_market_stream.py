@@ -0,0 +1,127 @@
+import threading
+
+import pytest
+
+from stand_ins import LocalWebSocketServer, wait_until
+from trading import market_stream
+from trading.market_stream import MarketStream
+from trading.order_book import OrderBookRegistry
+
+
+def kline(open_time, close, volume=1.0):
+    return {"open_time": open_time, "open": close, "high": close, "low": close, "close": close, "volume": volume}
+
+
+def kline_message(symbol, open_time, close):
+    payload = {"t": open_time, "o": close, "h": close, "l": close, "c": close, "v": "1.0"}
+    return {"stream": f"{symbol.lower()}@kline_1m", "data": {"e": "kline", "s": symbol, "k": payload}}
+
+
+def depth_message(symbol, first_id, final_id, bids=(), asks=()):
+    data = {"e": "depthUpdate", "s": symbol, "U": first_id, "u": final_id, "b": list(bids), "a": list(asks)}
+    return {"stream": f"{symbol.lower()}@depth@100ms", "data": data}
+
+
+class FakeRest:
+    """Świece i snapshoty order booka zamiast zapytań REST."""
+
+    def __init__(self):
+        self.kline_calls = []
+        self.snapshot_calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self.snapshot_id = 100
+
+    def fetch_klines(self, symbol, interval, limit, use_cache=True):
+        self.kline_calls.append((symbol, threading.current_thread().name))
+        self.release.wait(5)
+        return [kline(i * 60_000, 100.0 + i) for i in range(5)]
+
+    def snapshot(self, symbol, limit):
+        self.snapshot_calls.append(symbol)
+        return {"lastUpdateId": self.snapshot_id, "bids": [], "asks": []}
+
+
+@pytest.fixture
+def server():
+    server = LocalWebSocketServer().start()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def rest(monkeypatch):
+    rest = FakeRest()
+    monkeypatch.setattr(market_stream, "fetch_klines", rest.fetch_klines)
+    return rest
+
+
+@pytest.fixture
+def stream(server, rest):
+    stream = MarketStream(
+        ["BTCUSDT"],
+        "1m",
+        base_url=server.url,
+        books=OrderBookRegistry(snapshot_loader=rest.snapshot),
+        reconnect_delay=0.05,
+        max_reconnect_delay=0.2,
+    )
+    stream.start(wait=5)
+    assert stream.wait_seeded(5)
+    yield stream
+    stream.stop()
+
+
+def test_subscribes_combined_streams(server, stream):
+    assert server.paths == ["/stream?streams=btcusdt@kline_1m/btcusdt@depth@100ms"]
+
+
+def test_kline_updates_seeded_candles(server, stream, rest):
+    assert rest.kline_calls == [("BTCUSDT", "market-stream-seed")]
+    server.send_json(kline_message("BTCUSDT", 4 * 60_000, 110.0))
+    server.send_json(kline_message("BTCUSDT", 5 * 60_000, 111.0))
+
+    assert wait_until(lambda: stream.klines("BTCUSDT", "1m")[-1]["open_time"] == 5 * 60_000)
+    candles = stream.klines("BTCUSDT", "1m")
+    assert [c["close"] for c in candles[-2:]] == [110.0, 111.0]
+    assert len(candles) == 6
+
+
+def test_depth_diff_builds_local_book(server, stream, rest):
+    server.send_json(depth_message("BTCUSDT", 99, 101, bids=[["100.0", "2"]], asks=[["101.0", "3"]]))
+
+    assert wait_until(lambda: stream.books.get("BTCUSDT") is not None)
+    assert rest.snapshot_calls == ["BTCUSDT"]
+    assert stream.serves_depth("BTCUSDT")
+    assert stream.orderbook_imbalance("BTCUSDT") == pytest.approx(-0.2)
+
+    server.send_json(depth_message("BTCUSDT", 102, 102, bids=[["100.0", "8"]]))
+    assert wait_until(lambda: stream.orderbook_imbalance("BTCUSDT") == pytest.approx(5 / 11))
+
+
+def test_reconnect_reseeds_off_the_callback_thread(server, stream, rest):
+    server.send_json(depth_message("BTCUSDT", 99, 101, bids=[["100.0", "2"]], asks=[["101.0", "3"]]))
+    assert wait_until(lambda: stream.books.get("BTCUSDT") is not None)
+
+    # Dociąganie świec po ponownym połączeniu wisi – wiadomości mimo to są obsługiwane.
+    rest.release.clear()
+    server.drop_clients()
+    assert wait_until(lambda: server.connections == 2)
+    assert wait_until(lambda: stream.connected)
+    assert stream.reconnects == 1
+    assert stream.books.get("BTCUSDT") is None
+    assert not stream.serves_klines("BTCUSDT", "1m")
+
+    rest.snapshot_id = 200
+    server.send_json(depth_message("BTCUSDT", 200, 201, asks=[["101.0", "1"]]))
+    server.send_json(kline_message("BTCUSDT", 5 * 60_000, 120.0))
+    assert wait_until(lambda: stream.books.get("BTCUSDT") is not None)
+    assert stream.orderbook_imbalance("BTCUSDT") == pytest.approx(-1.0)
+
+    rest.release.set()
+    assert stream.wait_seeded(5)
+    assert rest.kline_calls[-1] == ("BTCUSDT", "market-stream-seed")
+    # Świeca ze strumienia nowsza niż pobrane z REST zostaje po dociągnięciu.
+    candles = stream.klines("BTCUSDT", "1m")
+    assert candles[-1]["open_time"] == 5 * 60_000
+    assert candles[-1]["close"] == 120.0
@@ -0,0 +1,242 @@
+import json
+import threading
+import time
+from decimal import Decimal
+from typing import Callable, Dict, Optional
+
+import websocket
+
+from trading.market_stream import BINANCE_STREAM_URL
+
+LISTEN_KEY_KEEPALIVE_SECONDS = 30 * 60
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class AccountState:
+    """Lokalny stan sald konta.
+
+    Salda pochodzą z jednego snapshotu `get_account` na pętlę albo – gdy
+    działa `UserDataStream` – są utrzymywane na bieżąco zdarzeniami
+    `outboundAccountPosition`/`balanceUpdate`. Zlecenia złożone w trakcie
+    pętli są rezerwowane lokalnie (`reserve()`), więc kolejne symbole widzą
+    już pomniejszone wolne saldo, zanim giełda przyśle aktualizację.
+
+    Rezerwacje są znakowane czasem z `clock` (ms) i porównywane z czasem `u`
+    zdarzeń giełdy – przy strumieniu user data należy podać zegar serwera
+    (`ServerClock.now_ms`), inaczej przesunięcie lokalnego zegara zwalnia
+    rezerwacje za wcześnie albo trzyma je za długo. Czas rezerwacji to
+    chwila tuż przed wysłaniem zlecenia (`reserved_ms`), bo zdarzenie
+    o wypełnieniu może mieć wcześniejsze `u` niż moment powrotu z REST,
+    a nawet zostać nałożone przed `reserve()` – wtedy rezerwacja jest
+    pomijana, bo saldo już uwzględnia zlecenie.
+    """
+
+    def __init__(self, clock: Callable[[], int] = _now_ms):
+        self.clock = clock
+        self._free: Dict[str, Decimal] = {}
+        self._locked: Dict[str, Decimal] = {}
+        # asset -> [(czas rezerwacji w ms, kwota)]
+        self._reserved: Dict[str, list] = {}
+        self._updated_ms: Optional[int] = None
+        # asset -> czas ostatniego salda z giełdy (ms); pozostałe – czas snapshotu.
+        self._asset_updated_ms: Dict[str, int] = {}
+        self._snapshot_ms = 0
+        self._lock = threading.Lock()
+        self.snapshots = 0
+        self.events = 0
+        self.live = False
+
+    def load_snapshot(self, account: Dict) -> None:
+        """Ładuje odpowiedź `GET /api/v3/account` i czyści rezerwacje."""
+        with self._lock:
+            self._free = {b["asset"]: Decimal(b["free"]) for b in account.get("balances", [])}
+            self._locked = {b["asset"]: Decimal(b["locked"]) for b in account.get("balances", [])}
+            self._reserved.clear()
+            self._updated_ms = self._snapshot_ms = int(account.get("updateTime") or self.clock())
+            self._asset_updated_ms.clear()
+            self.snapshots += 1
+
+    @property
+    def loaded(self) -> bool:
+        return self._updated_ms is not None
+
+    def free(self, asset: str) -> Decimal:
+        with self._lock:
+            reserved = sum((amount for _, amount in self._reserved.get(asset, [])), Decimal("0"))
+            return max(self._free.get(asset, Decimal("0")) - reserved, Decimal("0"))
+
+    def locked(self, asset: str) -> Decimal:
+        with self._lock:
+            return self._locked.get(asset, Decimal("0"))
+
+    def reserve(self, asset: str, amount: Decimal, reserved_ms: Optional[int] = None) -> None:
+        """Rezerwuje `amount`; `reserved_ms` to czas z `clock` sprzed wysłania zlecenia."""
+        if amount <= 0:
+            return
+        if reserved_ms is None:
+            reserved_ms = self.clock()
+        with self._lock:
+            if self._asset_updated_ms.get(asset, self._snapshot_ms) >= reserved_ms:
+                return
+            self._reserved.setdefault(asset, []).append((reserved_ms, amount))
+
+    def clear_reservations(self) -> None:
+        with self._lock:
+            self._reserved.clear()
+
+    def apply_event(self, event: Dict) -> None:
+        """Nakłada zdarzenie ze strumienia user data."""
+        event_type = event.get("e")
+        if event_type == "outboundAccountPosition":
+            self._apply_position(event)
+        elif event_type == "balanceUpdate":
+            self._apply_balance_update(event)
+
+    def _apply_position(self, event: Dict) -> None:
+        updated_ms = int(event.get("u") or event.get("E") or self.clock())
+        with self._lock:
+            for balance in event.get("B", []):
+                asset = balance["a"]
+                self._free[asset] = Decimal(balance["f"])
+                self._locked[asset] = Decimal(balance["l"])
+                self._asset_updated_ms[asset] = updated_ms
+                # Saldo z giełdy uwzględnia już zlecenia złożone przed tą aktualizacją.
+                pending = [item for item in self._reserved.get(asset, []) if item[0] > updated_ms]
+                if pending:
+                    self._reserved[asset] = pending
+                else:
+                    self._reserved.pop(asset, None)
+            self._updated_ms = updated_ms
+            self.events += 1
+
+    def _apply_balance_update(self, event: Dict) -> None:
+        with self._lock:
+            asset = event["a"]
+            self._free[asset] = self._free.get(asset, Decimal("0")) + Decimal(event["d"])
+            self.events += 1
+
+
+class UserDataStream:
+    """Strumień user data Binance (listenKey) zasilający `AccountState`.
+
+    Po każdym (ponownym) połączeniu stan jest odświeżany snapshotem
+    (`snapshot_loader`), bo zdarzenia z czasu rozłączenia przepadły.
+    Klucz nasłuchu jest przedłużany co 30 minut.
+    """
+
+    def __init__(
+        self,
+        client,
+        account: AccountState,
+        snapshot_loader: Callable[[], Dict],
+        base_url: str = BINANCE_STREAM_URL,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        self.client = client
+        self.account = account
+        self.snapshot_loader = snapshot_loader
+        self.base_url = base_url.rstrip("/")
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.listen_key: Optional[str] = None
+        self._connected = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._keepalive_thread: Optional[threading.Thread] = None
+        self._ws: Optional[websocket.WebSocketApp] = None
+        self.reconnects = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def start(self, wait: float = 10.0) -> "UserDataStream":
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="user-data-stream", daemon=True)
+        self._thread.start()
+        self._keepalive_thread = threading.Thread(target=self._keepalive, name="listen-key-keepalive", daemon=True)
+        self._keepalive_thread.start()
+        self._connected.wait(wait)
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._ws is not None:
+            self._ws.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._set_live(False)
+        if self.listen_key is not None:
+            try:
+                self.client.stream_close(self.listen_key)
+            except Exception as exc:
+                print(f"❌ Nie udało się zamknąć listenKey: {exc}")
+            self.listen_key = None
+
+    def _set_live(self, live: bool) -> None:
+        if live:
+            self._connected.set()
+        else:
+            self._connected.clear()
+        self.account.live = live
+
+    def _run(self) -> None:
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            try:
+                self.listen_key = self.client.stream_get_listen_key()
+                self._ws = websocket.WebSocketApp(
+                    f"{self.base_url}/ws/{self.listen_key}",
+                    on_open=self._on_open,
+                    on_message=self._on_message,
+                    on_error=self._on_error,
+                    on_close=self._on_close,
+                )
+                self._ws.run_forever(ping_interval=60, ping_timeout=10)
+            except Exception as exc:
+                print(f"❌ Błąd strumienia konta: {exc}")
+            self._set_live(False)
+            if self._stopped.is_set():
+                break
+            if time.monotonic() - started > self.max_reconnect_delay:
+                delay = self.reconnect_delay
+            self.reconnects += 1
+            print(f"🔌 Strumień konta rozłączony, ponowne połączenie za {delay:.1f}s...")
+            self._stopped.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _keepalive(self) -> None:
+        while not self._stopped.wait(LISTEN_KEY_KEEPALIVE_SECONDS):
+            if self.listen_key is None:
+                continue
+            try:
+                self.client.stream_keepalive(self.listen_key)
+            except Exception as exc:
+                print(f"❌ Nie udało się przedłużyć listenKey: {exc}")
+
+    def _on_open(self, ws) -> None:
+        try:
+            self.account.load_snapshot(self.snapshot_loader())
+        except Exception as exc:
+            print(f"❌ Nie udało się pobrać stanu konta: {exc}")
+            ws.close()
+            return
+        self._set_live(True)
+
+    def _on_error(self, ws, error) -> None:
+        print(f"❌ Błąd strumienia konta: {error}")
+
+    def _on_close(self, ws, status_code, message) -> None:
+        self._set_live(False)
+
+    def _on_message(self, ws, raw: str) -> None:
+        event = json.loads(raw)
+        if event.get("e") == "listenKeyExpired":
+            ws.close()
+            return
+        self.account.apply_event(event)
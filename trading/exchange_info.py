@@ -0,0 +1,173 @@
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_DOWN
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+from trading.http_client import BINANCE_BASE_URL, http_client
+from trading.rate_limiter import PRIORITY_TRADING
+
+EXCHANGE_INFO_TTL_SECONDS = 6 * 3600
+FILTER_FAILURE_CODE = -1013
+
+
+class _StepQuantizer:
+    """Zaokrągla do wielokrotności kroku. Dla kroków będących potęgą 10
+    (typowe LOT_SIZE/tickSize Binance) to pojedyncze `Decimal.quantize`.
+
+    Wynik ma zawsze wykładnik <= 0, więc `str()` daje zapis dziesiętny
+    (`120`, nie `1.2E+2`) – w takiej postaci ilość trafia do Binance.
+    """
+
+    def __init__(self, step: Decimal):
+        self.step = step.normalize() if step > 0 else Decimal("0")
+        self.quantum = Decimal(1).scaleb(min(self.step.as_tuple().exponent, 0))
+        self.power_of_ten = self.step > 0 and self.step.as_tuple().digits == (1,) and self.step <= 1
+
+    def __call__(self, value: Decimal, rounding: str = ROUND_DOWN) -> Decimal:
+        if self.step == 0:
+            return value
+        if self.power_of_ten:
+            return value.quantize(self.quantum, rounding=rounding)
+        steps = (value / self.step).to_integral_value(rounding=rounding)
+        return (steps * self.step).quantize(self.quantum)
+
+
+def quantize_to_step(value: Decimal, step: Decimal, rounding: str = ROUND_DOWN) -> Decimal:
+    return _StepQuantizer(step)(value, rounding)
+
+
+@dataclass
+class SymbolFilters:
+    symbol: str
+    base_asset: str
+    quote_asset: str
+    step_size: Decimal
+    min_qty: Decimal
+    max_qty: Optional[Decimal]
+    tick_size: Decimal
+    min_price: Decimal
+    max_price: Optional[Decimal]
+    min_notional: Decimal
+    status: str = "TRADING"
+    _qty: _StepQuantizer = field(init=False, repr=False, compare=False)
+    _price: _StepQuantizer = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._qty = _StepQuantizer(self.step_size)
+        self._price = _StepQuantizer(self.tick_size)
+
+    def quantize_qty(self, quantity: Decimal) -> Decimal:
+        quantity = self._qty(quantity, ROUND_DOWN)
+        if self.max_qty is not None and self.max_qty > 0 and quantity > self.max_qty:
+            quantity = self._qty(self.max_qty, ROUND_DOWN)
+        return quantity
+
+    def quantize_price(self, price: Decimal, rounding: str = ROUND_DOWN) -> Decimal:
+        return self._price(price, rounding)
+
+    def meets_notional(self, quantity: Decimal, price: Decimal) -> bool:
+        return quantity * price >= self.min_notional
+
+
+def _decimal(value, default: str = "0") -> Decimal:
+    return Decimal(str(value)) if value not in (None, "") else Decimal(default)
+
+
+def parse_symbol_filters(info: Dict) -> SymbolFilters:
+    filters = {f["filterType"]: f for f in info.get("filters", [])}
+    lot_size = filters.get("LOT_SIZE")
+    if not lot_size:
+        raise ValueError(f"Brak filtra LOT_SIZE dla {info.get('symbol')}.")
+    price_filter = filters.get("PRICE_FILTER", {})
+    # Binance zastąpił MIN_NOTIONAL filtrem NOTIONAL; obsługujemy oba.
+    notional = filters.get("NOTIONAL") or filters.get("MIN_NOTIONAL") or {}
+    max_qty = _decimal(lot_size.get("maxQty"))
+    max_price = _decimal(price_filter.get("maxPrice"))
+    return SymbolFilters(
+        symbol=info["symbol"],
+        base_asset=info.get("baseAsset", ""),
+        quote_asset=info.get("quoteAsset", ""),
+        step_size=_decimal(lot_size["stepSize"]),
+        min_qty=_decimal(lot_size["minQty"]),
+        max_qty=max_qty if max_qty > 0 else None,
+        tick_size=_decimal(price_filter.get("tickSize")),
+        min_price=_decimal(price_filter.get("minPrice")),
+        max_price=max_price if max_price > 0 else None,
+        min_notional=_decimal(notional.get("minNotional")),
+        status=info.get("status", "TRADING"),
+    )
+
+
+def _load_exchange_info() -> Dict:
+    return http_client.get_json(f"{BINANCE_BASE_URL}/api/v3/exchangeInfo", priority=PRIORITY_TRADING)
+
+
+class ExchangeInfoCache:
+    """Cache filtrów wszystkich symboli z jednego zbiorczego `exchangeInfo`.
+
+    Dane są odświeżane po `ttl_seconds` albo po odrzuceniu zlecenia przez
+    filtr giełdy (`invalidate()`, kod -1013).
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Dict] = _load_exchange_info,
+        ttl_seconds: float = EXCHANGE_INFO_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._filters: Dict[str, SymbolFilters] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = Lock()
+        self.refreshes = 0
+
+    def _expired(self) -> bool:
+        return self._loaded_at is None or self.clock() - self._loaded_at >= self.ttl_seconds
+
+    def refresh(self) -> None:
+        data = self.loader()
+        filters = {}
+        for info in data.get("symbols", []):
+            try:
+                filters[info["symbol"]] = parse_symbol_filters(info)
+            except ValueError:
+                continue
+        self._filters = filters
+        self._loaded_at = self.clock()
+        self.refreshes += 1
+
+    def _ensure_loaded(self) -> None:
+        if self._expired():
+            with self._lock:
+                if self._expired():
+                    self.refresh()
+
+    def get(self, symbol: str) -> SymbolFilters:
+        self._ensure_loaded()
+        filters = self._filters.get(symbol)
+        if filters is None:
+            raise ValueError(f"Nie znaleziono informacji o symbolu {symbol}.")
+        return filters
+
+    def symbols(self, quote_asset: Optional[str] = None) -> List[str]:
+        """Symbole w stanie TRADING, opcjonalnie tylko z daną walutą kwotowania."""
+        self._ensure_loaded()
+        return sorted(
+            symbol
+            for symbol, filters in self._filters.items()
+            if filters.status == "TRADING" and (quote_asset is None or filters.quote_asset == quote_asset)
+        )
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def handle_order_error(self, exc: Exception) -> None:
+        if getattr(exc, "code", None) == FILTER_FAILURE_CODE:
+            self.invalidate()
+
+
+exchange_info = ExchangeInfoCache()
@@ -0,0 +1,299 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trading.http_client import BINANCE_BASE_URL, RestClient, http_client
+from trading.kline_cache import candle_open_ms, interval_to_ms
+from trading.market_store import TIME_COLUMN, MarketStore, market_store
+from trading.rate_limiter import PRIORITY_ANALYTICS
+
+KLINES_PAGE_LIMIT = 1000
+FLUSH_ROWS = 100_000
+DEFAULT_HISTORY_DAYS = 30
+KNOWN_GAPS_FILE = "known_gaps.json"
+# Tyle ostatnich świec przed `now` może jeszcze nie być opublikowanych (albo
+# lokalny zegar się spieszy) – braki w nich nie są zapisywane jako znane luki.
+UNSETTLED_CANDLES = 3
+
+KLINE_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume", "quote_volume", "trades"]
+# Pozycje pól w wierszu `/api/v3/klines` odpowiadające `KLINE_COLUMNS`.
+_KLINE_FIELDS = [0, 1, 2, 3, 4, 5, 7, 8]
+
+Range = Tuple[int, int]
+
+
+def klines_to_frame(rows: List[List]) -> pd.DataFrame:
+    """Wiersze z `/api/v3/klines` jako ramka z kolumnami `KLINE_COLUMNS`."""
+    if not rows:
+        return pd.DataFrame({column: [] for column in KLINE_COLUMNS})
+    frame = pd.DataFrame([[row[field] for field in _KLINE_FIELDS] for row in rows], columns=KLINE_COLUMNS)
+    frame[["open", "high", "low", "close", "volume", "quote_volume"]] = frame[
+        ["open", "high", "low", "close", "volume", "quote_volume"]
+    ].astype(float)
+    frame[["timestamp", "trades"]] = frame[["timestamp", "trades"]].astype(np.int64)
+    return frame
+
+
+def find_gaps(timestamps: np.ndarray, step: int, start: int, end: int) -> List[Range]:
+    """Brakujące świece w `[start, end)` jako zakresy `[od, do)` (ms).
+
+    `timestamps` to posortowane czasy otwarcia świec o kroku `step`.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    timestamps = timestamps[(timestamps >= start) & (timestamps < end)]
+    if not len(timestamps):
+        return [(start, end)] if start < end else []
+    gaps: List[Range] = []
+    if timestamps[0] > start:
+        gaps.append((start, int(timestamps[0])))
+    holes = np.flatnonzero(np.diff(timestamps) > step)
+    gaps.extend((int(timestamps[i]) + step, int(timestamps[i + 1])) for i in holes)
+    if timestamps[-1] + step < end:
+        gaps.append((int(timestamps[-1]) + step, end))
+    return gaps
+
+
+def subtract_ranges(ranges: List[Range], known: List[Range]) -> List[Range]:
+    """`ranges` bez części pokrytych przez `known` (oba posortowane)."""
+    result: List[Range] = []
+    for start, end in ranges:
+        for known_start, known_end in known:
+            if known_end <= start or known_start >= end:
+                continue
+            if known_start > start:
+                result.append((start, known_start))
+            start = max(start, known_end)
+            if start >= end:
+                break
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+def merge_ranges(ranges: Iterable[Range]) -> List[Range]:
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+@dataclass
+class DownloadResult:
+    symbol: str
+    interval: str
+    rows: int = 0
+    requests: int = 0
+    ranges: int = 0
+    duplicates: int = 0
+    exchange_gaps: int = 0
+    elapsed_seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+class HistoryDownloader:
+    """Przyrostowe pobieranie historii świec z `/api/v3/klines` do `MarketStore`.
+
+    Dla każdego symbolu liczone są brakujące zakresy zamkniętych świec
+    (początek, luki w środku, koniec) i tylko one są pobierane stronami po
+    `startTime`. Dane trafiają do magazynu co `flush_rows` wierszy, więc
+    przerwane pobieranie wznawia się od ostatniego zapisu. Luki, których
+    nie ma też na giełdzie (przerwy w notowaniach, okres przed debiutem
+    pary), są zapamiętywane w `known_gaps.json` i nie są pobierane ponownie –
+    poza ostatnimi `unsettled_candles` świecami przed bieżącym czasem, które
+    giełda mogła jeszcze nie opublikować; te są sprawdzane przy kolejnym
+    uruchomieniu.
+
+    Symbole są pobierane równolegle (`concurrency` wątków), a wszystkie
+    zapytania przechodzą przez limiter wagi klienta REST.
+    """
+
+    def __init__(
+        self,
+        store: Optional[MarketStore] = None,
+        client: Optional[RestClient] = None,
+        base_url: str = BINANCE_BASE_URL,
+        concurrency: int = 4,
+        page_limit: int = KLINES_PAGE_LIMIT,
+        flush_rows: int = FLUSH_ROWS,
+        priority: int = PRIORITY_ANALYTICS,
+        clock: Callable[[], float] = time.time,
+        unsettled_candles: int = UNSETTLED_CANDLES,
+    ):
+        self.store = store or market_store
+        self.client = client or http_client
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = max(int(concurrency), 1)
+        self.page_limit = int(page_limit)
+        self.flush_rows = int(flush_rows)
+        self.priority = priority
+        self.clock = clock
+        self.unsettled_candles = max(int(unsettled_candles), 0)
+
+    def _known_gaps_path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.store.path(symbol, interval), KNOWN_GAPS_FILE)
+
+    def known_gaps(self, symbol: str, interval: str) -> List[Range]:
+        path = self._known_gaps_path(symbol, interval)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as gaps_file:
+            return [(int(start), int(end)) for start, end in json.load(gaps_file)]
+
+    def _save_known_gaps(self, symbol: str, interval: str, gaps: List[Range]) -> None:
+        path = self._known_gaps_path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as gaps_file:
+            json.dump([list(gap) for gap in gaps], gaps_file)
+        os.replace(temporary, path)
+
+    def last_closed_open_ms(self, interval: str) -> int:
+        """Koniec (wyłączny) zakresu zamkniętych świec: otwarcie bieżącej świecy."""
+        return candle_open_ms(int(self.clock() * 1000), interval)
+
+    def settled_end_ms(self, interval: str) -> int:
+        """Koniec (wyłączny) zakresu, w którym brak świecy jest trwałą luką giełdy."""
+        return self.last_closed_open_ms(interval) - self.unsettled_candles * interval_to_ms(interval)
+
+    def default_start(self, symbol: str, interval: str, days: int = DEFAULT_HISTORY_DAYS) -> int:
+        """Początek dotychczas pobranej historii (pierwsza świeca albo znana
+        luka przed nią), a dla nowego symbolu – `days` dni wstecz."""
+        starts = [start for start, _ in self.known_gaps(symbol, interval)[:1]]
+        if self.store.has(symbol, interval):
+            first = self.store.read_arrays(symbol, interval, columns=[TIME_COLUMN])[TIME_COLUMN]
+            starts.extend(int(value) for value in first[:1])
+        if starts:
+            return min(starts)
+        return candle_open_ms(int(self.clock() * 1000) - days * 86_400_000, interval)
+
+    def missing_ranges(self, symbol: str, interval: str, start: int, end: Optional[int] = None) -> List[Range]:
+        step = interval_to_ms(interval)
+        start = candle_open_ms(start, interval)
+        end = min(end, self.last_closed_open_ms(interval)) if end is not None else self.last_closed_open_ms(interval)
+        stored = self.store.read_arrays(symbol, interval, start, end, columns=[TIME_COLUMN]).get(TIME_COLUMN)
+        gaps = find_gaps(stored if stored is not None else np.empty(0, dtype=np.int64), step, start, end)
+        return subtract_ranges(gaps, self.known_gaps(symbol, interval))
+
+    def _fetch_page(self, symbol: str, interval: str, start: int, end: int) -> List[List]:
+        return self.client.get_json(
+            f"{self.base_url}/api/v3/klines",
+            params={
+                "symbol": symbol,
+                "interval": interval,
+                "startTime": start,
+                "endTime": end - 1,
+                "limit": self.page_limit,
+            },
+            priority=self.priority,
+        )
+
+    def download_symbol(
+        self,
+        symbol: str,
+        interval: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        days: int = DEFAULT_HISTORY_DAYS,
+    ) -> DownloadResult:
+        symbol = symbol.upper()
+        step = interval_to_ms(interval)
+        result = DownloadResult(symbol=symbol, interval=interval)
+        started = time.perf_counter()
+        if start is None:
+            start = self.default_start(symbol, interval, days)
+        ranges = self.missing_ranges(symbol, interval, start, end)
+        result.ranges = len(ranges)
+        settled_end = self.settled_end_ms(interval)
+
+        pending: List[pd.DataFrame] = []
+        pending_rows = 0
+        new_gaps: List[Range] = []
+
+        def flush() -> None:
+            nonlocal pending, pending_rows
+            if pending:
+                frame = pd.concat(pending, ignore_index=True)
+                before = len(frame)
+                frame = frame.drop_duplicates(TIME_COLUMN, keep="last")
+                result.duplicates += before - len(frame)
+                self.store.write(symbol, interval, frame)
+                result.rows += len(frame)
+            if new_gaps:
+                # Luki zapisujemy dopiero razem z danymi, które je otaczają.
+                self._save_known_gaps(symbol, interval, merge_ranges(self.known_gaps(symbol, interval) + new_gaps))
+                new_gaps.clear()
+            pending, pending_rows = [], 0
+
+        try:
+            for range_start, range_end in ranges:
+                cursor = range_start
+                while cursor < range_end:
+                    rows = self._fetch_page(symbol, interval, cursor, range_end)
+                    result.requests += 1
+                    page = klines_to_frame(rows)
+                    page = page[(page[TIME_COLUMN] >= cursor) & (page[TIME_COLUMN] < range_end)]
+                    # Pełna strona kończy się na ostatniej świecy, niepełna – na końcu zakresu.
+                    covered_end = range_end
+                    if len(rows) >= self.page_limit and len(page):
+                        covered_end = int(page[TIME_COLUMN].iloc[-1]) + step
+                    holes = [
+                        (hole_start, min(hole_end, settled_end))
+                        for hole_start, hole_end in find_gaps(page[TIME_COLUMN].to_numpy(), step, cursor, covered_end)
+                        if hole_start < settled_end
+                    ]
+                    result.exchange_gaps += len(holes)
+                    new_gaps.extend(holes)
+                    if len(page):
+                        pending.append(page)
+                        pending_rows += len(page)
+                    cursor = covered_end
+                    if pending_rows >= self.flush_rows:
+                        flush()
+            flush()
+        except Exception as exc:
+            # Pobrane strony zostają w magazynie – kolejne uruchomienie zacznie od luki.
+            flush()
+            result.error = str(exc)
+        result.elapsed_seconds = time.perf_counter() - started
+        return result
+
+    def download(
+        self,
+        symbols: Iterable[str],
+        interval: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        days: int = DEFAULT_HISTORY_DAYS,
+    ) -> List[DownloadResult]:
+        """Pobiera symbole równolegle. Bez `start` każdy symbol zaczyna od
+        swojej pierwszej zapisanej świecy (albo `days` dni wstecz)."""
+        symbols = [symbol.upper() for symbol in symbols]
+        if self.concurrency <= 1 or len(symbols) < 2:
+            return [self.download_symbol(symbol, interval, start, end, days) for symbol in symbols]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(symbols))) as executor:
+            return list(
+                executor.map(lambda symbol: self.download_symbol(symbol, interval, start, end, days), symbols)
+            )
+
+
+def export_csv(symbol: str, interval: str, file_name: Optional[str] = None, store: Optional[MarketStore] = None) -> int:
+    """Zapisuje świece z magazynu jako `market_data_<SYMBOL>.csv`. Zwraca liczbę wierszy."""
+    store = store or market_store
+    frame = store.read(symbol, interval)
+    ordered = [column for column in KLINE_COLUMNS if column in frame]
+    frame = frame[ordered + [column for column in frame if column not in ordered]]
+    frame.to_csv(file_name or f"market_data_{symbol.upper()}.csv", index=False)
+    return len(frame)
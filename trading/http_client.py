@@ -0,0 +1,141 @@
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from trading.rate_limiter import PRIORITY_ANALYTICS, WeightScheduler, endpoint_weight, rate_limiter
+
+BINANCE_BASE_URL = "https://api.binance.com"
+DEFAULT_TIMEOUT = 10
+POOL_HOSTS = 10
+POOL_CONNECTIONS_PER_HOST = 32
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+
+
+@dataclass
+class EndpointStats:
+    count: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_ms: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+
+class RestClient:
+    """Współdzielony klient REST: jedna sesja `requests` z pulą połączeń
+    keep-alive, limitem połączeń na host, gzip, domyślnym timeoutem
+    i ponawianiem z backoffem (błędy połączenia i 5xx).
+
+    Zbiera statystyki opóźnień per endpoint (`host/ścieżka`), dostępne
+    przez `latency_stats()`. Zapytania do `/api/v3/*` przechodzą przez
+    limiter wagi (`trading.rate_limiter`) z podanym priorytetem.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        pool_hosts: int = POOL_HOSTS,
+        pool_connections_per_host: int = POOL_CONNECTIONS_PER_HOST,
+        retries: int = RETRIES,
+        backoff_factor: float = BACKOFF_FACTOR,
+        limiter: Optional[WeightScheduler] = None,
+    ):
+        self.timeout = timeout
+        self.limiter = limiter
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_hosts,
+            pool_maxsize=pool_connections_per_host,
+            max_retries=retry,
+            pool_block=True,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        self._stats: Dict[str, EndpointStats] = {}
+        self._lock = Lock()
+
+    def _record(self, endpoint: str, elapsed_ms: float, error: bool) -> None:
+        with self._lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = EndpointStats()
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.last_ms = elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            if error:
+                stats.errors += 1
+
+    def get(
+        self,
+        url: str,
+        params: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        priority: int = PRIORITY_ANALYTICS,
+        **kwargs,
+    ) -> requests.Response:
+        parts = urlsplit(url)
+        endpoint = f"{parts.netloc}{parts.path}"
+        limited = self.limiter is not None and parts.path.startswith("/api/v3/")
+        if limited:
+            self.limiter.acquire(endpoint_weight(parts.path, params), priority)
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException:
+            self._record(endpoint, (time.perf_counter() - started) * 1000, error=True)
+            raise
+        self._record(endpoint, (time.perf_counter() - started) * 1000, error=response.status_code >= 400)
+        if limited:
+            self.limiter.observe_response(response.status_code, response.headers)
+        return response
+
+    def get_json(
+        self,
+        url: str,
+        params: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        priority: int = PRIORITY_ANALYTICS,
+        **kwargs,
+    ):
+        response = self.get(url, params=params, timeout=timeout, priority=priority, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def latency_stats(self) -> Dict[str, EndpointStats]:
+        with self._lock:
+            return {endpoint: EndpointStats(**vars(stats)) for endpoint, stats in self._stats.items()}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def format_stats(self) -> str:
+        lines = []
+        for endpoint, stats in sorted(self.latency_stats().items()):
+            lines.append(
+                f"{endpoint}: n={stats.count} err={stats.errors} "
+                f"avg={stats.mean_ms:.1f}ms max={stats.max_ms:.1f}ms"
+            )
+        return "\n".join(lines)
+
+
+http_client = RestClient(limiter=rate_limiter)
@@ -0,0 +1,323 @@
+import math
+from collections import deque
+from dataclasses import dataclass
+from decimal import Decimal
+from threading import Lock
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+from trading.signal_engine import DEFAULT_RULES, SignalResult, evaluate_signal
+from trading.strategy_engine import RiskConfig, TradePlan, plan_from_signal
+
+
+class _RollingWindow:
+    """Okno przesuwne z bieżącą sumą; co `size` aktualizacji suma jest
+    przeliczana od nowa (fsum), żeby błąd zaokrągleń się nie kumulował."""
+
+    def __init__(self, size: int):
+        self.size = max(int(size), 1)
+        self.values: Deque[float] = deque()
+        self.total = 0.0
+        self._updates = 0
+
+    def push(self, value: float) -> None:
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.size:
+            self.total -= self.values.popleft()
+        self._tick()
+
+    def replace_last(self, value: float) -> None:
+        self.total += value - self.values[-1]
+        self.values[-1] = value
+        self._tick()
+
+    def mean(self, require_full: bool = True) -> Optional[float]:
+        count = len(self.values)
+        if count == 0 or (require_full and count < self.size):
+            return None
+        return self.total / count
+
+    def _tick(self) -> None:
+        self._updates += 1
+        if self._updates >= self.size:
+            self.total = math.fsum(self.values)
+            self._updates = 0
+
+
+class _RsiWindow:
+    """RSI o tej samej semantyce co `signal_engine.rsi`: średnia zysków i strat
+    z ostatnich `period` zmian ceny (zmiana 0 liczy się jako zysk)."""
+
+    def __init__(self, period: int):
+        self.period = int(period)
+        self.deltas: Deque[float] = deque()
+        self.gain_sum = 0.0
+        self.gain_count = 0
+        self.loss_sum = 0.0
+        self.loss_count = 0
+
+    def _add(self, delta: float) -> None:
+        if delta >= 0:
+            self.gain_sum += delta
+            self.gain_count += 1
+        else:
+            self.loss_sum -= delta
+            self.loss_count += 1
+
+    def _remove(self, delta: float) -> None:
+        if delta >= 0:
+            self.gain_sum -= delta
+            self.gain_count -= 1
+            if self.gain_count == 0:
+                self.gain_sum = 0.0
+        else:
+            self.loss_sum += delta
+            self.loss_count -= 1
+            if self.loss_count == 0:
+                self.loss_sum = 0.0
+
+    def push(self, delta: float) -> None:
+        self.deltas.append(delta)
+        self._add(delta)
+        if len(self.deltas) > self.period:
+            self._remove(self.deltas.popleft())
+
+    def replace_last(self, delta: float) -> None:
+        self._remove(self.deltas[-1])
+        self.deltas[-1] = delta
+        self._add(delta)
+
+    def value(self) -> Optional[float]:
+        if len(self.deltas) < self.period:
+            return None
+        avg_gain = self.gain_sum / self.gain_count if self.gain_count else 0.0
+        avg_loss = self.loss_sum / self.loss_count if self.loss_count else 0.0
+        if avg_loss == 0:
+            return 100.0
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+class _WilderRsi:
+    """Klasyczny RSI Wildera (wygładzanie 1/period), aktualizowany w O(1)."""
+
+    def __init__(self, period: int):
+        self.period = int(period)
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self._previous: Tuple[int, float, float] = (0, 0.0, 0.0)
+
+    def push(self, delta: float) -> None:
+        self._previous = (self.count, self.avg_gain, self.avg_loss)
+        self._apply(delta)
+
+    def replace_last(self, delta: float) -> None:
+        self.count, self.avg_gain, self.avg_loss = self._previous
+        self._apply(delta)
+
+    def _apply(self, delta: float) -> None:
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        self.count += 1
+        if self.count <= self.period:
+            # Faza rozruchu: zwykła średnia z pierwszych `period` zmian.
+            self.avg_gain += (gain - self.avg_gain) / self.count
+            self.avg_loss += (loss - self.avg_loss) / self.count
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+    def value(self) -> Optional[float]:
+        if self.count < self.period:
+            return None
+        if self.avg_loss == 0:
+            return 100.0
+        rs = self.avg_gain / self.avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+@dataclass
+class IndicatorSnapshot:
+    symbol: str
+    interval: str
+    open_time: int
+    last_price: float
+    last_volume: float
+    fast_sma: Optional[float]
+    slow_sma: Optional[float]
+    rsi: Optional[float]
+    wilder_rsi: Optional[float]
+    volume_baseline: Optional[float]
+    has_volume_spike: bool
+    atr: Optional[Decimal]
+    candles: int
+
+
+class IndicatorState:
+    """Stan wskaźników dla jednej pary (symbol, interwał).
+
+    Świeca o tym samym `open_time` co ostatnia nadpisuje ją (aktualizacja
+    niezamkniętej świecy), świeca o nowszym `open_time` przesuwa okna.
+    Każda aktualizacja kosztuje O(1) niezależnie od długości historii.
+    """
+
+    def __init__(self, symbol: str, interval: str, rules: Dict[str, float], atr_period: int, history: int):
+        self.symbol = symbol
+        self.interval = interval
+        self.rules = rules
+        self.history = int(history)
+        self.fast_sma = _RollingWindow(int(rules["FAST_SMA"]))
+        self.slow_sma = _RollingWindow(int(rules["SLOW_SMA"]))
+        self.rsi = _RsiWindow(int(rules["RSI_PERIOD"]))
+        self.wilder_rsi = _WilderRsi(int(rules["RSI_PERIOD"]))
+        self.atr = _RollingWindow(int(atr_period))
+        # Bazowy wolumen to średnia z poprzednich świec w oknie historii,
+        # tak jak `volume_spike(volumes[-history:])` w build_signal.
+        self.volume_baseline = _RollingWindow(max(self.history - 1, 1))
+        self.candles = 0
+        self.open_time: Optional[int] = None
+        self.last_close = 0.0
+        self.last_volume = 0.0
+        self._prev_close: Optional[float] = None
+
+    def update(self, kline: Dict[str, float]) -> bool:
+        open_time = int(kline["open_time"])
+        close = float(kline["close"])
+        high = float(kline["high"])
+        low = float(kline["low"])
+        volume = float(kline["volume"])
+
+        if self.open_time is not None and open_time < self.open_time:
+            return False
+        replace = self.open_time == open_time
+
+        if not replace:
+            if self.open_time is not None:
+                self.volume_baseline.push(self.last_volume)
+                self._prev_close = self.last_close
+            self.candles += 1
+
+        prev_close = self._prev_close
+        if replace:
+            self.fast_sma.replace_last(close)
+            self.slow_sma.replace_last(close)
+        else:
+            self.fast_sma.push(close)
+            self.slow_sma.push(close)
+
+        if prev_close is not None:
+            delta = close - prev_close
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            if replace:
+                self.rsi.replace_last(delta)
+                self.wilder_rsi.replace_last(delta)
+                self.atr.replace_last(true_range)
+            else:
+                self.rsi.push(delta)
+                self.wilder_rsi.push(delta)
+                self.atr.push(true_range)
+
+        self.open_time = open_time
+        self.last_close = close
+        self.last_volume = volume
+        return True
+
+    def snapshot(self) -> IndicatorSnapshot:
+        if self.open_time is None:
+            raise ValueError(f"Brak świec dla {self.symbol} {self.interval}.")
+        baseline = self.volume_baseline.mean(require_full=False)
+        multiplier = float(self.rules["VOLUME_SPIKE_MULTIPLIER"])
+        has_volume_spike = bool(baseline) and self.last_volume >= baseline * multiplier
+        atr = self.atr.mean()
+        return IndicatorSnapshot(
+            symbol=self.symbol,
+            interval=self.interval,
+            open_time=self.open_time,
+            last_price=self.last_close,
+            last_volume=self.last_volume,
+            fast_sma=self.fast_sma.mean(),
+            slow_sma=self.slow_sma.mean(),
+            rsi=self.rsi.value(),
+            wilder_rsi=self.wilder_rsi.value(),
+            volume_baseline=baseline,
+            has_volume_spike=has_volume_spike,
+            atr=Decimal(str(atr)) if atr is not None else None,
+            candles=self.candles,
+        )
+
+
+class IndicatorEngine:
+    """Rejestr stanów wskaźników per (symbol, interwał), bezpieczny dla wątków."""
+
+    def __init__(self, rules: Optional[Dict[str, float]] = None, atr_period: int = 14, history: int = 200):
+        self.rules = {**DEFAULT_RULES, **(rules or {})}
+        self.atr_period = int(atr_period)
+        self.history = int(history)
+        self._states: Dict[Tuple[str, str], IndicatorState] = {}
+        self._lock = Lock()
+
+    def _new_state(self, symbol: str, interval: str) -> IndicatorState:
+        return IndicatorState(symbol, interval, self.rules, self.atr_period, self.history)
+
+    def seed(self, symbol: str, interval: str, klines: Iterable[Dict[str, float]]) -> IndicatorSnapshot:
+        state = self._new_state(symbol, interval)
+        for kline in klines:
+            state.update(kline)
+        with self._lock:
+            self._states[(symbol, interval)] = state
+            return state.snapshot()
+
+    def update(self, symbol: str, interval: str, kline: Dict[str, float]) -> IndicatorSnapshot:
+        with self._lock:
+            state = self._states.get((symbol, interval))
+            if state is None:
+                state = self._new_state(symbol, interval)
+                self._states[(symbol, interval)] = state
+            state.update(kline)
+            return state.snapshot()
+
+    def has(self, symbol: str, interval: str) -> bool:
+        with self._lock:
+            return (symbol, interval) in self._states
+
+    def snapshot(self, symbol: str, interval: str) -> IndicatorSnapshot:
+        with self._lock:
+            state = self._states.get((symbol, interval))
+            if state is None:
+                raise KeyError(f"Brak stanu wskaźników dla {symbol} {interval}.")
+            return state.snapshot()
+
+    def build_signal(self, symbol: str, interval: str, imbalance: float) -> SignalResult:
+        return self._signal_from_snapshot(self.snapshot(symbol, interval), imbalance)
+
+    def _signal_from_snapshot(self, snap: IndicatorSnapshot, imbalance: float) -> SignalResult:
+        return evaluate_signal(
+            snap.symbol,
+            self.rules,
+            last_price=snap.last_price,
+            timestamp=snap.open_time,
+            fast_sma=snap.fast_sma,
+            slow_sma=snap.slow_sma,
+            current_rsi=snap.rsi,
+            imbalance=imbalance,
+            has_volume_spike=snap.has_volume_spike,
+        )
+
+    def build_trade_plan(
+        self,
+        symbol: str,
+        interval: str,
+        imbalance: float,
+        risk: RiskConfig,
+        available_quote: Decimal,
+    ) -> TradePlan:
+        if risk.atr_period != self.atr_period:
+            raise ValueError(
+                f"RiskConfig.atr_period={risk.atr_period} nie zgadza się z silnikiem (atr_period={self.atr_period})."
+            )
+        snap = self.snapshot(symbol, interval)
+        signal = self._signal_from_snapshot(snap, imbalance)
+        return plan_from_signal(
+            signal, risk, available_quote, snap.fast_sma, snap.slow_sma, snap.rsi, snap.atr
+        )
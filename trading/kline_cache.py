@@ -0,0 +1,155 @@
+import time
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+
+INTERVAL_MS = {
+    "1s": 1_000,
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 3_600_000,
+    "2h": 2 * 3_600_000,
+    "4h": 4 * 3_600_000,
+    "6h": 6 * 3_600_000,
+    "8h": 8 * 3_600_000,
+    "12h": 12 * 3_600_000,
+    "1d": 86_400_000,
+    "3d": 3 * 86_400_000,
+    "1w": 7 * 86_400_000,
+}
+
+
+def interval_to_ms(interval: str) -> int:
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Nieobsługiwany interwał świec: {interval}")
+    return INTERVAL_MS[interval]
+
+
+def next_candle_close_ms(open_time: int, interval: str) -> int:
+    """Czas zamknięcia świecy otwartej o `open_time` (ms, UTC)."""
+    if interval == "1M":
+        opened = datetime.fromtimestamp(open_time / 1000, tz=timezone.utc)
+        days = monthrange(opened.year, opened.month)[1]
+        return open_time + days * 86_400_000
+    return open_time + interval_to_ms(interval)
+
+
+# 1970-01-01 to czwartek; świece tygodniowe Binance otwierają się w poniedziałek.
+_WEEK_OFFSET_MS = 4 * 86_400_000
+
+
+def candle_open_ms(timestamp_ms: int, interval: str) -> int:
+    """Czas otwarcia świecy `interval` trwającej w chwili `timestamp_ms` (ms, UTC)."""
+    if interval == "1M":
+        moment = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+        return int(datetime(moment.year, moment.month, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    step = interval_to_ms(interval)
+    offset = _WEEK_OFFSET_MS if interval == "1w" else 0
+    return timestamp_ms - (timestamp_ms - offset) % step
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    entries: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _CacheEntry:
+    klines: List[Dict[str, float]]
+    expires_at: int
+
+
+class KlineCache:
+    """Wspólny cache świec z REST, kluczowany (symbol, interwał, limit).
+
+    Wpis wygasa dokładnie w chwili zamknięcia ostatniej (bieżącej) świecy,
+    więc w obrębie jednej świecy sygnał, plan transakcji, auto-trader
+    i Telegram korzystają z jednego pobrania.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._entries: Dict[Tuple[str, str, int], _CacheEntry] = {}
+        self._key_locks: Dict[Tuple[str, str, int], Lock] = {}
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _now_ms(self) -> int:
+        return int(self.clock() * 1000)
+
+    def _key_lock(self, key: Tuple[str, str, int]) -> Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = Lock()
+            return lock
+
+    def _lookup(self, key: Tuple[str, str, int]) -> Optional[List[Dict[str, float]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._now_ms() < entry.expires_at:
+                self._hits += 1
+                return entry.klines
+            return None
+
+    def cached(self, symbol: str, interval: str, limit: int) -> bool:
+        """Czy `get()` odpowie z cache (bez pobierania i bez liczenia trafienia)."""
+        with self._lock:
+            entry = self._entries.get((symbol, interval, int(limit)))
+            return entry is not None and self._now_ms() < entry.expires_at
+
+    def get(
+        self,
+        symbol: str,
+        interval: str,
+        limit: int,
+        loader: Callable[[], List[Dict[str, float]]],
+    ) -> List[Dict[str, float]]:
+        key = (symbol, interval, int(limit))
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        # Blokada per klucz: równoległe wątki czekają na jedno pobranie
+        # zamiast wysyłać identyczne zapytania.
+        with self._key_lock(key):
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            klines = loader()
+            with self._lock:
+                self._misses += 1
+                if klines:
+                    self._entries[key] = _CacheEntry(
+                        klines=klines,
+                        expires_at=next_candle_close_ms(int(klines[-1]["open_time"]), interval),
+                    )
+            return klines
+
+    def invalidate(self, symbol: Optional[str] = None, interval: Optional[str] = None) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                if (symbol is None or key[0] == symbol) and (interval is None or key[1] == interval):
+                    del self._entries[key]
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses, entries=len(self._entries))
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
@@ -0,0 +1,281 @@
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from trading.kline_cache import INTERVAL_MS
+
+MARKET_STORE_DIR = os.getenv("MARKET_STORE_DIR", "market_store")
+TIME_COLUMN = "timestamp"
+COLUMN_DTYPES = {
+    TIME_COLUMN: np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.float64,
+    "quote_volume": np.float64,
+    "trades": np.int64,
+}
+# Katalogi pomocnicze podmiany partycji: `<RRRR-MM>.tmp` (nowa wersja w trakcie
+# zapisu) i `<RRRR-MM>.old` (poprzednia wersja na czas podmiany).
+STAGING_SUFFIX = ".tmp"
+RETIRED_SUFFIX = ".old"
+
+
+def to_epoch_ms(values: pd.Series) -> np.ndarray:
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.int64)
+    # Rozdzielczość `datetime64` zależy od wersji pandas, więc bez `astype("int64")`.
+    elapsed = pd.to_datetime(values, utc=True) - pd.Timestamp(0, tz="UTC")
+    return (elapsed // pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.int64)
+
+
+def _month_start_ms(month: str) -> int:
+    year, month_number = (int(part) for part in month.split("-"))
+    return int(datetime(year, month_number, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _next_month(month: str) -> str:
+    year, month_number = (int(part) for part in month.split("-"))
+    return f"{year + month_number // 12}-{month_number % 12 + 1:02d}"
+
+
+class MarketStore:
+    """Kolumnowy magazyn świec: `<root>/<SYMBOL>/<interwał>/<RRRR-MM>/<kolumna>.npy`.
+
+    Każda kolumna to osobna, typowana tablica NumPy czytana przez `mmap`,
+    więc odczyt wybranych kolumn i zakresu czasu dotyka tylko potrzebnych
+    miesięcy i bajtów. Wiersze w partycji są posortowane po `timestamp` (ms,
+    UTC) i unikalne.
+
+    Partycja jest zapisywana w całości do `<RRRR-MM>.tmp` i podmieniana
+    zmianą nazwy katalogu, więc przerwany zapis nie zostawia kolumn z dwóch
+    różnych wersji miesiąca. Ślady przerwanej podmiany są sprzątane przy
+    kolejnym zapisie, a do tego czasu odczyt korzysta z poprzedniej wersji.
+    """
+
+    def __init__(self, root: str = MARKET_STORE_DIR):
+        self.root = root
+
+    def path(self, symbol: str, interval: str, month: Optional[str] = None) -> str:
+        parts = [self.root, symbol.upper(), interval]
+        if month is not None:
+            parts.append(month)
+        return os.path.join(*parts)
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def intervals(self, symbol: str) -> List[str]:
+        path = os.path.join(self.root, symbol.upper())
+        if not os.path.isdir(path):
+            return []
+        names = [name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name))]
+        return sorted(names, key=lambda name: INTERVAL_MS.get(name, float("inf")))
+
+    def partitions(self, symbol: str, interval: str) -> List[str]:
+        path = self.path(symbol, interval)
+        if not os.path.isdir(path):
+            return []
+        names = [name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name))]
+        months = {name for name in names if "." not in name}
+        # Podmiana przerwana między zmianami nazw – miesiąc jest tylko w `.old`.
+        months.update(
+            name[: -len(RETIRED_SUFFIX)]
+            for name in names
+            if name.endswith(RETIRED_SUFFIX) and name[: -len(RETIRED_SUFFIX)] not in months
+        )
+        return sorted(months)
+
+    def _partition_path(self, symbol: str, interval: str, month: str) -> str:
+        path = self.path(symbol, interval, month)
+        if not os.path.isdir(path) and os.path.isdir(path + RETIRED_SUFFIX):
+            return path + RETIRED_SUFFIX
+        return path
+
+    def _recover(self, symbol: str, interval: str) -> None:
+        """Sprząta po przerwanych podmianach partycji (przed zapisem)."""
+        path = self.path(symbol, interval)
+        if not os.path.isdir(path):
+            return
+        for name in os.listdir(path):
+            entry = os.path.join(path, name)
+            if not os.path.isdir(entry):
+                continue
+            if name.endswith(STAGING_SUFFIX):
+                shutil.rmtree(entry, ignore_errors=True)
+            elif name.endswith(RETIRED_SUFFIX):
+                current = entry[: -len(RETIRED_SUFFIX)]
+                if os.path.isdir(current):
+                    shutil.rmtree(entry, ignore_errors=True)
+                else:
+                    os.rename(entry, current)
+
+    def has(self, symbol: str, interval: Optional[str] = None) -> bool:
+        if interval is None:
+            return bool(self.intervals(symbol))
+        return bool(self.partitions(symbol, interval))
+
+    def columns(self, symbol: str, interval: str) -> List[str]:
+        months = self.partitions(symbol, interval)
+        if not months:
+            return []
+        return self._column_names(self._partition_path(symbol, interval, months[0]))
+
+    @staticmethod
+    def _column_names(path: str) -> List[str]:
+        names = [name[:-4] for name in os.listdir(path) if name.endswith(".npy") and ".tmp" not in name]
+        return sorted(names, key=lambda name: (name != TIME_COLUMN, name))
+
+    def write(self, symbol: str, interval: str, df: pd.DataFrame) -> int:
+        """Dopisuje świece (scalając z istniejącymi partycjami). Zwraca liczbę zapisanych wierszy."""
+        if TIME_COLUMN not in df:
+            raise ValueError(f"Brak kolumny {TIME_COLUMN} w danych {symbol}.")
+        frame = pd.DataFrame({TIME_COLUMN: to_epoch_ms(df[TIME_COLUMN])})
+        for column, dtype in COLUMN_DTYPES.items():
+            if column != TIME_COLUMN and column in df:
+                frame[column] = df[column].to_numpy(dtype=dtype)
+        for column in df.columns:
+            if column not in frame and pd.api.types.is_numeric_dtype(df[column]):
+                frame[column] = df[column].to_numpy(dtype=np.float64)
+        if frame.empty:
+            return 0
+
+        self._recover(symbol, interval)
+        month_keys = pd.to_datetime(frame[TIME_COLUMN], unit="ms", utc=True).dt.strftime("%Y-%m")
+        written = 0
+        for month, part in frame.groupby(month_keys.to_numpy(), sort=True):
+            existing = self._read_partition(symbol, interval, month, None)
+            if existing is not None:
+                part = pd.concat([pd.DataFrame(existing), part], ignore_index=True)
+            part = part.drop_duplicates(TIME_COLUMN, keep="last").sort_values(TIME_COLUMN)
+            self._write_partition(symbol, interval, month, part)
+            written += len(part)
+        return written
+
+    def _write_partition(self, symbol: str, interval: str, month: str, part: pd.DataFrame) -> None:
+        path = self.path(symbol, interval, month)
+        staging, retired = path + STAGING_SUFFIX, path + RETIRED_SUFFIX
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for column in part.columns:
+            values = part[column].to_numpy(dtype=COLUMN_DTYPES.get(column, np.float64))
+            np.save(os.path.join(staging, f"{column}.npy"), np.ascontiguousarray(values))
+        # `rename` nie nadpisuje niepustego katalogu – stara wersja odchodzi na bok na czas podmiany.
+        if os.path.isdir(path):
+            shutil.rmtree(retired, ignore_errors=True)
+            os.rename(path, retired)
+        os.rename(staging, path)
+        shutil.rmtree(retired, ignore_errors=True)
+
+    def _read_partition(
+        self, symbol: str, interval: str, month: str, columns: Optional[Sequence[str]]
+    ) -> Optional[Dict[str, np.ndarray]]:
+        path = self._partition_path(symbol, interval, month)
+        if not os.path.isdir(path):
+            return None
+        if columns is None:
+            columns = self._column_names(path)
+        arrays = {column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode="r") for column in columns}
+        if len({len(values) for values in arrays.values()}) > 1:
+            raise ValueError(f"Uszkodzona partycja {path}: kolumny mają różne długości.")
+        return arrays
+
+    def read_arrays(
+        self,
+        symbol: str,
+        interval: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        columns: Optional[Iterable[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """Kolumny z zakresu `[start, end)` (ms). Zakres z jednej partycji to
+        widok na zmapowany plik (bez kopiowania), z kilku – sklejona kopia."""
+        available = self.columns(symbol, interval)
+        # Brakujące kolumny są pomijane, jak `usecols` przy odczycie CSV.
+        wanted = [column for column in columns if column in available] if columns is not None else available
+        load = wanted if TIME_COLUMN in wanted else [TIME_COLUMN] + wanted
+        chunks: Dict[str, List[np.ndarray]] = {column: [] for column in wanted}
+        for month in self.partitions(symbol, interval):
+            if end is not None and _month_start_ms(month) >= end:
+                break
+            if start is not None and _month_start_ms(_next_month(month)) <= start:
+                continue
+            part = self._read_partition(symbol, interval, month, load)
+            times = part[TIME_COLUMN]
+            lo = int(np.searchsorted(times, start)) if start is not None else 0
+            hi = int(np.searchsorted(times, end)) if end is not None else len(times)
+            if hi <= lo:
+                continue
+            for column in wanted:
+                chunks[column].append(part[column][lo:hi])
+
+        result = {}
+        for column in wanted:
+            parts = chunks[column]
+            if not parts:
+                result[column] = np.empty(0, dtype=COLUMN_DTYPES.get(column, np.float64))
+            elif len(parts) == 1:
+                result[column] = parts[0]
+            else:
+                result[column] = np.concatenate(parts)
+        return result
+
+    def read(
+        self,
+        symbol: str,
+        interval: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        columns: Optional[Iterable[str]] = None,
+    ) -> pd.DataFrame:
+        return pd.DataFrame(self.read_arrays(symbol, interval, start, end, columns))
+
+
+market_store = MarketStore()
+
+
+def load_market_frame(
+    symbol: str,
+    columns: Optional[Iterable[str]] = None,
+    interval: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    data_file: Optional[str] = None,
+    store: Optional[MarketStore] = None,
+) -> Optional[pd.DataFrame]:
+    """Dane rynkowe symbolu: z magazynu kolumnowego, a gdy go brak – z CSV.
+
+    Bez `interval` użyty jest najkrótszy interwał zapisany dla symbolu.
+    Plik CSV (`data_file`, domyślnie `market_data_<SYMBOL>.csv`) jest
+    czytany tylko wtedy, gdy symbolu nie ma w magazynie. Zwraca None, gdy
+    nie ma żadnego źródła.
+    """
+    store = store or market_store
+    columns = list(columns) if columns is not None else None
+    if data_file is None and store.has(symbol, interval):
+        interval = interval or store.intervals(symbol)[0]
+        return store.read(symbol, interval, start, end, columns)
+
+    file_name = data_file or f"market_data_{symbol}.csv"
+    if not os.path.exists(file_name):
+        return None
+    usecols = None
+    if columns is not None:
+        usecols = lambda name: name in columns  # noqa: E731
+    df = pd.read_csv(file_name, usecols=usecols)
+    if (start is not None or end is not None) and TIME_COLUMN in df:
+        times = to_epoch_ms(df[TIME_COLUMN])
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times < end
+        df = df[mask].reset_index(drop=True)
+    return df
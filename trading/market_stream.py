@@ -0,0 +1,333 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set
+
+import websocket
+
+from trading.order_book import OrderBookRegistry, order_books
+from trading.signal_engine import fetch_klines, rest_market_data
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443"
+MAX_STREAMS_PER_CONNECTION = 1024
+
+
+def _parse_stream_kline(k: Dict) -> Dict[str, float]:
+    return {
+        "open_time": int(k["t"]),
+        "open": float(k["o"]),
+        "high": float(k["h"]),
+        "low": float(k["l"]),
+        "close": float(k["c"]),
+        "volume": float(k["v"]),
+    }
+
+
+def _imbalance(bids: Iterable, asks: Iterable) -> float:
+    bid_total = sum(float(bid[1]) for bid in bids)
+    ask_total = sum(float(ask[1]) for ask in asks)
+    total = bid_total + ask_total
+    if total == 0:
+        return 0.0
+    return (bid_total - ask_total) / total
+
+
+def _merge_kline(candles: Deque[Dict[str, float]], kline: Dict[str, float]) -> bool:
+    """Aktualizuje bieżącą albo dopisuje nową świecę; starsze są pomijane (False)."""
+    if candles and candles[-1]["open_time"] == kline["open_time"]:
+        candles[-1] = kline
+    elif not candles or candles[-1]["open_time"] < kline["open_time"]:
+        candles.append(kline)
+    else:
+        return False
+    return True
+
+
+class MarketStream:
+    """Strumień świec i order booka z combined streams Binance.
+
+    Trzyma w pamięci ostatnie `history` świec oraz order book każdego
+    symbolu – domyślnie pełną replikę L2 ze strumienia diff depth
+    (`trading.order_book`), a w trybie `depth_mode="partial"` tylko
+    nierównowagę z `depth_levels` najlepszych poziomów. Dane są dostępne
+    tym samym interfejsem co `signal_engine.RestMarketData` (`klines`,
+    `orderbook_imbalance`), więc strumień można przekazać jako `source`
+    do `build_signal`/`build_trade_plan`. Gdy połączenie jest zerwane albo
+    symbol nie jest subskrybowany, zapytania trafiają do REST. Po każdym
+    (ponownym) połączeniu świece są dociągane z REST w osobnym wątku
+    (symbol po symbolu, przez limiter wagi), żeby zasypać lukę z czasu
+    rozłączenia bez blokowania obsługi wiadomości; do tego czasu świece
+    symbolu są serwowane z REST. Z `subscribe_klines=False` strumień
+    utrzymuje tylko książki (np. dla `trading.wall_tracker`), a
+    `subscribe_trades=True` dodaje strumień `aggTrade`, przekazywany
+    odbiorcom książek (`OrderBookRegistry.on_trade`).
+    """
+
+    def __init__(
+        self,
+        symbols: Iterable[str],
+        interval: str,
+        depth_mode: str = "diff",
+        depth_levels: int = 20,
+        history: int = 200,
+        base_url: str = BINANCE_STREAM_URL,
+        engine=None,
+        books: Optional[OrderBookRegistry] = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        subscribe_klines: bool = True,
+        subscribe_trades: bool = False,
+    ):
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.interval = interval
+        self.subscribe_klines = subscribe_klines
+        self.subscribe_trades = subscribe_trades
+        if depth_mode not in {"diff", "partial"}:
+            raise ValueError(f"Nieobsługiwany depth_mode: {depth_mode}")
+        self.depth_mode = depth_mode
+        self.depth_levels = int(depth_levels)
+        self.books = books if books is not None else order_books
+        self.history = int(history)
+        self.base_url = base_url.rstrip("/")
+        self.engine = engine
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        streams_per_symbol = 1 + int(subscribe_klines) + int(subscribe_trades)
+        if len(self.symbols) * streams_per_symbol > MAX_STREAMS_PER_CONNECTION:
+            raise ValueError(
+                f"Za dużo strumieni ({len(self.symbols) * streams_per_symbol}) na jedno połączenie "
+                f"(limit {MAX_STREAMS_PER_CONNECTION})."
+            )
+
+        self._klines: Dict[str, Deque[Dict[str, float]]] = {
+            symbol: deque(maxlen=self.history) for symbol in self.symbols
+        }
+        self._imbalance: Dict[str, float] = {}
+        self._last_event: Dict[str, float] = {}
+        # Symbole, których świece zostały dociągnięte z REST po bieżącym połączeniu.
+        self._seeded: Set[str] = set()
+        self._generation = 0
+        self._seeding_done = threading.Event()
+        self._lock = threading.Lock()
+        self._connected = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ws: Optional[websocket.WebSocketApp] = None
+        self.reconnects = 0
+        self.messages = 0
+
+    @property
+    def stream_url(self) -> str:
+        streams = []
+        for symbol in self.symbols:
+            lower = symbol.lower()
+            if self.subscribe_klines:
+                streams.append(f"{lower}@kline_{self.interval}")
+            if self.depth_mode == "diff":
+                streams.append(f"{lower}@depth@100ms")
+            else:
+                streams.append(f"{lower}@depth{self.depth_levels}@100ms")
+            if self.subscribe_trades:
+                streams.append(f"{lower}@aggTrade")
+        return f"{self.base_url}/stream?streams={'/'.join(streams)}"
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def start(self, wait: float = 10.0) -> "MarketStream":
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="market-stream", daemon=True)
+        self._thread.start()
+        self._connected.wait(wait)
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        ws = self._ws
+        if ws is not None:
+            # Ramka zamknięcia i shutdown gniazda bez jego zamykania: pętla
+            # run_forever budzi się i sama kończy połączenie. `ws.close()`
+            # zamykałby deskryptor pod selektorem tej pętli, która czekałaby
+            # wtedy do ping_timeout.
+            ws.keep_running = False
+            sock = ws.sock
+            if sock is not None:
+                try:
+                    sock.send_close()
+                except Exception:
+                    pass
+                sock.abort()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._connected.clear()
+
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        return self._connected.wait(timeout)
+
+    def wait_seeded(self, timeout: Optional[float] = None) -> bool:
+        """Czeka, aż świece wszystkich symboli zostaną dociągnięte po ostatnim połączeniu."""
+        return self._seeding_done.wait(timeout)
+
+    def _run(self) -> None:
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            self._ws = websocket.WebSocketApp(
+                self.stream_url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close,
+            )
+            started = time.monotonic()
+            self._ws.run_forever(ping_interval=60, ping_timeout=10)
+            self._connected.clear()
+            if self._stopped.is_set():
+                break
+            # Połączenie, które wytrzymało dłużej niż maksymalne opóźnienie,
+            # resetuje backoff.
+            if time.monotonic() - started > self.max_reconnect_delay:
+                delay = self.reconnect_delay
+            self.reconnects += 1
+            print(f"🔌 Strumień rynku rozłączony, ponowne połączenie za {delay:.1f}s...")
+            self._stopped.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _on_open(self, ws) -> None:
+        # Zdarzenia z czasu rozłączenia przepadły – książki wymagają nowych
+        # snapshotów, a świece dociągnięcia z REST.
+        self.books.invalidate()
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._seeded.clear()
+        self._seeding_done.clear()
+        self._connected.set()
+        if self.subscribe_klines:
+            threading.Thread(target=self._seed_all, args=(generation,), name="market-stream-seed", daemon=True).start()
+        else:
+            self._seeding_done.set()
+
+    def _seed_all(self, generation: int) -> None:
+        for symbol in self.symbols:
+            # Nowe połączenie uruchomiło już własne dociąganie.
+            if self._stopped.is_set() or generation != self._generation:
+                return
+            try:
+                self.seed(symbol, fetch_klines(symbol, self.interval, self.history, use_cache=False), generation)
+            except Exception as exc:
+                print(f"❌ Nie udało się pobrać świec {symbol}: {exc}")
+        if generation == self._generation:
+            self._seeding_done.set()
+
+    def _on_error(self, ws, error) -> None:
+        print(f"❌ Błąd strumienia rynku: {error}")
+
+    def _on_close(self, ws, status_code, message) -> None:
+        self._connected.clear()
+
+    def _on_message(self, ws, raw: str) -> None:
+        message = json.loads(raw)
+        stream = message.get("stream", "")
+        data = message.get("data", message)
+        self.messages += 1
+        if "@kline_" in stream or data.get("e") == "kline":
+            self._handle_kline(data["s"].upper(), data["k"])
+        elif "@aggTrade" in stream:
+            self.books.on_trade(stream.split("@", 1)[0], data)
+        elif "@depth" in stream:
+            symbol = stream.split("@", 1)[0].upper()
+            if self.depth_mode == "diff":
+                self._handle_depth_diff(symbol, data)
+            else:
+                self._handle_depth(symbol, data)
+
+    def seed(self, symbol: str, klines: List[Dict[str, float]], generation: Optional[int] = None) -> None:
+        """Ustawia świece symbolu z REST; świece ze strumienia nowsze niż pobrane zostają."""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            candles = deque(klines, maxlen=self.history)
+            for kline in self._klines.get(symbol, ()):
+                _merge_kline(candles, kline)
+            self._klines[symbol] = candles
+            self._seeded.add(symbol)
+            self._last_event[symbol] = time.time()
+            if self.engine is not None:
+                self.engine.seed(symbol, self.interval, candles)
+
+    def _handle_kline(self, symbol: str, payload: Dict) -> None:
+        kline = _parse_stream_kline(payload)
+        with self._lock:
+            candles = self._klines.setdefault(symbol, deque(maxlen=self.history))
+            if not _merge_kline(candles, kline):
+                return
+            self._last_event[symbol] = time.time()
+            # Pod blokadą strumienia, żeby nie przeplatać się z `seed()`.
+            if self.engine is not None:
+                self.engine.update(symbol, self.interval, kline)
+
+    def _handle_depth(self, symbol: str, payload: Dict) -> None:
+        imbalance = _imbalance(payload.get("bids", []), payload.get("asks", []))
+        with self._lock:
+            self._imbalance[symbol] = imbalance
+
+    def _handle_depth_diff(self, symbol: str, event: Dict) -> None:
+        try:
+            self.books.on_diff(symbol, event)
+        except Exception as exc:
+            print(f"❌ Nie udało się zsynchronizować order booka {symbol}: {exc}")
+
+    def _is_live(self, symbol: str) -> bool:
+        return self.connected and symbol in self._seeded and bool(self._klines.get(symbol))
+
+    def serves_klines(self, symbol: str, interval: str, limit: int = 200) -> bool:
+        """Czy `klines()` odpowie z pamięci strumienia, bez zapytania REST."""
+        return interval == self.interval and limit <= self.history and self._is_live(symbol.upper())
+
+    def serves_depth(self, symbol: str) -> bool:
+        """Czy `orderbook_imbalance()` odpowie z pamięci strumienia, bez zapytania REST."""
+        if not self.connected:
+            return False
+        symbol = symbol.upper()
+        if self.depth_mode == "diff":
+            return self.books.get(symbol) is not None
+        with self._lock:
+            return symbol in self._imbalance
+
+    def indicator_engine(self, symbol: str, interval: str):
+        """Silnik wskaźników (`engine`) ze stanem symbolu zasilanym tym strumieniem.
+
+        Zwraca None, gdy silnika nie ma, interwał się różni albo strumień nie
+        jest połączony – wtedy wskaźniki trzeba liczyć z listy `klines()`.
+        """
+        symbol = symbol.upper()
+        if self.engine is None or interval != self.interval or not self._is_live(symbol):
+            return None
+        return self.engine if self.engine.has(symbol, interval) else None
+
+    def klines(self, symbol: str, interval: str, limit: int = 200) -> List[Dict[str, float]]:
+        symbol = symbol.upper()
+        if interval != self.interval or limit > self.history or not self._is_live(symbol):
+            return rest_market_data.klines(symbol, interval, limit)
+        with self._lock:
+            return list(self._klines[symbol])[-limit:]
+
+    def orderbook_imbalance(self, symbol: str, limit: int = 100) -> float:
+        symbol = symbol.upper()
+        imbalance = None
+        if self.connected:
+            if self.depth_mode == "diff":
+                imbalance = self.books.imbalance(symbol, limit)
+            else:
+                with self._lock:
+                    imbalance = self._imbalance.get(symbol)
+        if imbalance is None:
+            return rest_market_data.orderbook_imbalance(symbol, limit)
+        return imbalance
+
+    def last_event_age(self, symbol: str) -> Optional[float]:
+        with self._lock:
+            last = self._last_event.get(symbol.upper())
+        return None if last is None else time.time() - last
@@ -0,0 +1,196 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+METHOD_BOOTSTRAP = "bootstrap"
+METHOD_PERMUTATION = "permutation"
+METHODS = (METHOD_BOOTSTRAP, METHOD_PERMUTATION)
+
+DEFAULT_SIMULATIONS = 10_000
+DEFAULT_RUIN_PCT = 50.0
+MAX_MEMORY_MB = 256
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def trade_returns(trade_log: Iterable, initial_balance: float = 1000) -> np.ndarray:
+    """Zwroty kolejnych zamkniętych transakcji jako ułamek kapitału sprzed wejścia.
+
+    Obsługiwane dzienniki:
+    - krotki `(czas, "BUY", cena, ..., saldo)` / `(czas, "SELL", cena, saldo)`
+      z `backtest_strategy`, `risk_management` i `simulate_trade` (saldo
+      to ostatni element; zakup bez sprzedaży jest pomijany),
+    - słowniki z `pnl` (np. `ReplayReport.trade_log()`,
+      `PortfolioReport.trade_log()`) – kapitał przed transakcją to
+      `initial_balance` plus suma wcześniejszych `pnl`.
+    """
+    returns: List[float] = []
+    equity = float(initial_balance)
+    entry = None
+    for trade in trade_log:
+        if isinstance(trade, dict):
+            pnl = float(trade["pnl"])
+            returns.append(pnl / equity if equity else 0.0)
+            equity += pnl
+            continue
+        action, price, balance = trade[1], float(trade[2]), float(trade[-1])
+        if action == "BUY":
+            entry = (price, balance)
+        elif action == "SELL" and entry is not None:
+            entry_price, balance_after_buy = entry
+            quantity = (balance - balance_after_buy) / price if price else 0.0
+            equity_before = balance_after_buy + quantity * entry_price
+            returns.append(balance / equity_before - 1 if equity_before else 0.0)
+            entry = None
+    return np.asarray(returns, dtype=np.float64)
+
+
+@dataclass
+class MonteCarloResult:
+    """Rozkłady wyników symulacji (tablice indeksowane numerem symulacji)."""
+
+    method: str
+    trades: int
+    initial_balance: float
+    ruin_pct: float
+    final_return_pct: np.ndarray
+    max_drawdown_pct: np.ndarray
+    ruined: np.ndarray
+    elapsed_seconds: float
+    chunks: int
+
+    @property
+    def simulations(self) -> int:
+        return len(self.final_return_pct)
+
+    @property
+    def ruin_probability(self) -> float:
+        return float(np.mean(self.ruined)) if self.simulations else 0.0
+
+    @property
+    def simulations_per_second(self) -> float:
+        return self.simulations / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def percentiles(self, values: np.ndarray, q: Sequence[float] = PERCENTILES) -> Dict[float, float]:
+        return dict(zip(q, np.percentile(values, q).tolist())) if len(values) else {}
+
+    def summary(self) -> Dict:
+        return {
+            "method": self.method,
+            "simulations": self.simulations,
+            "trades": self.trades,
+            "return_pct": self.percentiles(self.final_return_pct),
+            "max_drawdown_pct": self.percentiles(self.max_drawdown_pct),
+            "ruin_probability": self.ruin_probability,
+        }
+
+    def format(self) -> str:
+        returns = self.percentiles(self.final_return_pct)
+        drawdowns = self.percentiles(self.max_drawdown_pct)
+        if not returns:
+            return f"🎲 {self.method}: brak transakcji do analizy"
+        return (
+            f"🎲 {self.method} ({self.simulations} symulacji × {self.trades} transakcji, {self.elapsed_seconds:.2f}s): "
+            f"zwrot p5/p50/p95 {returns[5]:+.2f}% / {returns[50]:+.2f}% / {returns[95]:+.2f}%, "
+            f"max drawdown p50/p95 {drawdowns[50]:.2f}% / {drawdowns[95]:.2f}%, "
+            f"ruina (-{self.ruin_pct:g}%) {self.ruin_probability:.2%}"
+        )
+
+
+def _chunk_size(trades: int, max_memory_mb: float) -> int:
+    # Ścieżka kapitału, maksima bieżące i indeksy losowania: ok. 3 tablice float64 na symulację.
+    per_simulation = max(trades, 1) * 8 * 3
+    return max(int(max_memory_mb * 1024 * 1024 // per_simulation), 1)
+
+
+def monte_carlo(
+    returns: np.ndarray,
+    simulations: int = DEFAULT_SIMULATIONS,
+    method: str = METHOD_BOOTSTRAP,
+    initial_balance: float = 1000,
+    ruin_pct: float = DEFAULT_RUIN_PCT,
+    trades: Optional[int] = None,
+    seed: Optional[int] = None,
+    max_memory_mb: float = MAX_MEMORY_MB,
+) -> MonteCarloResult:
+    """Symulacje ścieżek kapitału z losowanych zwrotów transakcji.
+
+    `bootstrap` losuje `trades` transakcji ze zwracaniem (domyślnie tyle,
+    ile jest w dzienniku), `permutation` tasuje kolejność tych samych
+    transakcji – zwrot końcowy się nie zmienia, zmienia się drawdown.
+    Ruina to spadek kapitału choć raz o `ruin_pct` % poniżej początkowego.
+
+    Symulacje liczone są paczkami macierzy `(symulacje, transakcje)`, tak
+    żeby jedna paczka mieściła się w `max_memory_mb`; w pamięci zostają
+    tylko wyniki po jednej liczbie na symulację.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Nieznana metoda: {method} (dostępne: {', '.join(METHODS)})")
+    returns = np.asarray(returns, dtype=np.float64)
+    length = len(returns) if method == METHOD_PERMUTATION or trades is None else int(trades)
+    if simulations <= 0 or length <= 0 or not len(returns):
+        raise ValueError("Potrzebna jest co najmniej jedna transakcja i symulacja")
+
+    started = time.perf_counter()
+    growth = 1 + returns
+    ruin_level = 1 - ruin_pct / 100
+    final_return = np.empty(simulations)
+    max_drawdown = np.empty(simulations)
+    ruined = np.empty(simulations, dtype=bool)
+    chunk = min(_chunk_size(length, max_memory_mb), simulations)
+    rngs = np.random.default_rng(seed).spawn((simulations + chunk - 1) // chunk)
+
+    for index, rng in enumerate(rngs):
+        block = slice(index * chunk, min((index + 1) * chunk, simulations))
+        count = block.stop - block.start
+        if method == METHOD_BOOTSTRAP:
+            paths = growth[rng.integers(0, len(growth), size=(count, length))]
+        else:
+            paths = rng.permuted(np.broadcast_to(growth, (count, length)), axis=1)
+        # Kapitał względny (1 = start) po każdej transakcji, liczony w miejscu.
+        np.cumprod(paths, axis=1, out=paths)
+        final_return[block] = (paths[:, -1] - 1) * 100
+        ruined[block] = paths.min(axis=1) <= ruin_level
+        peaks = np.maximum.accumulate(paths, axis=1)
+        np.maximum(peaks, 1.0, out=peaks)
+        np.divide(paths, peaks, out=paths)
+        max_drawdown[block] = (1 - paths.min(axis=1)) * 100
+
+    return MonteCarloResult(
+        method=method,
+        trades=length,
+        initial_balance=float(initial_balance),
+        ruin_pct=float(ruin_pct),
+        final_return_pct=final_return,
+        max_drawdown_pct=max_drawdown,
+        ruined=ruined,
+        elapsed_seconds=time.perf_counter() - started,
+        chunks=len(rngs),
+    )
+
+
+def analyze_trade_log(
+    trade_log: Iterable,
+    simulations: int = DEFAULT_SIMULATIONS,
+    initial_balance: float = 1000,
+    ruin_pct: float = DEFAULT_RUIN_PCT,
+    seed: Optional[int] = None,
+    max_memory_mb: float = MAX_MEMORY_MB,
+) -> Dict[str, MonteCarloResult]:
+    """Bootstrap i permutacje dla dziennika transakcji (pusty słownik, gdy nie ma zamkniętych transakcji)."""
+    returns = trade_returns(trade_log, initial_balance)
+    if not len(returns):
+        return {}
+    return {
+        method: monte_carlo(
+            returns,
+            simulations=simulations,
+            method=method,
+            initial_balance=initial_balance,
+            ruin_pct=ruin_pct,
+            seed=seed,
+            max_memory_mb=max_memory_mb,
+        )
+        for method in METHODS
+    }
@@ -0,0 +1,388 @@
+import queue
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from threading import Lock
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from trading.rate_limiter import PRIORITY_ANALYTICS
+from trading.signal_engine import fetch_orderbook
+
+DEFAULT_TIERS = (5, 20, 100, 500)
+RESYNC_EVERY = 10_000
+# Zdarzenia buforowane na symbol w czasie oczekiwania na snapshot.
+MAX_PENDING_EVENTS = 5_000
+RESYNC_RETRY_SECONDS = 1.0
+
+# Zmiana poziomu: (czy bid, cena, poprzedni wolumen, nowy wolumen).
+LevelChange = Tuple[bool, float, float, float]
+
+
+class BookListener:
+    """Odbiorca zmian książki (np. `trading.wall_tracker.WallTracker`).
+
+    Metody są wywoływane pod blokadą rejestru, po nałożeniu całego
+    zdarzenia albo snapshotu – powinny być szybkie.
+    """
+
+    def on_book_changes(self, book: "OrderBook", changes: List[LevelChange], timestamp_ms: int) -> None:
+        pass
+
+    def on_book_snapshot(self, book: "OrderBook", timestamp_ms: int) -> None:
+        pass
+
+    def on_trade(self, symbol: str, price: float, qty: float, is_buyer_maker: bool, timestamp_ms: int) -> None:
+        pass
+
+
+class _BookSide:
+    """Jedna strona książki: poziomy posortowane od najlepszego oraz bieżące
+    sumy wolumenu dla N najlepszych poziomów (progi `tiers`)."""
+
+    def __init__(self, is_bid: bool, tiers: Sequence[int], large_threshold: Optional[float]):
+        self.is_bid = is_bid
+        self.tiers = tuple(sorted(int(tier) for tier in tiers))
+        self.tier_totals = [0.0] * len(self.tiers)
+        self.large_threshold = large_threshold
+        self.levels: Dict[float, float] = {}
+        # Klucz sortowania: -cena dla bidów, cena dla asków – indeks 0 to zawsze najlepszy poziom.
+        self._keys: List[float] = []
+        self.large: Dict[float, float] = {}
+        self._updates = 0
+
+    def _key(self, price: float) -> float:
+        return -price if self.is_bid else price
+
+    def _price_at(self, index: int) -> float:
+        key = self._keys[index]
+        return -key if self.is_bid else key
+
+    def clear(self) -> None:
+        self.levels.clear()
+        self._keys.clear()
+        self.large.clear()
+        self.tier_totals = [0.0] * len(self.tiers)
+
+    def load(self, levels: Iterable[Tuple[float, float]]) -> None:
+        self.clear()
+        for price, qty in levels:
+            if qty > 0:
+                self.levels[price] = qty
+        self._keys = sorted(self._key(price) for price in self.levels)
+        self.large = {
+            price: qty for price, qty in self.levels.items() if self._is_large(qty)
+        }
+        self.resync()
+
+    def resync(self) -> None:
+        for i, tier in enumerate(self.tiers):
+            self.tier_totals[i] = sum(self.levels[self._price_at(j)] for j in range(min(tier, len(self._keys))))
+        self._updates = 0
+
+    def _is_large(self, qty: float) -> bool:
+        return self.large_threshold is not None and qty >= self.large_threshold
+
+    def update(self, price: float, qty: float) -> float:
+        """Ustawia wolumen poziomu i zwraca poprzedni (0.0 gdy poziomu nie było)."""
+        old = self.levels.get(price, 0.0)
+        if qty <= 0:
+            if price not in self.levels:
+                return 0.0
+            index = bisect_left(self._keys, self._key(price))
+            del self._keys[index]
+            del self.levels[price]
+            self.large.pop(price, None)
+            size = len(self._keys)
+            for i, tier in enumerate(self.tiers):
+                if index < tier:
+                    self.tier_totals[i] -= old
+                    # Poziom spoza progu wskakuje na zwolnione miejsce.
+                    if size >= tier:
+                        self.tier_totals[i] += self.levels[self._price_at(tier - 1)]
+        elif price in self.levels:
+            index = bisect_left(self._keys, self._key(price))
+            self.levels[price] = qty
+            for i, tier in enumerate(self.tiers):
+                if index < tier:
+                    self.tier_totals[i] += qty - old
+        else:
+            index = bisect_left(self._keys, self._key(price))
+            self._keys.insert(index, self._key(price))
+            self.levels[price] = qty
+            size = len(self._keys)
+            for i, tier in enumerate(self.tiers):
+                if index < tier:
+                    self.tier_totals[i] += qty
+                    # Ostatni poziom progu zostaje z niego wypchnięty.
+                    if size > tier:
+                        self.tier_totals[i] -= self.levels[self._price_at(tier)]
+
+        if qty > 0:
+            if self._is_large(qty):
+                self.large[price] = qty
+            else:
+                self.large.pop(price, None)
+
+        self._updates += 1
+        if self._updates >= RESYNC_EVERY:
+            self.resync()
+        return old
+
+    def depth_total(self, levels: int) -> float:
+        for i, tier in enumerate(self.tiers):
+            if tier == levels:
+                return self.tier_totals[i]
+        return sum(self.levels[self._price_at(j)] for j in range(min(levels, len(self._keys))))
+
+    def best(self) -> Optional[Tuple[float, float]]:
+        if not self._keys:
+            return None
+        price = self._price_at(0)
+        return price, self.levels[price]
+
+    def top(self, levels: int) -> List[Tuple[float, float]]:
+        return [(self._price_at(j), self.levels[self._price_at(j)]) for j in range(min(levels, len(self._keys)))]
+
+
+class OrderBook:
+    """Lokalna replika książki L2 dla jednego symbolu.
+
+    Inicjowana snapshotem z `/api/v3/depth`, aktualizowana zdarzeniami
+    `depthUpdate` ze strumienia `<symbol>@depth`. Sprawdza ciągłość numerów
+    aktualizacji (`U`/`u`) zgodnie z dokumentacją Binance; po wykryciu luki
+    książka przestaje być zsynchronizowana i wymaga nowego snapshotu.
+    Sumy wolumenu dla progów głębokości są utrzymywane przyrostowo, więc
+    `imbalance()` i `large_orders()` to odczyty O(1).
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        tiers: Sequence[int] = DEFAULT_TIERS,
+        large_threshold: Optional[float] = None,
+    ):
+        self.symbol = symbol
+        self.bids = _BookSide(True, tiers, large_threshold)
+        self.asks = _BookSide(False, tiers, large_threshold)
+        self.last_update_id: Optional[int] = None
+        self.synced = False
+        self.gaps = 0
+        self._first_event = True
+        self.listeners: List[BookListener] = []
+
+    def load_snapshot(self, snapshot: Dict) -> None:
+        self.bids.load((float(price), float(qty)) for price, qty in snapshot.get("bids", []))
+        self.asks.load((float(price), float(qty)) for price, qty in snapshot.get("asks", []))
+        self.last_update_id = int(snapshot["lastUpdateId"])
+        self.synced = True
+        self._first_event = True
+        timestamp_ms = int(snapshot.get("E") or time.time() * 1000)
+        for listener in self.listeners:
+            listener.on_book_snapshot(self, timestamp_ms)
+
+    def apply_diff(self, event: Dict) -> bool:
+        """Nakłada zdarzenie `depthUpdate`. Zwraca False przy luce w sekwencji."""
+        if not self.synced or self.last_update_id is None:
+            return False
+        first_id = int(event["U"])
+        final_id = int(event["u"])
+        if final_id <= self.last_update_id:
+            return True
+        if self._first_event:
+            in_sequence = first_id <= self.last_update_id + 1 <= final_id
+        else:
+            in_sequence = first_id == self.last_update_id + 1
+        if not in_sequence:
+            self.synced = False
+            self.gaps += 1
+            return False
+
+        if not self.listeners:
+            for price, qty in event.get("b", []):
+                self.bids.update(float(price), float(qty))
+            for price, qty in event.get("a", []):
+                self.asks.update(float(price), float(qty))
+        else:
+            changes: List[LevelChange] = []
+            sides = ((True, self.bids, event.get("b", [])), (False, self.asks, event.get("a", [])))
+            for is_bid, side, levels in sides:
+                for price, qty in levels:
+                    price, qty = float(price), float(qty)
+                    old = side.update(price, qty)
+                    if old != qty:
+                        changes.append((is_bid, price, old, qty))
+            timestamp_ms = int(event.get("E") or time.time() * 1000)
+            for listener in self.listeners:
+                listener.on_book_changes(self, changes, timestamp_ms)
+        self.last_update_id = final_id
+        self._first_event = False
+        return True
+
+    def imbalance(self, depth: int = 100) -> float:
+        bid_total = self.bids.depth_total(depth)
+        ask_total = self.asks.depth_total(depth)
+        total = bid_total + ask_total
+        if total == 0:
+            return 0.0
+        return (bid_total - ask_total) / total
+
+    def large_orders(self) -> Tuple[Dict[float, float], Dict[float, float]]:
+        return dict(self.bids.large), dict(self.asks.large)
+
+    def best_bid(self) -> Optional[Tuple[float, float]]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[Tuple[float, float]]:
+        return self.asks.best()
+
+    def mid_price(self) -> Optional[float]:
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) / 2
+
+
+def _load_snapshot(symbol: str, limit: int) -> Dict:
+    # Snapshoty po luce mają niższy priorytet niż scoring i zlecenia – limiter
+    # nie pozwoli im zużyć rezerwy budżetu wagi.
+    return fetch_orderbook(symbol, limit, priority=PRIORITY_ANALYTICS)
+
+
+class OrderBookRegistry:
+    """Współdzielone książki per symbol, zasilane ze strumienia diff depth.
+
+    Zdarzenie dla niezsynchronizowanej książki nie pobiera snapshotu w wątku
+    strumienia: symbol trafia do kolejki jednego wątku `order-book-resync`,
+    a kolejne zdarzenia są buforowane. Wątek pobiera snapshoty po kolei
+    (domyślnie przez `http_client`, czyli wspólny limiter wagi, z priorytetem
+    analitycznym), ładuje je i nakłada zbuforowane zdarzenia. Po ponownym
+    połączeniu (`invalidate()`) wszystkie książki synchronizują się więc
+    po kolei, a nie jednym wybuchem zapytań o wadze 50.
+    """
+
+    def __init__(
+        self,
+        snapshot_loader: Optional[Callable[[str, int], Dict]] = None,
+        snapshot_limit: int = 1000,
+        tiers: Sequence[int] = DEFAULT_TIERS,
+        large_threshold: Optional[float] = None,
+    ):
+        self.snapshot_loader = snapshot_loader or _load_snapshot
+        self.snapshot_limit = snapshot_limit
+        self.tiers = tuple(tiers)
+        self.large_threshold = large_threshold
+        self._books: Dict[str, OrderBook] = {}
+        self._listeners: List[BookListener] = []
+        self._lock = Lock()
+        # Symbole czekające na snapshot -> zdarzenia do nałożenia po nim.
+        self._pending: Dict[str, Deque[Dict]] = {}
+        self._resync_queue: "queue.Queue[str]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self.resyncs = 0
+
+    def add_listener(self, listener: BookListener) -> None:
+        """Podpina odbiorcę zmian do wszystkich obecnych i przyszłych książek."""
+        with self._lock:
+            self._listeners.append(listener)
+            for book in self._books.values():
+                book.listeners.append(listener)
+
+    def book(self, symbol: str) -> OrderBook:
+        symbol = symbol.upper()
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is None:
+                book = self._books[symbol] = OrderBook(symbol, self.tiers, self.large_threshold)
+                book.listeners.extend(self._listeners)
+            return book
+
+    def get(self, symbol: str) -> Optional[OrderBook]:
+        with self._lock:
+            book = self._books.get(symbol.upper())
+        return book if book is not None and book.synced else None
+
+    def on_diff(self, symbol: str, event: Dict) -> None:
+        symbol = symbol.upper()
+        book = self.book(symbol)
+        with self._lock:
+            pending = self._pending.get(symbol)
+            if pending is not None:
+                pending.append(event)
+                return
+            if book.apply_diff(event):
+                return
+            self._pending[symbol] = deque([event], maxlen=MAX_PENDING_EVENTS)
+        self._request_resync(symbol)
+
+    def _request_resync(self, symbol: str) -> None:
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._resync_loop, name="order-book-resync", daemon=True)
+                self._worker.start()
+        self._resync_queue.put(symbol)
+
+    def _resync_loop(self) -> None:
+        while True:
+            symbol = self._resync_queue.get()
+            try:
+                if self._resync(symbol):
+                    continue
+            except Exception as exc:
+                print(f"❌ Nie udało się pobrać snapshotu order booka {symbol}: {exc}")
+            # Ponowienie z opóźnieniem, bez blokowania kolejki innych symboli.
+            retry = threading.Timer(RESYNC_RETRY_SECONDS, self._resync_queue.put, args=(symbol,))
+            retry.daemon = True
+            retry.start()
+
+    def pending_resyncs(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def resync(self, symbol: str) -> None:
+        """Pobiera snapshot w wątku wołającego; przy nieudanym nałożeniu zdarzeń kolejkuje ponowienie."""
+        if not self._resync(symbol.upper()):
+            self._request_resync(symbol.upper())
+
+    def _resync(self, symbol: str) -> bool:
+        """Ładuje snapshot i nakłada zbuforowane zdarzenia; False, gdy snapshot jest starszy niż one."""
+        snapshot = self.snapshot_loader(symbol, self.snapshot_limit)
+        book = self.book(symbol)
+        with self._lock:
+            book.load_snapshot(snapshot)
+            self.resyncs += 1
+            events = self._pending.pop(symbol, deque())
+            while events:
+                if not book.apply_diff(events[0]):
+                    self._pending[symbol] = events
+                    return False
+                events.popleft()
+            return True
+
+    def on_trade(self, symbol: str, event: Dict) -> None:
+        """Przekazuje odbiorcom transakcję ze strumienia `aggTrade`."""
+        symbol = symbol.upper()
+        price, qty = float(event["p"]), float(event["q"])
+        is_buyer_maker, timestamp_ms = bool(event["m"]), int(event["T"])
+        with self._lock:
+            for listener in self._listeners:
+                listener.on_trade(symbol, price, qty, is_buyer_maker, timestamp_ms)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            for book in self._books.values():
+                book.synced = False
+            # Zdarzenia sprzed rozłączenia są bezużyteczne; oczekujące
+            # snapshoty zostają w kolejce.
+            for symbol in self._pending:
+                self._pending[symbol] = deque(maxlen=MAX_PENDING_EVENTS)
+
+    def imbalance(self, symbol: str, depth: int = 100) -> Optional[float]:
+        with self._lock:
+            book = self._books.get(symbol.upper())
+            if book is None or not book.synced:
+                return None
+            return book.imbalance(depth)
+
+
+order_books = OrderBookRegistry()
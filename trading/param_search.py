@@ -0,0 +1,323 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import ta
+
+from trading.vector_backtest import next_true_index
+
+
+@dataclass(frozen=True)
+class StrategyParams:
+    ema_short: int
+    ema_long: int
+    macd_short: int
+    macd_long: int
+    rsi_period: int
+
+    def as_tuple(self) -> Tuple[int, int, int, int, int]:
+        return (self.ema_short, self.ema_long, self.macd_short, self.macd_long, self.rsi_period)
+
+
+@dataclass
+class TrialResult:
+    params: StrategyParams
+    final_balance: float
+    trades: int
+
+
+@dataclass
+class SearchReport:
+    results: List[TrialResult]
+    elapsed_seconds: float
+    workers: int
+
+    @property
+    def best(self) -> Optional[TrialResult]:
+        best = None
+        for result in self.results:
+            # Przy remisie wygrywa wcześniejsza próba, jak w pierwotnej pętli.
+            if best is None or result.final_balance > best.final_balance:
+                best = result
+        return best
+
+    @property
+    def trials_per_second(self) -> float:
+        return len(self.results) / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+def sample_params(rng: random.Random) -> StrategyParams:
+    """Losowanie w zakresach z `ai_automl.optimize_strategy`."""
+    return StrategyParams(
+        ema_short=rng.randint(5, 15),
+        ema_long=rng.randint(20, 50),
+        macd_short=rng.randint(10, 20),
+        macd_long=rng.randint(26, 40),
+        rsi_period=rng.randint(10, 20),
+    )
+
+
+class IndicatorCache:
+    """Serie wskaźników zapamiętane per (wskaźnik, okno).
+
+    MACD z `ta` to różnica dwóch EMA, więc zapamiętywane są tylko EMA
+    (wspólne dla linii trendu i MACD) oraz RSI.
+    """
+
+    def __init__(self, close: np.ndarray):
+        self.close = np.asarray(close, dtype=float)
+        self._series: Optional[pd.Series] = None
+        self._memo: Dict[Tuple[str, int], np.ndarray] = {}
+
+    @property
+    def series(self) -> pd.Series:
+        if self._series is None:
+            self._series = pd.Series(self.close)
+        return self._series
+
+    def ema(self, window: int) -> np.ndarray:
+        key = ("ema", window)
+        if key not in self._memo:
+            self._memo[key] = ta.trend.EMAIndicator(self.series, window=window).ema_indicator().to_numpy()
+        return self._memo[key]
+
+    def rsi(self, window: int) -> np.ndarray:
+        key = ("rsi", window)
+        if key not in self._memo:
+            self._memo[key] = ta.momentum.RSIIndicator(self.series, window=window).rsi().to_numpy()
+        return self._memo[key]
+
+    def macd(self, fast: int, slow: int) -> np.ndarray:
+        return self.ema(fast) - self.ema(slow)
+
+    def prepare(self, trials: Iterable[StrategyParams]) -> None:
+        """Liczy z góry wszystkie serie potrzebne podanym próbom."""
+        for params in trials:
+            for window in (params.ema_short, params.ema_long, params.macd_short, params.macd_long):
+                self.ema(window)
+            self.rsi(params.rsi_period)
+
+    def items(self) -> List[Tuple[Tuple[str, int], np.ndarray]]:
+        return list(self._memo.items())
+
+    def add(self, key: Tuple[str, int], values: np.ndarray) -> None:
+        """Dodaje gotową serię (np. widok na pamięć współdzieloną)."""
+        self._memo[key] = values
+
+    def window(self, start: int, stop: int) -> "IndicatorCache":
+        """Widok na świece `[start, stop)` bez kopiowania zapamiętanych serii.
+
+        Wskaźniki zostają policzone na całej historii, więc okno nie traci
+        świec na rozgrzewkę EMA/RSI (serie są przyczynowe, bez zaglądania w przyszłość).
+        """
+        view = IndicatorCache(self.close[start:stop])
+        for key, values in self._memo.items():
+            view.add(key, values[start:stop])
+        return view
+
+    def __len__(self) -> int:
+        return len(self._memo)
+
+
+def simulate(cache: IndicatorCache, params: StrategyParams, initial_balance: float = 1000) -> TrialResult:
+    """Wektorowy odpowiednik pętli z `ai_automl.optimize_strategy` (wynik identyczny)."""
+    close = cache.close
+    ema_short, ema_long = cache.ema(params.ema_short), cache.ema(params.ema_long)
+    macd = cache.macd(params.macd_short, params.macd_long)
+    rsi = cache.rsi(params.rsi_period)
+    with np.errstate(invalid="ignore"):
+        entries = np.flatnonzero((ema_short > ema_long) & (macd > 0) & (rsi < 70))
+        exits = np.flatnonzero((ema_short < ema_long) & (macd < 0) & (rsi > 30))
+
+    balance = initial_balance
+    position = 0
+    trades = 0
+    cursor = 1
+    while True:
+        i = next_true_index(entries, cursor)
+        if i is None:
+            break
+        price = close[i]
+        position = balance / price
+        balance -= position * price
+        trades += 1
+        j = next_true_index(exits, i + 1)
+        if j is None:
+            break
+        balance += position * close[j]
+        position = 0
+        cursor = j + 1
+
+    final_balance = balance + (position * close[-1] if position > 0 else 0)
+    return TrialResult(params=params, final_balance=float(final_balance), trades=trades)
+
+
+_worker_cache: Optional[IndicatorCache] = None
+
+
+def _init_worker(cache: IndicatorCache) -> None:
+    global _worker_cache
+    _worker_cache = cache
+
+
+def _run_trials(trials: List[StrategyParams], initial_balance: float) -> List[TrialResult]:
+    return [simulate(_worker_cache, params, initial_balance) for params in trials]
+
+
+def _chunks(items: List[StrategyParams], count: int) -> List[List[StrategyParams]]:
+    size = max(len(items) // count, 1)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def search(
+    close: np.ndarray,
+    trials: List[StrategyParams],
+    workers: Optional[int] = None,
+    initial_balance: float = 1000,
+) -> SearchReport:
+    """Ocenia próby w puli procesów (domyślnie wszystkie rdzenie).
+
+    Wskaźniki potrzebne próbom są liczone raz w procesie głównym i
+    przekazywane do workerów w inicjalizatorze (przy `fork` bez kopiowania).
+    Wyniki są w kolejności `trials`.
+    """
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    cache = IndicatorCache(close)
+    cache.prepare(trials)
+    if workers <= 1 or len(trials) < 2:
+        results = [simulate(cache, params, initial_balance) for params in trials]
+        workers = 1
+    else:
+        # Kilka paczek na worker wyrównuje obciążenie przy różnej liczbie transakcji.
+        batches = _chunks(trials, workers * 4)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache,)) as executor:
+            results = [
+                result
+                for batch in executor.map(_run_trials, batches, [initial_balance] * len(batches))
+                for result in batch
+            ]
+    return SearchReport(results=results, elapsed_seconds=time.perf_counter() - started, workers=workers)
+
+
+def random_search(
+    close: np.ndarray,
+    iterations: int = 50,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    initial_balance: float = 1000,
+) -> SearchReport:
+    rng = random.Random(seed) if seed is not None else random
+    trials = [sample_params(rng) for _ in range(iterations)]
+    return search(close, trials, workers=workers, initial_balance=initial_balance)
+
+
+TREND_EMA_SHORT = range(5, 16)
+TREND_EMA_LONG = range(20, 51)
+TREND_RSI_PERIOD = range(10, 31)
+TREND_RSI_MAX = 70
+TREND_CHUNK = 65_536
+
+
+@dataclass(frozen=True)
+class TrendParams:
+    ema_short: int
+    ema_long: int
+    rsi_period: int
+
+
+@dataclass
+class TrendGridReport:
+    """Wyniki pełnej siatki: `scores[i, j, k]` dla `ema_short[i]`, `ema_long[j]`, `rsi_period[k]`."""
+
+    ema_short: List[int]
+    ema_long: List[int]
+    rsi_period: List[int]
+    scores: np.ndarray
+    elapsed_seconds: float
+    workers: int
+    cached_series: int
+
+    @property
+    def evaluations(self) -> int:
+        return int(self.scores.size)
+
+    @property
+    def evaluations_per_second(self) -> float:
+        return self.evaluations / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def best(self) -> Tuple[TrendParams, float]:
+        # argmax zwraca pierwsze maksimum, czyli najmniejsze okna przy remisie.
+        i, j, k = np.unravel_index(int(np.argmax(self.scores)), self.scores.shape)
+        params = TrendParams(self.ema_short[i], self.ema_long[j], self.rsi_period[k])
+        return params, float(self.scores[i, j, k])
+
+
+def trend_grid_search(
+    close: np.ndarray,
+    ema_short: Iterable[int] = TREND_EMA_SHORT,
+    ema_long: Iterable[int] = TREND_EMA_LONG,
+    rsi_period: Iterable[int] = TREND_RSI_PERIOD,
+    rsi_max: float = TREND_RSI_MAX,
+    workers: Optional[int] = None,
+    cache: Optional[IndicatorCache] = None,
+) -> TrendGridReport:
+    """Suma zwrotów strategii "EMA krótka > EMA długa i RSI < `rsi_max`" dla każdej kombinacji okien.
+
+    Każda seria wskaźnika liczona jest raz (`IndicatorCache`), a wszystkie
+    okna RSI dla danej pary EMA oceniane są jednym iloczynem macierzy.
+    Pary EMA dzielone są między wątki (NumPy zwalnia GIL), więc żadna
+    konfiguracja nie jest liczona dwa razy. Wynik odpowiada
+    `(close.pct_change() * signals.shift(1)).sum()` z pandas. Podany
+    `cache` (np. `IndicatorCache.window`) zastępuje `close`.
+    """
+    started = time.perf_counter()
+    shorts, longs, rsis = [int(w) for w in ema_short], [int(w) for w in ema_long], [int(w) for w in rsi_period]
+    if not shorts or not longs or not rsis:
+        raise ValueError("Siatka parametrów nie może być pusta")
+    cache = cache if cache is not None else IndicatorCache(close)
+    for window in dict.fromkeys(shorts + longs):
+        cache.ema(window)
+    for window in rsis:
+        cache.rsi(window)
+
+    prices = cache.close
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = prices[1:] / prices[:-1] - 1
+        # Sygnał ze świecy t-1 ważony zwrotem świecy t; NaN (brak wskaźnika) = brak pozycji.
+        rsi_ok = np.stack([cache.rsi(window)[:-1] < rsi_max for window in rsis]).astype(float).T
+    returns = np.where(np.isfinite(returns), returns, 0.0)
+    longs_ema = np.stack([cache.ema(window)[:-1] for window in longs])
+
+    def score_short(window: int) -> np.ndarray:
+        short_ema = cache.ema(window)[:-1]
+        scores = np.zeros((len(longs), len(rsis)))
+        # Paczki świec ograniczają pamięć wątku przy długiej historii.
+        for start in range(0, len(returns), TREND_CHUNK):
+            block = slice(start, start + TREND_CHUNK)
+            with np.errstate(invalid="ignore"):
+                weighted = (short_ema[block] > longs_ema[:, block]) * returns[block]
+            scores += weighted @ rsi_ok[block]
+        return scores
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(shorts)))
+    if workers == 1:
+        blocks = [score_short(window) for window in shorts]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            blocks = list(executor.map(score_short, shorts))
+    return TrendGridReport(
+        ema_short=shorts,
+        ema_long=longs,
+        rsi_period=rsis,
+        scores=np.stack(blocks),
+        elapsed_seconds=time.perf_counter() - started,
+        workers=workers,
+        cached_series=len(cache),
+    )
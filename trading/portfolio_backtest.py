@@ -0,0 +1,459 @@
+import heapq
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trading.market_store import TIME_COLUMN, MarketStore, load_market_frame, to_epoch_ms
+from trading.replay import DEFAULT_HISTORY
+from trading.signal_engine import DEFAULT_RULES
+from trading.stop_simulator import RangeExtremes
+from trading.strategy_engine import RiskConfig
+
+ACTION_SELL = -1
+ACTION_HOLD = 0
+ACTION_BUY = 1
+
+EXIT_STOP_LOSS = 0
+EXIT_TAKE_PROFIT = 1
+EXIT_SIGNAL = 2
+EXIT_END = 3
+EXIT_REASONS = {EXIT_STOP_LOSS: "stop_loss", EXIT_TAKE_PROFIT: "take_profit", EXIT_SIGNAL: "signal", EXIT_END: "end"}
+
+_EXIT = 0
+_ENTRY = 1
+
+# Kolumny tabeli możliwych wejść (jeden wiersz na świecę z sygnałem BUY).
+_ENTRY_ROW, _PRICE, _STOP_DISTANCE, _TAKE_PROFIT, _EXIT_ROW, _EXIT_PRICE, _EXIT_REASON, _NEXT = range(8)
+
+
+@dataclass
+class PortfolioData:
+    """Świece wielu symboli na wspólnej osi czasu.
+
+    Tablice cen mają kształt `(świece, symbole)` w układzie kolumnowym
+    (`order="F"`), więc kolumna symbolu jest ciągła w pamięci; brak świecy
+    symbolu w danej chwili to NaN.
+    """
+
+    symbols: List[str]
+    open_time: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def rows(self, column: int) -> np.ndarray:
+        """Indeksy wspólnej osi czasu, w których symbol ma świecę."""
+        return np.flatnonzero(~np.isnan(self.close[:, column]))
+
+
+def align_frames(frames: Dict[str, pd.DataFrame]) -> PortfolioData:
+    """Układa ramki OHLCV (kolumna `timestamp` albo `open_time`) na wspólnej osi czasu."""
+    if not frames:
+        raise ValueError("Brak symboli do backtestu portfela")
+    symbols = [symbol.upper() for symbol in frames]
+    times = []
+    for df in frames.values():
+        time_column = "open_time" if "open_time" in df else TIME_COLUMN
+        times.append(to_epoch_ms(df[time_column]))
+    open_time = np.unique(np.concatenate(times))
+    shape = (len(open_time), len(symbols))
+    columns = {
+        name: np.full(shape, np.nan, dtype=np.float32 if name == "volume" else np.float64, order="F")
+        for name in ("high", "low", "close", "volume")
+    }
+    for column, (df, symbol_times) in enumerate(zip(frames.values(), times)):
+        rows = np.searchsorted(open_time, symbol_times)
+        for name, values in columns.items():
+            values[rows, column] = df[name].to_numpy() if name in df else 0.0
+    return PortfolioData(symbols=symbols, open_time=open_time, **columns)
+
+
+def load_portfolio(
+    symbols: Iterable[str],
+    interval: Optional[str] = None,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    store: Optional[MarketStore] = None,
+) -> PortfolioData:
+    """Świece symboli z magazynu (albo `market_data_<SYMBOL>.csv`) ułożone przez `align_frames`."""
+    frames = {}
+    for symbol in symbols:
+        df = load_market_frame(
+            symbol, columns=[TIME_COLUMN, "high", "low", "close", "volume"], interval=interval,
+            start=start, end=end, store=store,
+        )
+        if df is None or df.empty:
+            print(f"🚨 Brak danych rynkowych dla {symbol}!")
+            continue
+        frames[symbol] = df
+    return align_frames(frames)
+
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Suma ostatnich `window` wartości (NaN, dopóki okno nie jest pełne)."""
+    totals = np.full(len(values), np.nan)
+    if window <= len(values):
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        totals[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return totals
+
+
+def signal_actions(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    volume: np.ndarray,
+    rules: Optional[Dict[str, float]] = None,
+    risk: Optional[RiskConfig] = None,
+    imbalance: float = 0.0,
+    history: int = DEFAULT_HISTORY,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Akcje planu (`ACTION_*`) i ATR dla każdej świecy jednego symbolu.
+
+    Wektorowy odpowiednik `IndicatorEngine.build_trade_plan` (ta sama
+    semantyka SMA, RSI, skoku wolumenu i ATR co `trading.replay`) ze stałą
+    nierównowagą order booka. Świece rozgrzewki (`history - 1`) to HOLD.
+    """
+    rules = {**DEFAULT_RULES, **(rules or {})}
+    risk = risk or RiskConfig()
+    count = len(close)
+    # Przesunięcie o pierwszą cenę ogranicza błąd zaokrągleń sum kumulacyjnych.
+    base = close[0] if count else 0.0
+    fast_window, slow_window = int(rules["FAST_SMA"]), int(rules["SLOW_SMA"])
+    fast = _window_sum(close - base, fast_window) / fast_window + base
+    slow = _window_sum(close - base, slow_window) / slow_window + base
+
+    deltas = np.diff(close, prepend=close[:1])
+    period = int(rules["RSI_PERIOD"])
+    gains = deltas >= 0
+    gain_count = _window_sum(gains[1:].astype(float), period)
+    loss_count = period - gain_count
+    gain_sum = _window_sum(np.where(gains, deltas, 0.0)[1:], period)
+    loss_sum = -_window_sum(np.where(gains, 0.0, deltas)[1:], period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_gain = np.where(gain_count > 0, gain_sum / gain_count, 0.0)
+        avg_loss = np.where(loss_count > 0, loss_sum / loss_count, 0.0)
+        rsi = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+    rsi = np.concatenate(([np.nan], np.where(np.isnan(gain_count), np.nan, rsi)))
+
+    previous = np.concatenate((close[:1], close[:-1]))
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - previous), np.abs(low - previous)))
+    atr = np.concatenate(([np.nan], _window_sum(true_range[1:], risk.atr_period) / risk.atr_period))
+
+    # Bazowy wolumen: średnia z poprzednich świec okna historii (jak w IndicatorState).
+    volume = np.asarray(volume, dtype=np.float64)
+    cumulative = np.concatenate(([0.0], np.cumsum(volume)))
+    index = np.arange(count)
+    first = np.maximum(index - max(history - 1, 1), 0)
+    samples = index - first
+    with np.errstate(divide="ignore", invalid="ignore"):
+        baseline = (cumulative[index] - cumulative[first]) / samples
+    spike = (samples > 0) & (baseline != 0) & (volume >= baseline * float(rules["VOLUME_SPIKE_MULTIPLIER"]))
+
+    with np.errstate(invalid="ignore"):
+        score = (fast > slow).astype(np.int8) - (fast < slow).astype(np.int8)
+        rsi_buy = (rsi >= rules["RSI_BUY_MIN"]) & (rsi <= rules["RSI_BUY_MAX"])
+        rsi_sell = ~rsi_buy & (rsi >= rules["RSI_SELL_MIN"]) & (rsi <= rules["RSI_SELL_MAX"])
+    score += rsi_buy.astype(np.int8) - rsi_sell.astype(np.int8) + spike.astype(np.int8)
+    if imbalance >= float(rules["ORDERBOOK_IMBALANCE_BUY"]):
+        score += 1
+    elif imbalance <= float(rules["ORDERBOOK_IMBALANCE_SELL"]):
+        score -= 1
+
+    min_score = int(rules["MIN_SIGNAL_SCORE"])
+    actions = np.where(score >= min_score, ACTION_BUY, np.where(score <= -min_score, ACTION_SELL, ACTION_HOLD))
+    # Filtry `plan_from_signal`: potwierdzenie trendu i min_signal_score z RiskConfig.
+    actions[(actions == ACTION_BUY) & (fast < slow)] = ACTION_HOLD
+    actions[(actions == ACTION_SELL) & (fast > slow)] = ACTION_HOLD
+    actions[np.abs(score) < risk.min_signal_score] = ACTION_HOLD
+    actions[: max(history - 1, 0)] = ACTION_HOLD
+    return actions.astype(np.int8), atr
+
+
+@dataclass
+class PortfolioReport:
+    """Wynik backtestu portfela; transakcje jako tablice indeksowane numerem transakcji."""
+
+    symbols: List[str]
+    bars: int
+    elapsed_seconds: float
+    initial_quote: float
+    final_quote: float
+    open_time: np.ndarray
+    equity: np.ndarray
+    max_open_positions: int
+    symbol_index: np.ndarray
+    entry_row: np.ndarray
+    exit_row: np.ndarray
+    entry_price: np.ndarray
+    exit_price: np.ndarray
+    stop_loss: np.ndarray
+    take_profit: np.ndarray
+    quantity: np.ndarray
+    cost: np.ndarray
+    proceeds: np.ndarray
+    exit_reason: np.ndarray
+
+    @property
+    def trades(self) -> int:
+        return len(self.entry_row)
+
+    @property
+    def pnl(self) -> np.ndarray:
+        return self.proceeds - self.cost
+
+    @property
+    def bars_per_second(self) -> float:
+        """Świece × symbole przetworzone na sekundę."""
+        return self.bars * len(self.symbols) / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def total_pnl(self) -> float:
+        return self.final_quote - self.initial_quote
+
+    @property
+    def win_rate(self) -> float:
+        return float(np.mean(self.pnl > 0)) if self.trades else 0.0
+
+    @property
+    def max_drawdown_pct(self) -> float:
+        if not len(self.equity):
+            return 0.0
+        peaks = np.maximum.accumulate(self.equity)
+        return float(np.max((peaks - self.equity) / peaks) * 100)
+
+    def symbol_pnl(self) -> Dict[str, float]:
+        totals = np.bincount(self.symbol_index, weights=self.pnl, minlength=len(self.symbols))
+        return dict(zip(self.symbols, totals.tolist()))
+
+    def trade_log(self) -> List[Dict]:
+        pnl = self.pnl
+        return [
+            {
+                "symbol": self.symbols[symbol],
+                "entry_time": int(self.open_time[entry]),
+                "entry_price": float(entry_price),
+                "exit_time": int(self.open_time[exit_]),
+                "exit_price": float(exit_price),
+                "quantity": float(quantity),
+                "pnl": float(profit),
+                "pnl_pct": float(profit / cost * 100) if cost else 0.0,
+                "exit_reason": EXIT_REASONS[int(reason)],
+            }
+            for symbol, entry, exit_, entry_price, exit_price, quantity, profit, cost, reason in zip(
+                self.symbol_index,
+                self.entry_row,
+                self.exit_row,
+                self.entry_price,
+                self.exit_price,
+                self.quantity,
+                pnl,
+                self.cost,
+                self.exit_reason,
+            )
+        ]
+
+
+class PortfolioBacktest:
+    """Backtest reguł auto-tradera na wielu symbolach ze wspólnym saldem.
+
+    Reguły wejścia/wyjścia i SL/TP są takie jak w `ReplayHarness` (BUY
+    otwiera pozycję po close, SELL ją zamyka, SL/TP sprawdzane na low/high
+    kolejnych świec, przy obu w jednej świecy wygrywa SL). Wielkość pozycji
+    liczona jest jak w `plan_from_signal` z wolnego salda na początku
+    świecy (po wyjściach): ryzyko `risk_per_trade_pct` na odległość SL,
+    najwyżej `max_position_pct` salda. Zlecenia w jednej świecy idą w
+    kolejności symboli (jak `AUTO_TRADING.SYMBOLS`) i są pomijane, gdy
+    wolnych środków jest mniej niż wielkość zlecenia.
+
+    Sygnały i wyjścia wszystkich możliwych wejść liczone są wektorowo per
+    symbol (wyjścia nie zależą od salda), a wspólne saldo rozdzielane jest
+    w jednym przejściu po zdarzeniach wejścia/wyjścia na wspólnej osi czasu.
+    """
+
+    def __init__(
+        self,
+        rules: Optional[Dict[str, float]] = None,
+        risk: Optional[RiskConfig] = None,
+        initial_quote: float = 1000,
+        fee_pct: float = 0.1,
+        imbalance: float = 0.0,
+        history: int = DEFAULT_HISTORY,
+    ):
+        self.rules = {**DEFAULT_RULES, **(rules or {})}
+        self.risk = risk or RiskConfig()
+        self.initial_quote = float(initial_quote)
+        self.fee_rate = float(fee_pct) / 100
+        self.imbalance = float(imbalance)
+        self.history = int(history)
+
+    def entry_table(self, data: PortfolioData, column: int) -> np.ndarray:
+        """Możliwe wejścia symbolu z wyjściem policzonym z góry (kolumny `_ENTRY_ROW` … `_NEXT`).
+
+        `_NEXT` to numer pierwszego wejścia od świecy wyjścia (-1 po wyjściu
+        na końcu danych).
+        """
+        rows = data.rows(column)
+        high = data.high[rows, column]
+        low = data.low[rows, column]
+        close = data.close[rows, column]
+        actions, atr = signal_actions(
+            high, low, close, data.volume[rows, column], self.rules, self.risk, self.imbalance, self.history
+        )
+        with np.errstate(invalid="ignore"):
+            entries = np.flatnonzero((actions == ACTION_BUY) & (atr > 0))
+        sells = np.flatnonzero(actions == ACTION_SELL)
+
+        price = close[entries]
+        stop_distance = atr[entries] * float(self.risk.atr_multiplier_sl)
+        stop_loss = price - stop_distance
+        take_profit = price + atr[entries] * float(self.risk.atr_multiplier_tp)
+
+        cross, hit_stop = RangeExtremes(high, low).first_cross(entries + 1, stop_loss, take_profit)
+        if len(sells):
+            position = np.searchsorted(sells, entries + 1)
+            has_sell = position < len(sells)
+            sell_at = np.where(has_sell, sells[np.minimum(position, len(sells) - 1)], -1)
+        else:
+            has_sell = np.zeros(len(entries), dtype=bool)
+            sell_at = np.full(len(entries), -1)
+
+        by_level = (cross >= 0) & (~has_sell | (cross <= sell_at))
+        by_signal = ~by_level & has_sell
+        exit_local = np.where(by_level, cross, np.where(by_signal, sell_at, len(close) - 1))
+        exit_reason = np.where(
+            by_level,
+            np.where(hit_stop, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT),
+            np.where(by_signal, EXIT_SIGNAL, EXIT_END),
+        )
+        following = np.searchsorted(entries, exit_local)
+        table = np.empty((len(entries), 8))
+        table[:, _ENTRY_ROW] = rows[entries]
+        table[:, _PRICE] = price
+        table[:, _STOP_DISTANCE] = stop_distance
+        table[:, _TAKE_PROFIT] = take_profit
+        table[:, _EXIT_ROW] = rows[exit_local]
+        table[:, _EXIT_PRICE] = np.where(by_level, np.where(hit_stop, stop_loss, take_profit), close[exit_local])
+        table[:, _EXIT_REASON] = exit_reason
+        table[:, _NEXT] = np.where((exit_reason == EXIT_END) | (following >= len(entries)), -1, following)
+        return table
+
+    def run(self, data: PortfolioData) -> PortfolioReport:
+        started = time.perf_counter()
+        tables = [self.entry_table(data, column) for column in range(len(data.symbols))]
+        counts = np.array([len(table) for table in tables], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        for table, offset in zip(tables, offsets):
+            table[:, _NEXT] = np.where(table[:, _NEXT] >= 0, table[:, _NEXT] + offset, -1)
+        table = np.concatenate(tables) if tables else np.empty((0, 8))
+        del tables
+        ends = offsets[1:].tolist()
+
+        risk_rate = float(self.risk.risk_per_trade_pct) / 100
+        max_position_rate = float(self.risk.max_position_pct) / 100
+        keep = 1 - self.fee_rate
+        events = [
+            (table[start, _ENTRY_ROW], _ENTRY, column, start)
+            for column, start in enumerate(offsets[:-1].tolist())
+            if start < ends[column]
+        ]
+        heapq.heapify(events)
+        cash = self.initial_quote
+        bar_cash = cash
+        sized_row = -1.0
+        open_positions: Dict[int, Tuple[float, float, int]] = {}
+        max_open = 0
+        filled = array("q")
+        quantities = array("d")
+        costs = array("d")
+
+        while events:
+            row, kind, column, candidate = heapq.heappop(events)
+            if kind == _EXIT:
+                quantity, exit_price, following = open_positions.pop(column)
+                cash += quantity * exit_price * keep
+                if following >= 0:
+                    heapq.heappush(events, (table[following, _ENTRY_ROW], _ENTRY, column, following))
+                continue
+
+            if row != sized_row:
+                sized_row, bar_cash = row, cash
+            _, price, stop_distance, _, exit_row, exit_price, _, following = table[candidate].tolist()
+            size = min(bar_cash * risk_rate / stop_distance * price, bar_cash * max_position_rate)
+            if size <= 0 or cash < size:
+                if candidate + 1 < ends[column]:
+                    heapq.heappush(events, (table[candidate + 1, _ENTRY_ROW], _ENTRY, column, candidate + 1))
+                continue
+            cash -= size
+            quantity = size / price * keep
+            open_positions[column] = (quantity, exit_price, int(following))
+            max_open = max(max_open, len(open_positions))
+            filled.append(candidate)
+            quantities.append(quantity)
+            costs.append(size)
+            heapq.heappush(events, (exit_row, _EXIT, column, candidate))
+
+        trades = table[np.frombuffer(filled, dtype=np.int64)]
+        quantity = np.frombuffer(quantities, dtype=np.float64)
+        cost = np.frombuffer(costs, dtype=np.float64)
+        entry_row = trades[:, _ENTRY_ROW].astype(np.int64)
+        exit_row = trades[:, _EXIT_ROW].astype(np.int64)
+        exit_price = trades[:, _EXIT_PRICE]
+        symbol_index = np.searchsorted(offsets, np.frombuffer(filled, dtype=np.int64), side="right") - 1
+        proceeds = quantity * exit_price * keep
+        order = np.argsort(entry_row, kind="stable")
+        return PortfolioReport(
+            symbols=list(data.symbols),
+            bars=len(data.open_time),
+            elapsed_seconds=time.perf_counter() - started,
+            initial_quote=self.initial_quote,
+            final_quote=cash,
+            open_time=data.open_time,
+            equity=self._equity(data, symbol_index, entry_row, exit_row, quantity, cost, proceeds),
+            max_open_positions=max_open,
+            symbol_index=symbol_index[order],
+            entry_row=entry_row[order],
+            exit_row=exit_row[order],
+            entry_price=trades[order, _PRICE],
+            exit_price=exit_price[order],
+            stop_loss=trades[order, _PRICE] - trades[order, _STOP_DISTANCE],
+            take_profit=trades[order, _TAKE_PROFIT],
+            quantity=quantity[order],
+            cost=cost[order],
+            proceeds=proceeds[order],
+            exit_reason=trades[order, _EXIT_REASON].astype(np.int8),
+        )
+
+    def _equity(
+        self,
+        data: PortfolioData,
+        symbol_index: np.ndarray,
+        entry_row: np.ndarray,
+        exit_row: np.ndarray,
+        quantity: np.ndarray,
+        cost: np.ndarray,
+        proceeds: np.ndarray,
+    ) -> np.ndarray:
+        """Saldo + wartość otwartych pozycji (po close) na końcu każdej świecy wspólnej osi.
+
+        W świecy wyjścia pozycja jest już zamknięta.
+        """
+        bars = len(data.open_time)
+        cash_flow = np.zeros(bars + 1)
+        np.add.at(cash_flow, entry_row, -cost)
+        np.add.at(cash_flow, exit_row, proceeds)
+        equity = self.initial_quote + np.cumsum(cash_flow[:bars])
+        for column in np.unique(symbol_index):
+            mine = symbol_index == column
+            rows = data.rows(column)
+            held = np.zeros(len(rows) + 1)
+            np.add.at(held, np.searchsorted(rows, entry_row[mine]), quantity[mine])
+            np.add.at(held, np.searchsorted(rows, exit_row[mine]), -quantity[mine])
+            value = np.cumsum(held[:-1]) * data.close[rows, column]
+            equity[rows[0]:] += np.repeat(value, np.diff(np.append(rows, bars)))
+        return equity
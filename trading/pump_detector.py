@@ -0,0 +1,362 @@
+import json
+import threading
+import time
+import warnings
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+import websocket
+
+from trading.exchange_info import exchange_info
+from trading.kline_cache import candle_open_ms, interval_to_ms
+from trading.market_stream import BINANCE_STREAM_URL, MAX_STREAMS_PER_CONNECTION
+
+DEFAULT_WINDOW = 60
+RETURN_Z_THRESHOLD = 4.0
+VOLUME_Z_THRESHOLD = 3.0
+MIN_RETURN_PCT = 2.0
+COOLDOWN_CANDLES = 15
+ALERT_HISTORY = 500
+
+PUMP = "pump"
+DUMP = "dump"
+
+
+@dataclass
+class PumpAlert:
+    symbol: str
+    open_time: int
+    kind: str
+    return_pct: float
+    return_z: float
+    volume_z: float
+
+    @property
+    def label(self) -> str:
+        return "🚀 Możliwy Pump!" if self.kind == PUMP else "⚠️ Możliwy Dump!"
+
+    def format(self) -> str:
+        return (
+            f"{self.symbol} {self.label} | Zmiana: {self.return_pct:.2f}% "
+            f"(z={self.return_z:.1f}, wolumen z={self.volume_z:.1f})"
+        )
+
+
+def _pad(array: np.ndarray, extra: int, fill) -> np.ndarray:
+    return np.concatenate([array, np.full((extra,) + array.shape[1:], fill, dtype=array.dtype)])
+
+
+class PumpDetector:
+    """Wykrywanie pump/dump dla wielu symboli naraz na świecach jednego interwału.
+
+    Stan wszystkich symboli to tablice NumPy `(symbole, okno)`: bufory
+    pierścieniowe stóp zwrotu (%) i logarytmu wolumenu. `update()` przyjmuje
+    zamknięte świece wielu symboli z jednego `open_time` i liczy z-score
+    zwrotu i wolumenu względem poprzednich `window` świec operacjami na
+    całych tablicach, więc koszt w Pythonie nie rośnie z liczbą symboli.
+
+    Alert wymaga |zwrotu| >= `min_return_pct`, z-score zwrotu >=
+    `return_z` i z-score wolumenu >= `volume_z`. Ten sam kierunek dla
+    symbolu jest zgłaszany ponownie dopiero po `cooldown_candles` świecach,
+    chyba że ruch jest silniejszy niż poprzednio zgłoszony.
+    """
+
+    def __init__(
+        self,
+        interval: str = "1m",
+        window: int = DEFAULT_WINDOW,
+        return_z: float = RETURN_Z_THRESHOLD,
+        volume_z: float = VOLUME_Z_THRESHOLD,
+        min_return_pct: float = MIN_RETURN_PCT,
+        cooldown_candles: int = COOLDOWN_CANDLES,
+        min_periods: Optional[int] = None,
+        symbols: Sequence[str] = (),
+    ):
+        self.interval = interval
+        self.step_ms = interval_to_ms(interval)
+        self.window = int(window)
+        self.return_z = float(return_z)
+        self.volume_z = float(volume_z)
+        self.min_return_pct = float(min_return_pct)
+        self.cooldown_ms = int(cooldown_candles) * self.step_ms
+        self.min_periods = int(min_periods) if min_periods is not None else max(self.window // 2, 2)
+        self._index: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._returns = np.empty((0, self.window))
+        self._volumes = np.empty((0, self.window))
+        self._slot = np.empty(0, dtype=np.int64)
+        self._last_close = np.empty(0)
+        self._last_time = np.empty(0, dtype=np.int64)
+        # Ostatni alert per symbol i kierunek (kolumna 0 – pump, 1 – dump).
+        self._alert_time = np.empty((0, 2), dtype=np.int64)
+        self._alert_return = np.empty((0, 2))
+        self._grow(max(len(symbols), 16))
+        for symbol in symbols:
+            self._row(symbol)
+
+    def _grow(self, capacity: int) -> None:
+        extra = capacity - len(self._slot)
+        self._returns = _pad(self._returns, extra, np.nan)
+        self._volumes = _pad(self._volumes, extra, np.nan)
+        self._slot = _pad(self._slot, extra, 0)
+        self._last_close = _pad(self._last_close, extra, np.nan)
+        self._last_time = _pad(self._last_time, extra, -1)
+        self._alert_time = _pad(self._alert_time, extra, -1)
+        self._alert_return = _pad(self._alert_return, extra, 0.0)
+
+    def _row(self, symbol: str) -> int:
+        symbol = symbol.upper()
+        row = self._index.get(symbol)
+        if row is None:
+            row = len(self._symbols)
+            if row >= len(self._slot):
+                self._grow(len(self._slot) * 2)
+            self._index[symbol] = row
+            self._symbols.append(symbol)
+        return row
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._symbols)
+
+    def update(
+        self, open_time: int, symbols: Sequence[str], close: Sequence[float], volume: Sequence[float]
+    ) -> List[PumpAlert]:
+        """Dodaje zamknięte świece `open_time` podanych symboli i zwraca nowe alerty."""
+        if not len(symbols):
+            return []
+        rows = np.fromiter((self._row(symbol) for symbol in symbols), dtype=np.int64, count=len(symbols))
+        close = np.asarray(close, dtype=float)
+        volume = np.asarray(volume, dtype=float)
+        # Świeca nie nowsza niż ostatnia przyjęta (np. powtórzona po reconnect) jest pomijana.
+        fresh = self._last_time[rows] < open_time
+        rows, close, volume = rows[fresh], close[fresh], volume[fresh]
+        if not len(rows):
+            return []
+
+        previous_close = self._last_close[rows]
+        # Zwrot liczymy tylko względem bezpośrednio poprzedniej świecy – po luce brak porównania.
+        consecutive = (self._last_time[rows] == open_time - self.step_ms) & (previous_close > 0)
+        returns = np.full(len(rows), np.nan)
+        returns[consecutive] = (close[consecutive] / previous_close[consecutive] - 1) * 100
+        log_volume = np.log1p(np.maximum(volume, 0.0))
+
+        history_returns = self._returns[rows]
+        history_volumes = self._volumes[rows]
+        with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+            # Wiersze bez historii (rozgrzewka) dają NaN i ostrzeżenie NumPy.
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            samples = np.count_nonzero(~np.isnan(history_returns), axis=1)
+            return_std = np.nanstd(history_returns, axis=1)
+            volume_std = np.nanstd(history_volumes, axis=1)
+            return_score = (returns - np.nanmean(history_returns, axis=1)) / return_std
+            volume_score = (log_volume - np.nanmean(history_volumes, axis=1)) / volume_std
+            ready = (samples >= self.min_periods) & (return_std > 0) & (volume_std > 0)
+            spike = ready & (volume_score >= self.volume_z)
+            up = spike & (returns >= self.min_return_pct) & (return_score >= self.return_z)
+            down = spike & (returns <= -self.min_return_pct) & (return_score <= -self.return_z)
+
+        alerts = []
+        for direction, kind, mask in ((0, PUMP, up), (1, DUMP, down)):
+            hits = np.flatnonzero(mask)
+            if not len(hits):
+                continue
+            hit_rows = rows[hits]
+            last_alert = self._alert_time[hit_rows, direction]
+            cooled = (
+                (last_alert < 0)
+                | (open_time - last_alert >= self.cooldown_ms)
+                | (np.abs(returns[hits]) > np.abs(self._alert_return[hit_rows, direction]))
+            )
+            hits, hit_rows = hits[cooled], hit_rows[cooled]
+            self._alert_time[hit_rows, direction] = open_time
+            self._alert_return[hit_rows, direction] = returns[hits]
+            alerts.extend(
+                PumpAlert(
+                    symbol=self._symbols[row],
+                    open_time=int(open_time),
+                    kind=kind,
+                    return_pct=float(returns[k]),
+                    return_z=float(return_score[k]),
+                    volume_z=float(volume_score[k]),
+                )
+                for k, row in zip(hits.tolist(), hit_rows.tolist())
+            )
+
+        slots = self._slot[rows]
+        self._returns[rows, slots] = returns
+        self._volumes[rows, slots] = log_volume
+        self._slot[rows] = (slots + 1) % self.window
+        self._last_close[rows] = close
+        self._last_time[rows] = open_time
+        return alerts
+
+
+@dataclass
+class _Batch:
+    open_time: int
+    symbols: List[str]
+    close: List[float]
+    volume: List[float]
+
+
+class PumpStream:
+    """Zasila `PumpDetector` z WebSocketów Binance dla wszystkich par z `quote_asset`.
+
+    Tryb `kline`: strumienie `<symbol>@kline_<interwał>` (po maks.
+    `MAX_STREAMS_PER_CONNECTION` na połączenie). Zamknięte świece są
+    zbierane per `open_time` i przekazywane do detektora, gdy dotrą od
+    wszystkich symboli albo gdy zacznie się następna świeca – alert pojawia
+    się najpóźniej jedną świecę po ruchu.
+
+    Tryb `ticker`: jeden strumień `!miniTicker@arr` dla całego rynku.
+    Notowania są grupowane w świece interwału detektora: zamknięcie to
+    ostatnia cena, a wolumen to przyrost 24-godzinnego wolumenu w walucie
+    kwotowania (przybliżenie – okno 24 h przesuwa się w tym czasie).
+    """
+
+    def __init__(
+        self,
+        detector: PumpDetector,
+        symbols: Optional[Sequence[str]] = None,
+        mode: str = "kline",
+        quote_asset: str = "USDT",
+        base_url: str = BINANCE_STREAM_URL,
+        on_alert: Optional[Callable[[PumpAlert], None]] = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        if mode not in {"kline", "ticker"}:
+            raise ValueError(f"Nieobsługiwany tryb strumienia: {mode}")
+        self.detector = detector
+        self.mode = mode
+        self.quote_asset = quote_asset
+        self.symbols = [symbol.upper() for symbol in symbols] if symbols else exchange_info.symbols(quote_asset)
+        self._symbol_set: Set[str] = set(self.symbols)
+        self.base_url = base_url.rstrip("/")
+        self.on_alert = on_alert
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.alerts: Deque[PumpAlert] = deque(maxlen=ALERT_HISTORY)
+        self.batches = 0
+        self.last_update_ms = 0.0
+        self.max_update_ms = 0.0
+        self._batch: Optional[_Batch] = None
+        # Tryb ticker: ostatnia cena i wolumen 24 h na początku bieżącej świecy.
+        self._ticker_close: Dict[str, float] = {}
+        self._ticker_volume_start: Dict[str, float] = {}
+        self._ticker_volume: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._sockets: List[websocket.WebSocketApp] = []
+
+    def stream_urls(self) -> List[str]:
+        if self.mode == "ticker":
+            return [f"{self.base_url}/ws/!miniTicker@arr"]
+        streams = [f"{symbol.lower()}@kline_{self.detector.interval}" for symbol in self.symbols]
+        return [
+            f"{self.base_url}/stream?streams={'/'.join(streams[i:i + MAX_STREAMS_PER_CONNECTION])}"
+            for i in range(0, len(streams), MAX_STREAMS_PER_CONNECTION)
+        ]
+
+    def start(self) -> "PumpStream":
+        self._stopped.clear()
+        for number, url in enumerate(self.stream_urls()):
+            thread = threading.Thread(target=self._run, args=(url,), name=f"pump-stream-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        for ws in list(self._sockets):
+            ws.close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads.clear()
+
+    def _run(self, url: str) -> None:
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            ws = websocket.WebSocketApp(
+                url,
+                on_message=lambda _ws, raw: self.on_message(raw),
+                on_error=lambda _ws, error: print(f"❌ Błąd strumienia pump/dump: {error}"),
+            )
+            self._sockets.append(ws)
+            started = time.monotonic()
+            ws.run_forever(ping_interval=60, ping_timeout=10)
+            self._sockets.remove(ws)
+            if self._stopped.is_set():
+                break
+            if time.monotonic() - started > self.max_reconnect_delay:
+                delay = self.reconnect_delay
+            print(f"🔌 Strumień pump/dump rozłączony, ponowne połączenie za {delay:.1f}s...")
+            self._stopped.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def on_message(self, raw: str) -> None:
+        message = json.loads(raw)
+        data = message.get("data", message) if isinstance(message, dict) else message
+        with self._lock:
+            if isinstance(data, list):
+                self._handle_tickers(data)
+            elif data.get("e") == "kline" and data["k"].get("x"):
+                kline = data["k"]
+                self._add(int(kline["t"]), data["s"].upper(), float(kline["c"]), float(kline["v"]))
+
+    def _handle_tickers(self, tickers: List[Dict]) -> None:
+        for ticker in tickers:
+            symbol = ticker["s"]
+            if symbol not in self._symbol_set:
+                continue
+            open_time = candle_open_ms(int(ticker["E"]), self.detector.interval)
+            if self._batch is not None and open_time > self._batch.open_time:
+                self._close_ticker_candle()
+            if self._batch is None:
+                self._batch = _Batch(open_time, [], [], [])
+            quote_volume = float(ticker["q"])
+            self._ticker_volume_start.setdefault(symbol, quote_volume)
+            self._ticker_close[symbol] = float(ticker["c"])
+            self._ticker_volume[symbol] = quote_volume
+
+    def _close_ticker_candle(self) -> None:
+        batch = self._batch
+        for symbol, close in self._ticker_close.items():
+            batch.symbols.append(symbol)
+            batch.close.append(close)
+            batch.volume.append(max(self._ticker_volume[symbol] - self._ticker_volume_start[symbol], 0.0))
+        # Wolumen kolejnej świecy liczony od ostatniego odczytu tej.
+        self._ticker_volume_start = dict(self._ticker_volume)
+        self._ticker_close.clear()
+        self._flush()
+
+    def _add(self, open_time: int, symbol: str, close: float, volume: float) -> None:
+        if self._batch is not None and open_time > self._batch.open_time:
+            self._flush()
+        if self._batch is None:
+            self._batch = _Batch(open_time, [], [], [])
+        elif open_time < self._batch.open_time:
+            return
+        self._batch.symbols.append(symbol)
+        self._batch.close.append(close)
+        self._batch.volume.append(volume)
+        if len(self._batch.symbols) >= len(self.symbols):
+            self._flush()
+
+    def _flush(self) -> None:
+        batch, self._batch = self._batch, None
+        if batch is None or not batch.symbols:
+            return
+        started = time.perf_counter()
+        alerts = self.detector.update(batch.open_time, batch.symbols, batch.close, batch.volume)
+        self.last_update_ms = (time.perf_counter() - started) * 1000
+        self.max_update_ms = max(self.max_update_ms, self.last_update_ms)
+        self.batches += 1
+        for alert in alerts:
+            self.alerts.append(alert)
+            if self.on_alert is not None:
+                self.on_alert(alert)
@@ -0,0 +1,208 @@
+import time
+from dataclasses import dataclass
+from threading import Condition
+from typing import Callable, Dict, Optional
+
+PRIORITY_ORDER = 0
+PRIORITY_TRADING = 1
+PRIORITY_ANALYTICS = 2
+
+# Limity Binance Spot: REQUEST_WEIGHT na minutę oraz liczba zleceń na 10 s.
+WEIGHT_LIMIT_PER_MINUTE = 6000
+ORDER_LIMIT_PER_10S = 50
+
+# Część budżetu, której dany priorytet nie może zużyć – zostaje dla
+# ważniejszego ruchu (zlecenia mogą wykorzystać cały budżet).
+PRIORITY_RESERVE = {
+    PRIORITY_ORDER: 0.0,
+    PRIORITY_TRADING: 0.1,
+    PRIORITY_ANALYTICS: 0.3,
+}
+
+ACCOUNT_WEIGHT = 20
+EXCHANGE_INFO_WEIGHT = 20
+ORDER_WEIGHT = 1
+
+_FIXED_WEIGHTS = {
+    "/api/v3/ping": 1,
+    "/api/v3/time": 1,
+    "/api/v3/klines": 2,
+    "/api/v3/uiKlines": 2,
+    "/api/v3/avgPrice": 2,
+    "/api/v3/exchangeInfo": EXCHANGE_INFO_WEIGHT,
+    "/api/v3/account": ACCOUNT_WEIGHT,
+    "/api/v3/myTrades": 20,
+    "/api/v3/order": ORDER_WEIGHT,
+    "/api/v3/userDataStream": 2,
+}
+
+
+def depth_weight(limit: int) -> int:
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+def endpoint_weight(path: str, params: Optional[Dict] = None) -> int:
+    """Waga zapytania REST wg dokumentacji Binance Spot API."""
+    params = params or {}
+    if path == "/api/v3/depth":
+        return depth_weight(int(params.get("limit", 100)))
+    if path in {"/api/v3/ticker/price", "/api/v3/ticker/bookTicker"}:
+        return 2 if "symbol" in params else 4
+    if path == "/api/v3/ticker/24hr":
+        return 2 if "symbol" in params else 80
+    if path == "/api/v3/openOrders":
+        return 6 if "symbol" in params else 80
+    return _FIXED_WEIGHTS.get(path, 1)
+
+
+@dataclass
+class Budget:
+    available: float
+    capacity: float
+    orders_available: float
+    paused_for: float
+    waiting: int
+
+    @property
+    def available_ratio(self) -> float:
+        return self.available / self.capacity if self.capacity else 0.0
+
+
+class _TokenBucket:
+    def __init__(self, capacity: float, window_seconds: float, now: float):
+        self.capacity = capacity
+        self.rate = capacity / window_seconds
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        return max(amount - self.tokens, 0.0) / self.rate
+
+
+class WeightScheduler:
+    """Centralny limiter wagi zapytań do giełdy (token bucket).
+
+    `acquire()` blokuje (kolejkuje) zamiast zwracać błąd. Wątki o wyższym
+    priorytecie (niższa liczba) są obsługiwane przed niższymi, a ruch
+    analityczny nie może zużyć rezerwy budżetu trzymanej dla zleceń.
+    Budżet jest korygowany nagłówkami `X-MBX-USED-WEIGHT-1M`, a odpowiedzi
+    429/418 wstrzymują cały ruch na czas z `Retry-After`.
+    """
+
+    def __init__(
+        self,
+        weight_limit: int = WEIGHT_LIMIT_PER_MINUTE,
+        order_limit: int = ORDER_LIMIT_PER_10S,
+        safety_margin: float = 0.9,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.clock = clock
+        now = clock()
+        self._weight = _TokenBucket(weight_limit * safety_margin, 60.0, now)
+        self._orders = _TokenBucket(order_limit * safety_margin, 10.0, now)
+        self._paused_until = 0.0
+        self._waiting = {PRIORITY_ORDER: 0, PRIORITY_TRADING: 0, PRIORITY_ANALYTICS: 0}
+        self._cond = Condition()
+        self.throttled_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._weight.refill(now)
+        self._orders.refill(now)
+
+    def _higher_priority_waiting(self, priority: int) -> bool:
+        return any(count for level, count in self._waiting.items() if level < priority)
+
+    def acquire(
+        self,
+        weight: int,
+        priority: int = PRIORITY_ANALYTICS,
+        orders: int = 0,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        reserve = self._weight.capacity * PRIORITY_RESERVE.get(priority, 0.0)
+        weight = min(float(weight), self._weight.capacity - reserve)
+        started = self.clock()
+        deadline = None if timeout is None else started + timeout
+        with self._cond:
+            self._waiting[priority] = self._waiting.get(priority, 0) + 1
+            try:
+                while True:
+                    now = self.clock()
+                    self._refill(now)
+                    if (
+                        now >= self._paused_until
+                        and not self._higher_priority_waiting(priority)
+                        and self._weight.tokens - weight >= reserve
+                        and self._orders.tokens >= orders
+                    ):
+                        self._weight.tokens -= weight
+                        self._orders.tokens -= orders
+                        self.throttled_seconds += now - started
+                        return True
+                    if now < self._paused_until:
+                        wait = self._paused_until - now
+                    else:
+                        wait = max(
+                            self._weight.wait_for(weight + reserve),
+                            self._orders.wait_for(orders),
+                            0.01,
+                        )
+                    if deadline is not None:
+                        if now >= deadline:
+                            return False
+                        wait = min(wait, deadline - now)
+                    self._cond.wait(wait)
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def observe_response(self, status_code: int, headers) -> None:
+        """Uwzględnia nagłówki i status odpowiedzi giełdy."""
+        used = headers.get("X-MBX-USED-WEIGHT-1M") if headers else None
+        if used is not None:
+            self.observe_used_weight(int(used))
+        if status_code in (429, 418):
+            retry_after = headers.get("Retry-After") if headers else None
+            self.on_rate_limited(float(retry_after) if retry_after else None, banned=status_code == 418)
+
+    def observe_used_weight(self, used_weight: int) -> None:
+        """Synchronizuje budżet z licznikiem giełdy (`X-MBX-USED-WEIGHT-1M`)."""
+        with self._cond:
+            self._refill(self.clock())
+            remaining = self._weight.capacity - float(used_weight)
+            if remaining < self._weight.tokens:
+                self._weight.tokens = max(remaining, 0.0)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None, banned: bool = False) -> None:
+        """Reakcja na 429 (przekroczenie) lub 418 (ban IP)."""
+        pause = retry_after if retry_after is not None else (120.0 if banned else 60.0)
+        with self._cond:
+            self._paused_until = max(self._paused_until, self.clock() + pause)
+            self._weight.tokens = 0.0
+            self._cond.notify_all()
+
+    def budget(self) -> Budget:
+        with self._cond:
+            now = self.clock()
+            self._refill(now)
+            return Budget(
+                available=self._weight.tokens,
+                capacity=self._weight.capacity,
+                orders_available=self._orders.tokens,
+                paused_for=max(self._paused_until - now, 0.0),
+                waiting=sum(self._waiting.values()),
+            )
+
+
+rate_limiter = WeightScheduler()
@@ -0,0 +1,283 @@
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trading.indicator_engine import IndicatorEngine
+from trading.kline_cache import next_candle_close_ms
+from trading.market_store import to_epoch_ms
+from trading.signal_engine import DEFAULT_RULES, build_signal, depth_imbalance
+from trading.strategy_engine import RiskConfig, TradePlan, build_trade_plan
+
+DEFAULT_HISTORY = 200
+ORDERBOOK_LIMIT = 100
+
+
+def klines_from_frame(df: pd.DataFrame) -> List[Dict[str, float]]:
+    """Zamienia ramkę OHLCV (np. `market_data_<SYMBOL>.csv`) na listę świec jak z `fetch_klines`."""
+    time_column = "open_time" if "open_time" in df else "timestamp"
+    times = to_epoch_ms(df[time_column])
+    volumes = df["volume"] if "volume" in df else np.zeros(len(df))
+    return [
+        {
+            "open_time": int(open_time),
+            "open": float(open_),
+            "high": float(high),
+            "low": float(low),
+            "close": float(close),
+            "volume": float(volume),
+        }
+        for open_time, open_, high, low, close, volume in zip(
+            times, df["open"], df["high"], df["low"], df["close"], volumes
+        )
+    ]
+
+
+class ReplayMarketData:
+    """Źródło danych dla `build_signal`/`build_trade_plan` z zapisanych świec
+    i snapshotów order booka – ten sam interfejs co `RestMarketData`.
+
+    Widoczne są tylko świece do bieżącego kursora (`set_cursor`), a
+    nierównowaga order booka pochodzi z ostatniego snapshotu sprzed
+    zamknięcia bieżącej świecy. Snapshot to słownik z `timestamp` (ms) oraz
+    `imbalance` albo surowymi `bids`/`asks` z `/api/v3/depth`.
+    """
+
+    def __init__(
+        self,
+        klines: Dict[str, List[Dict[str, float]]],
+        interval: str,
+        orderbooks: Optional[Dict[str, List[Dict]]] = None,
+        default_imbalance: float = 0.0,
+    ):
+        self.interval = interval
+        self.default_imbalance = default_imbalance
+        self._klines = {symbol.upper(): bars for symbol, bars in klines.items()}
+        self._cursor: Dict[str, int] = {symbol: 0 for symbol in self._klines}
+        self._book_times: Dict[str, List[int]] = {}
+        self._book_values: Dict[str, List[float]] = {}
+        for symbol, snapshots in (orderbooks or {}).items():
+            ordered = sorted(snapshots, key=lambda snapshot: int(snapshot["timestamp"]))
+            self._book_times[symbol.upper()] = [int(snapshot["timestamp"]) for snapshot in ordered]
+            self._book_values[symbol.upper()] = [self._snapshot_imbalance(snapshot) for snapshot in ordered]
+
+    @staticmethod
+    def _snapshot_imbalance(snapshot: Dict) -> float:
+        if "imbalance" in snapshot:
+            return float(snapshot["imbalance"])
+        return depth_imbalance(
+            {"bids": snapshot.get("bids", [])[:ORDERBOOK_LIMIT], "asks": snapshot.get("asks", [])[:ORDERBOOK_LIMIT]}
+        )
+
+    def set_cursor(self, symbol: str, index: int) -> None:
+        self._cursor[symbol.upper()] = index
+
+    def klines(self, symbol: str, interval: str, limit: int = 200) -> List[Dict[str, float]]:
+        if interval != self.interval:
+            raise ValueError(f"Replay zawiera świece {self.interval}, a nie {interval}.")
+        symbol = symbol.upper()
+        end = self._cursor[symbol] + 1
+        return self._klines[symbol][max(end - limit, 0):end]
+
+    def orderbook_imbalance(self, symbol: str, limit: int = 100) -> float:
+        symbol = symbol.upper()
+        times = self._book_times.get(symbol)
+        if not times:
+            return self.default_imbalance
+        current = self._klines[symbol][self._cursor[symbol]]
+        position = bisect_right(times, next_candle_close_ms(current["open_time"], self.interval))
+        if position == 0:
+            return self.default_imbalance
+        return self._book_values[symbol][position - 1]
+
+
+@dataclass
+class ReplayTrade:
+    symbol: str
+    entry_time: int
+    entry_price: Decimal
+    quantity: Decimal
+    cost: Decimal
+    stop_loss: Optional[Decimal] = None
+    take_profit: Optional[Decimal] = None
+    exit_time: Optional[int] = None
+    exit_price: Optional[Decimal] = None
+    proceeds: Decimal = Decimal("0")
+    exit_reason: str = ""
+
+    @property
+    def pnl(self) -> Decimal:
+        return self.proceeds - self.cost
+
+    @property
+    def pnl_pct(self) -> Decimal:
+        return self.pnl / self.cost * Decimal("100") if self.cost else Decimal("0")
+
+
+@dataclass
+class ReplayReport:
+    symbol: str
+    bars: int
+    elapsed_seconds: float
+    initial_quote: Decimal
+    final_quote: Decimal
+    trades: List[ReplayTrade] = field(default_factory=list)
+
+    @property
+    def bars_per_second(self) -> float:
+        return self.bars / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def total_pnl(self) -> Decimal:
+        return self.final_quote - self.initial_quote
+
+    @property
+    def win_rate(self) -> float:
+        if not self.trades:
+            return 0.0
+        return sum(1 for trade in self.trades if trade.pnl > 0) / len(self.trades)
+
+    def trade_log(self) -> List[Dict]:
+        return [
+            {
+                "symbol": trade.symbol,
+                "entry_time": trade.entry_time,
+                "entry_price": trade.entry_price,
+                "exit_time": trade.exit_time,
+                "exit_price": trade.exit_price,
+                "quantity": trade.quantity,
+                "pnl": trade.pnl,
+                "pnl_pct": trade.pnl_pct,
+                "exit_reason": trade.exit_reason,
+            }
+            for trade in self.trades
+        ]
+
+
+class ReplayHarness:
+    """Backtest reguł na żywo (`evaluate_signal` + `plan_from_signal`) świeca po świecy.
+
+    Domyślnie wskaźniki są liczone przyrostowo przez `IndicatorEngine`
+    (O(1) na świecę). Z `exact=True` każda świeca przechodzi przez
+    `build_signal`/`build_trade_plan` z `ReplayMarketData` jako źródłem –
+    dokładnie ścieżkę auto-tradera, ale wolniej.
+
+    Symulacja odpowiada auto-traderowi na rynku spot: BUY otwiera pozycję
+    przy braku pozycji, SELL ją zamyka. Zlecenia wypełniane są po cenie
+    zamknięcia świecy, a stop loss/take profit z planu sprawdzane na
+    low/high kolejnych świec (przy obu w jednej świecy wygrywa stop loss).
+    """
+
+    def __init__(
+        self,
+        rules: Optional[Dict[str, float]] = None,
+        risk: Optional[RiskConfig] = None,
+        initial_quote: Decimal = Decimal("1000"),
+        order_size_usdt: Decimal = Decimal("0"),
+        use_trade_plan: bool = True,
+        fee_pct: Decimal = Decimal("0.1"),
+        exact: bool = False,
+        history: int = DEFAULT_HISTORY,
+    ):
+        self.rules = {**DEFAULT_RULES, **(rules or {})}
+        self.risk = risk or RiskConfig()
+        self.initial_quote = Decimal(str(initial_quote))
+        self.order_size_usdt = Decimal(str(order_size_usdt))
+        self.use_trade_plan = use_trade_plan
+        self.fee_rate = Decimal(str(fee_pct)) / Decimal("100")
+        self.exact = exact
+        self.history = int(history)
+        if not use_trade_plan and self.order_size_usdt <= 0:
+            raise ValueError("Bez planu transakcji order_size_usdt musi być > 0.")
+
+    def _decide(
+        self, engine: IndicatorEngine, source: ReplayMarketData, symbol: str, interval: str, cash: Decimal
+    ) -> Tuple[str, Optional[TradePlan]]:
+        if self.exact:
+            signal = build_signal(symbol, interval, self.rules, source=source)
+            if not self.use_trade_plan:
+                return signal.action, None
+            plan = build_trade_plan(symbol, interval, self.rules, self.risk, cash, signal=signal, source=source)
+            return plan.action, plan
+        imbalance = source.orderbook_imbalance(symbol)
+        if not self.use_trade_plan:
+            return engine.build_signal(symbol, interval, imbalance).action, None
+        plan = engine.build_trade_plan(symbol, interval, imbalance, self.risk, cash)
+        return plan.action, plan
+
+    def _close(self, trade: ReplayTrade, exit_time: int, price: Decimal, reason: str) -> Decimal:
+        trade.exit_time = exit_time
+        trade.exit_price = price
+        trade.exit_reason = reason
+        trade.proceeds = trade.quantity * price * (Decimal("1") - self.fee_rate)
+        return trade.proceeds
+
+    def run(
+        self,
+        symbol: str,
+        klines: List[Dict[str, float]],
+        interval: Optional[str] = None,
+        orderbooks: Optional[List[Dict]] = None,
+    ) -> ReplayReport:
+        symbol = symbol.upper()
+        interval = interval or self.rules["INTERVAL"]
+        source = ReplayMarketData({symbol: klines}, interval, {symbol: orderbooks or []})
+        engine = IndicatorEngine(self.rules, atr_period=self.risk.atr_period, history=self.history)
+        cash = self.initial_quote
+        trades: List[ReplayTrade] = []
+        open_trade: Optional[ReplayTrade] = None
+        warmup = self.history - 1
+
+        started = time.perf_counter()
+        for index, kline in enumerate(klines):
+            if not self.exact:
+                engine.update(symbol, interval, kline)
+            if open_trade is not None:
+                stop_loss, take_profit = open_trade.stop_loss, open_trade.take_profit
+                if stop_loss is not None and kline["low"] <= stop_loss:
+                    cash += self._close(open_trade, kline["open_time"], stop_loss, "stop_loss")
+                    open_trade = None
+                elif take_profit is not None and kline["high"] >= take_profit:
+                    cash += self._close(open_trade, kline["open_time"], take_profit, "take_profit")
+                    open_trade = None
+            if index < warmup:
+                continue
+
+            source.set_cursor(symbol, index)
+            action, plan = self._decide(engine, source, symbol, interval, cash)
+            price = Decimal(str(kline["close"]))
+            if action == "BUY" and open_trade is None:
+                size = plan.order_size_usdt if plan and plan.order_size_usdt > 0 else self.order_size_usdt
+                if size <= 0 or cash < size:
+                    continue
+                cash -= size
+                open_trade = ReplayTrade(
+                    symbol=symbol,
+                    entry_time=kline["open_time"],
+                    entry_price=price,
+                    quantity=size / price * (Decimal("1") - self.fee_rate),
+                    cost=size,
+                    stop_loss=plan.stop_loss if plan else None,
+                    take_profit=plan.take_profit if plan else None,
+                )
+                trades.append(open_trade)
+            elif action == "SELL" and open_trade is not None:
+                cash += self._close(open_trade, kline["open_time"], price, "signal")
+                open_trade = None
+
+        if open_trade is not None:
+            last = klines[-1]
+            cash += self._close(open_trade, last["open_time"], Decimal(str(last["close"])), "end")
+
+        return ReplayReport(
+            symbol=symbol,
+            bars=len(klines),
+            elapsed_seconds=time.perf_counter() - started,
+            initial_quote=self.initial_quote,
+            final_quote=cash,
+            trades=trades,
+        )
@@ -0,0 +1,172 @@
+import time
+import zlib
+from dataclasses import dataclass
+from threading import Event
+from typing import Callable, Dict, Iterable, List, Optional
+
+from trading.http_client import BINANCE_BASE_URL, http_client
+from trading.kline_cache import candle_open_ms, next_candle_close_ms
+from trading.rate_limiter import PRIORITY_TRADING
+
+SERVER_TIME_RESYNC_SECONDS = 600
+# Opóźnienie po zamknięciu świecy, żeby giełda zdążyła ją domknąć.
+SETTLE_MS = 250
+MAX_SLEEP_SECONDS = 60.0
+
+
+def _fetch_server_time() -> int:
+    data = http_client.get_json(f"{BINANCE_BASE_URL}/api/v3/time", priority=PRIORITY_TRADING)
+    return int(data["serverTime"])
+
+
+class ServerClock:
+    """Czas giełdy liczony z lokalnego zegara i przesunięcia względem
+    `/api/v3/time` (odświeżanego co `resync_seconds`)."""
+
+    def __init__(
+        self,
+        loader: Callable[[], int] = _fetch_server_time,
+        resync_seconds: float = SERVER_TIME_RESYNC_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.loader = loader
+        self.resync_seconds = resync_seconds
+        self.clock = clock
+        self.offset_ms = 0.0
+        self.rtt_ms = 0.0
+        self._synced_at: Optional[float] = None
+
+    def sync(self) -> None:
+        before = self.clock()
+        server_ms = self.loader()
+        after = self.clock()
+        # Zakładamy, że serwer odczytał czas w połowie zapytania.
+        self.offset_ms = server_ms - (before + after) * 500
+        self.rtt_ms = (after - before) * 1000
+        self._synced_at = after
+
+    def now_ms(self) -> int:
+        now = self.clock()
+        if self._synced_at is None or now - self._synced_at >= self.resync_seconds:
+            try:
+                self.sync()
+            except Exception as exc:
+                # Zostajemy przy poprzednim przesunięciu i próbujemy ponownie później.
+                self._synced_at = now
+                print(f"❌ Nie udało się pobrać czasu serwera: {exc}")
+            now = self.clock()
+        return int(now * 1000 + self.offset_ms)
+
+    def time(self) -> float:
+        """Czas serwera w sekundach – zamiennik `time.time` (np. dla `KlineCache`)."""
+        return self.now_ms() / 1000
+
+
+@dataclass
+class SchedulerStats:
+    wakeups: int = 0
+    evaluations: int = 0
+    idle_wakeups: int = 0
+    lag_samples: int = 0
+    last_lag_ms: float = 0.0
+    max_lag_ms: float = 0.0
+    total_lag_ms: float = 0.0
+
+    @property
+    def mean_lag_ms(self) -> float:
+        return self.total_lag_ms / self.lag_samples if self.lag_samples else 0.0
+
+
+class CandleScheduler:
+    """Budzi symbole tuż po zamknięciu świecy ich interwału.
+
+    Terminy liczone są w czasie serwera (`ServerClock`). Każdy symbol dostaje
+    stałe, deterministyczne przesunięcie z zakresu `[0, jitter_seconds)`,
+    żeby rozłożyć zapytania w czasie. Symbol jest zwracany przez `wait()`
+    tylko wtedy, gdy od jego poprzedniej oceny zamknęła się nowa świeca.
+    Opóźnienie wybudzenia względem terminu trafia do `stats()`.
+    """
+
+    def __init__(
+        self,
+        intervals: Dict[str, str],
+        server_clock: Optional[ServerClock] = None,
+        jitter_seconds: float = 0.0,
+        settle_ms: int = SETTLE_MS,
+        stop_event: Optional[Event] = None,
+    ):
+        if not intervals:
+            raise ValueError("Brak symboli do harmonogramu.")
+        self.intervals = {symbol.upper(): interval for symbol, interval in intervals.items()}
+        self.server_clock = server_clock or ServerClock()
+        self.jitter_seconds = max(float(jitter_seconds), 0.0)
+        self.settle_ms = settle_ms
+        self.stop_event = stop_event or Event()
+        # Czas zamknięcia ostatniej ocenionej świecy per symbol.
+        self._last_close: Dict[str, int] = {}
+        self._stats = SchedulerStats()
+
+    @classmethod
+    def for_symbols(cls, symbols: Iterable[str], interval: str, **kwargs) -> "CandleScheduler":
+        return cls({symbol: interval for symbol in symbols}, **kwargs)
+
+    def _jitter_ms(self, symbol: str) -> int:
+        if not self.jitter_seconds:
+            return 0
+        fraction = (zlib.crc32(symbol.encode()) % 10_000) / 10_000
+        return int(fraction * self.jitter_seconds * 1000)
+
+    def _latest_close(self, symbol: str, now_ms: int) -> int:
+        # Otwarcie bieżącej świecy to zamknięcie poprzedniej.
+        return candle_open_ms(now_ms, self.intervals[symbol])
+
+    def due_at(self, symbol: str, now_ms: int) -> int:
+        delay = self.settle_ms + self._jitter_ms(symbol)
+        latest_close = self._latest_close(symbol, now_ms)
+        if self._last_close.get(symbol, -1) < latest_close:
+            return latest_close + delay
+        return next_candle_close_ms(latest_close, self.intervals[symbol]) + delay
+
+    def due_symbols(self, now_ms: int) -> List[str]:
+        return [symbol for symbol in self.intervals if self.due_at(symbol, now_ms) <= now_ms]
+
+    def wait(self) -> List[str]:
+        """Czeka na najbliższy termin i zwraca symbole z nową zamkniętą świecą.
+
+        Zwraca pustą listę, gdy ustawiono `stop_event`.
+        """
+        while not self.stop_event.is_set():
+            now_ms = self.server_clock.now_ms()
+            self._stats.wakeups += 1
+            due = []
+            for symbol in self.intervals:
+                due_ms = self.due_at(symbol, now_ms)
+                if due_ms <= now_ms:
+                    due.append(symbol)
+                    self._stats.evaluations += 1
+                    # Pierwsza ocena po starcie nie jest spóźnieniem harmonogramu.
+                    if symbol in self._last_close:
+                        self._record_lag(now_ms - due_ms)
+                    self._last_close[symbol] = self._latest_close(symbol, now_ms)
+            if due:
+                return due
+            self._stats.idle_wakeups += 1
+            next_due = min(self.due_at(symbol, now_ms) for symbol in self.intervals)
+            self.stop_event.wait(min((next_due - now_ms) / 1000, MAX_SLEEP_SECONDS))
+        return []
+
+    def _record_lag(self, lag_ms: float) -> None:
+        self._stats.lag_samples += 1
+        self._stats.last_lag_ms = lag_ms
+        self._stats.max_lag_ms = max(self._stats.max_lag_ms, lag_ms)
+        self._stats.total_lag_ms += lag_ms
+
+    def stats(self) -> SchedulerStats:
+        return SchedulerStats(**vars(self._stats))
+
+    def format_stats(self) -> str:
+        stats = self.stats()
+        return (
+            f"lag={stats.last_lag_ms:.0f}ms avg={stats.mean_lag_ms:.0f}ms max={stats.max_lag_ms:.0f}ms "
+            f"evaluations={stats.evaluations} idle_wakeups={stats.idle_wakeups}"
+        )
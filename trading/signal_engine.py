@@ -2,9 +2,9 @@ import statistics
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 
-import requests
-
-BINANCE_BASE_URL = "https://api.binance.com"
+from trading.http_client import BINANCE_BASE_URL, http_client
+from trading.kline_cache import KlineCache
+from trading.rate_limiter import PRIORITY_TRADING
 
 DEFAULT_RULES = {
     "INTERVAL": "1m",
@@ -31,14 +31,26 @@ class SignalResult:
     timestamp: int
 
 
-def fetch_klines(symbol: str, interval: str, limit: int = 200) -> List[Dict[str, float]]:
-    response = requests.get(
+kline_cache = KlineCache()
+
+
+def fetch_klines(
+    symbol: str,
+    interval: str,
+    limit: int = 200,
+    use_cache: bool = True,
+) -> List[Dict[str, float]]:
+    if not use_cache:
+        return _download_klines(symbol, interval, limit)
+    return kline_cache.get(symbol, interval, limit, lambda: _download_klines(symbol, interval, limit))
+
+
+def _download_klines(symbol: str, interval: str, limit: int) -> List[Dict[str, float]]:
+    klines = http_client.get_json(
         f"{BINANCE_BASE_URL}/api/v3/klines",
         params={"symbol": symbol, "interval": interval, "limit": limit},
-        timeout=10,
+        priority=PRIORITY_TRADING,
     )
-    response.raise_for_status()
-    klines = response.json()
     parsed = []
     for k in klines:
         parsed.append(
@@ -54,14 +66,19 @@ def fetch_klines(symbol: str, interval: str, limit: int = 200) -> List[Dict[str,
     return parsed
 
 
-def fetch_orderbook_imbalance(symbol: str, limit: int = 100) -> float:
-    response = requests.get(
+def fetch_orderbook(symbol: str, limit: int = 100, priority: int = PRIORITY_TRADING) -> Dict:
+    return http_client.get_json(
         f"{BINANCE_BASE_URL}/api/v3/depth",
         params={"symbol": symbol, "limit": limit},
-        timeout=10,
+        priority=priority,
     )
-    response.raise_for_status()
-    data = response.json()
+
+
+def fetch_orderbook_imbalance(symbol: str, limit: int = 100) -> float:
+    return depth_imbalance(fetch_orderbook(symbol, limit))
+
+
+def depth_imbalance(data: Dict) -> float:
     bids = sum(float(bid[1]) for bid in data.get("bids", []))
     asks = sum(float(ask[1]) for ask in data.get("asks", []))
     total = bids + asks
@@ -70,6 +87,19 @@ def fetch_orderbook_imbalance(symbol: str, limit: int = 100) -> float:
     return (bids - asks) / total
 
 
+class RestMarketData:
+    """Domyślne źródło danych: REST Binance (świece przez wspólny cache)."""
+
+    def klines(self, symbol: str, interval: str, limit: int = 200) -> List[Dict[str, float]]:
+        return fetch_klines(symbol, interval, limit)
+
+    def orderbook_imbalance(self, symbol: str, limit: int = 100) -> float:
+        return fetch_orderbook_imbalance(symbol, limit)
+
+
+rest_market_data = RestMarketData()
+
+
 def simple_moving_average(values: List[float], window: int) -> Optional[float]:
     if len(values) < window:
         return None
@@ -104,24 +134,18 @@ def volume_spike(volumes: List[float], multiplier: float) -> bool:
     return volumes[-1] >= baseline * multiplier
 
 
-def build_signal(
+def evaluate_signal(
     symbol: str,
-    interval: str,
     rules: Dict[str, float],
+    last_price: float,
+    timestamp: int,
+    fast_sma: Optional[float],
+    slow_sma: Optional[float],
+    current_rsi: Optional[float],
+    imbalance: float,
+    has_volume_spike: bool,
 ) -> SignalResult:
     merged_rules = {**DEFAULT_RULES, **(rules or {})}
-    klines = fetch_klines(symbol, interval)
-    closes = [k["close"] for k in klines]
-    volumes = [k["volume"] for k in klines]
-    last_price = closes[-1]
-    last_timestamp = klines[-1]["open_time"]
-
-    fast_sma = simple_moving_average(closes, int(merged_rules["FAST_SMA"]))
-    slow_sma = simple_moving_average(closes, int(merged_rules["SLOW_SMA"]))
-    current_rsi = rsi(closes, int(merged_rules["RSI_PERIOD"]))
-    imbalance = fetch_orderbook_imbalance(symbol)
-    has_volume_spike = volume_spike(volumes, float(merged_rules["VOLUME_SPIKE_MULTIPLIER"]))
-
     score = 0
     reasons = []
 
@@ -166,5 +190,36 @@ def build_signal(
         score=score,
         reasons=reasons,
         last_price=last_price,
-        timestamp=last_timestamp,
+        timestamp=timestamp,
+    )
+
+
+def build_signal(
+    symbol: str,
+    interval: str,
+    rules: Dict[str, float],
+    source=None,
+) -> SignalResult:
+    source = source or rest_market_data
+    merged_rules = {**DEFAULT_RULES, **(rules or {})}
+    klines = source.klines(symbol, interval)
+    closes = [k["close"] for k in klines]
+    volumes = [k["volume"] for k in klines]
+
+    fast_sma = simple_moving_average(closes, int(merged_rules["FAST_SMA"]))
+    slow_sma = simple_moving_average(closes, int(merged_rules["SLOW_SMA"]))
+    current_rsi = rsi(closes, int(merged_rules["RSI_PERIOD"]))
+    imbalance = source.orderbook_imbalance(symbol)
+    has_volume_spike = volume_spike(volumes, float(merged_rules["VOLUME_SPIKE_MULTIPLIER"]))
+
+    return evaluate_signal(
+        symbol,
+        merged_rules,
+        last_price=closes[-1],
+        timestamp=klines[-1]["open_time"],
+        fast_sma=fast_sma,
+        slow_sma=slow_sma,
+        current_rsi=current_rsi,
+        imbalance=imbalance,
+        has_volume_spike=has_volume_spike,
     )
@@ -0,0 +1,242 @@
+import itertools
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from trading.vector_backtest import average_true_range
+
+EXIT_STOP_LOSS = 0
+EXIT_TAKE_PROFIT = 1
+EXIT_END = 2
+EXIT_REASONS = {EXIT_STOP_LOSS: "stop_loss", EXIT_TAKE_PROFIT: "take_profit", EXIT_END: "end"}
+
+
+@dataclass(frozen=True)
+class StopParams:
+    atr_period: int = 14
+    sl_multiplier: float = 1.5
+    tp_multiplier: float = 2.0
+
+
+def param_grid(
+    atr_periods: Iterable[int], sl_multipliers: Iterable[float], tp_multipliers: Iterable[float]
+) -> List[StopParams]:
+    return [
+        StopParams(atr_period=int(period), sl_multiplier=float(sl), tp_multiplier=float(tp))
+        for period, sl, tp in itertools.product(atr_periods, sl_multipliers, tp_multipliers)
+    ]
+
+
+@dataclass
+class StopSimulation:
+    """Transakcje jednej kombinacji parametrów (tablice indeksowane numerem transakcji)."""
+
+    params: StopParams
+    initial_balance: float
+    entry_index: np.ndarray
+    exit_index: np.ndarray
+    entry_price: np.ndarray
+    exit_price: np.ndarray
+    stop_loss: np.ndarray
+    take_profit: np.ndarray
+    quantity: np.ndarray
+    exit_reason: np.ndarray
+    balance_after: np.ndarray
+
+    @property
+    def final_balance(self) -> float:
+        return float(self.balance_after[-1]) if len(self.balance_after) else self.initial_balance
+
+    @property
+    def trades(self) -> int:
+        return len(self.entry_index)
+
+    @property
+    def pnl(self) -> np.ndarray:
+        return self.quantity * (self.exit_price - self.entry_price)
+
+    @property
+    def win_rate(self) -> float:
+        return float(np.mean(self.pnl > 0)) if self.trades else 0.0
+
+    @property
+    def total_return_pct(self) -> float:
+        return (self.final_balance / self.initial_balance - 1) * 100 if self.initial_balance else 0.0
+
+    def trade_log(self, timestamps: Optional[np.ndarray] = None) -> List[Dict]:
+        times = timestamps if timestamps is not None else np.arange(int(self.exit_index.max(initial=0)) + 1)
+        return [
+            {
+                "entry_time": times[entry],
+                "entry_price": float(entry_price),
+                "stop_loss": float(stop_loss),
+                "take_profit": float(take_profit),
+                "exit_time": times[exit_],
+                "exit_price": float(exit_price),
+                "quantity": float(quantity),
+                "exit_reason": EXIT_REASONS[int(reason)],
+                "balance": float(balance),
+            }
+            for entry, exit_, entry_price, exit_price, stop_loss, take_profit, quantity, reason, balance in zip(
+                self.entry_index,
+                self.exit_index,
+                self.entry_price,
+                self.exit_price,
+                self.stop_loss,
+                self.take_profit,
+                self.quantity,
+                self.exit_reason,
+                self.balance_after,
+            )
+        ]
+
+    def equity_curve(self, close: np.ndarray) -> np.ndarray:
+        """Wartość konta na zamknięciu każdej świecy (gotówka + pozycja po cenie close).
+
+        W świecy wyjścia pozycja jest już zamknięta po cenie SL/TP.
+        """
+        close = np.asarray(close, dtype=float)
+        n = len(close)
+        # Gotówka i ilość jako funkcje schodkowe: zmiany w świecach wejścia i wyjścia.
+        cash_delta = np.zeros(n + 1)
+        quantity_delta = np.zeros(n + 1)
+        np.add.at(cash_delta, self.entry_index, -self.quantity * self.entry_price)
+        np.add.at(cash_delta, self.exit_index, self.quantity * self.exit_price)
+        np.add.at(quantity_delta, self.entry_index, self.quantity)
+        np.add.at(quantity_delta, self.exit_index, -self.quantity)
+        cash = self.initial_balance + np.cumsum(cash_delta[:n])
+        held = np.cumsum(quantity_delta[:n])
+        return cash + held * close
+
+
+class RangeExtremes:
+    """Tablice rzadkie minimów `low` i maksimów `high` dla bloków długości 2^k.
+
+    Pozwalają znaleźć pierwszą świecę przecinającą SL/TP dla dowolnie wielu
+    transakcji naraz w O(log n) krokach NumPy (skoki o malejące potęgi
+    dwójki, dopóki cały blok nie przecina żadnego poziomu).
+    """
+
+    def __init__(self, high: np.ndarray, low: np.ndarray):
+        self.n = len(high)
+        self.lows = [np.asarray(low, dtype=float)]
+        self.highs = [np.asarray(high, dtype=float)]
+        length = 1
+        while length * 2 <= self.n:
+            self.lows.append(np.minimum(self.lows[-1][:-length], self.lows[-1][length:]))
+            self.highs.append(np.maximum(self.highs[-1][:-length], self.highs[-1][length:]))
+            length *= 2
+
+    def first_cross(self, start: np.ndarray, stop_loss: np.ndarray, take_profit: np.ndarray):
+        """Pierwsza świeca od `start` (włącznie), której low <= SL albo high >= TP.
+
+        Zwraca indeksy wyjścia (-1 = brak przecięcia do końca danych) i maskę
+        trafienia stop lossa. Przy obu poziomach w jednej świecy zakładamy
+        stop loss (jak w `trading.replay`).
+        """
+        position = np.asarray(start, dtype=np.int64).copy()
+        for level in range(len(self.lows) - 1, -1, -1):
+            lows, highs = self.lows[level], self.highs[level]
+            inside = position < len(lows)
+            safe = np.minimum(position, len(lows) - 1)
+            clear = inside & (lows[safe] > stop_loss) & (highs[safe] < take_profit)
+            position += clear * (1 << level)
+        found = position < self.n
+        safe = np.minimum(position, self.n - 1)
+        hit_stop = found & (self.lows[0][safe] <= stop_loss)
+        return np.where(found, position, -1), hit_stop
+
+
+def simulate_stops(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    entries: np.ndarray,
+    params: List[StopParams],
+    initial_balance: float = 1000,
+    risk_per_trade: float = 0.02,
+) -> List[StopSimulation]:
+    """Symulacja wyjść SL/TP opartych na ATR dla wielu kombinacji parametrów naraz.
+
+    Wejście następuje po cenie zamknięcia świecy z `entries` (przy braku
+    pozycji i dodatnim ATR), za `risk_per_trade` bieżącego salda. SL i TP
+    są stałe od wejścia: `close -/+ mnożnik * ATR`. Wyjście to pierwsza
+    późniejsza świeca, w której low/high przetnie któryś z poziomów – po
+    cenie poziomu; bez przecięcia pozycja jest zamykana po ostatnim close.
+
+    ATR liczony jest raz na okres, a tablice rzadkie `RangeExtremes` raz dla
+    całej siatki. Dla każdej kombinacji wyjścia wszystkich możliwych wejść
+    liczone są jednym przeszukaniem; w Pythonie zostaje tylko przejście po
+    łańcuchu faktycznie zawartych transakcji.
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    entries = np.asarray(entries, dtype=bool)
+    n = len(close)
+    extremes = RangeExtremes(high, low)
+    atr_by_period = {
+        period: average_true_range(high, low, close, period) for period in sorted({p.atr_period for p in params})
+    }
+    candidates_by_period = {period: np.flatnonzero(entries & (atr > 0)) for period, atr in atr_by_period.items()}
+    candidates_by_period = {period: c[c >= 1] for period, c in candidates_by_period.items()}
+
+    results = []
+    for p in params:
+        candidates = candidates_by_period[p.atr_period]
+        atr = atr_by_period[p.atr_period][candidates]
+        entry_price = close[candidates]
+        stop_loss = entry_price - p.sl_multiplier * atr
+        take_profit = entry_price + p.tp_multiplier * atr
+        exit_index, hit_stop = extremes.first_cross(candidates + 1, stop_loss, take_profit)
+        # Następne możliwe wejście po wyjściu z transakcji otwartej w danym kandydacie.
+        following = np.searchsorted(candidates, exit_index + 1).tolist()
+        closed = (exit_index >= 0).tolist()
+
+        chain = []
+        position = 0
+        while position < len(candidates):
+            chain.append(position)
+            if not closed[position]:
+                break
+            position = following[position]
+        taken = np.array(chain, dtype=np.int64)
+
+        open_to_end = exit_index[taken] < 0
+        trade_exit_index = np.where(open_to_end, n - 1, exit_index[taken])
+        trade_exit_price = np.where(
+            open_to_end, close[-1], np.where(hit_stop[taken], stop_loss[taken], take_profit[taken])
+        )
+        exit_reason = np.where(
+            open_to_end, EXIT_END, np.where(hit_stop[taken], EXIT_STOP_LOSS, EXIT_TAKE_PROFIT)
+        ).astype(np.int8)
+        trade_entry_price = entry_price[taken]
+        # Saldo po transakcji rośnie o ryzykowaną część razy zwrot: iloczyn skumulowany.
+        growth = 1 + risk_per_trade * (trade_exit_price / trade_entry_price - 1)
+        balance_after = initial_balance * np.cumprod(growth)
+        balance_before = np.concatenate(([float(initial_balance)], balance_after[:-1]))
+        results.append(
+            StopSimulation(
+                params=p,
+                initial_balance=float(initial_balance),
+                entry_index=candidates[taken],
+                exit_index=trade_exit_index,
+                entry_price=trade_entry_price,
+                exit_price=trade_exit_price,
+                stop_loss=stop_loss[taken],
+                take_profit=take_profit[taken],
+                quantity=risk_per_trade * balance_before / trade_entry_price,
+                exit_reason=exit_reason,
+                balance_after=balance_after,
+            )
+        )
+    return results
+
+
+def rising_close_entries(close: np.ndarray) -> np.ndarray:
+    """Warunek wejścia z `risk_management.py`: zamknięcie wyższe niż poprzednie."""
+    close = np.asarray(close, dtype=float)
+    entries = np.zeros(len(close), dtype=bool)
+    entries[1:] = close[1:] > close[:-1]
+    return entries
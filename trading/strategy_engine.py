@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from decimal import Decimal
 from typing import Dict, List, Optional
 
-from trading.signal_engine import build_signal, fetch_klines, rsi, simple_moving_average
+from trading.signal_engine import SignalResult, build_signal, rest_market_data, rsi, simple_moving_average
 
 
 @dataclass
@@ -41,22 +41,15 @@ def _calculate_atr(klines: List[Dict[str, float]], period: int) -> Optional[Deci
     return sum(trs) / Decimal(len(trs))
 
 
-def build_trade_plan(
-    symbol: str,
-    interval: str,
-    rules: Dict[str, float],
+def plan_from_signal(
+    signal: SignalResult,
     risk: RiskConfig,
     available_quote: Decimal,
+    fast_sma: Optional[float],
+    slow_sma: Optional[float],
+    current_rsi: Optional[float],
+    atr: Optional[Decimal],
 ) -> TradePlan:
-    signal = build_signal(symbol, interval, rules)
-    klines = fetch_klines(symbol, interval)
-    closes = [k["close"] for k in klines]
-
-    fast_sma = simple_moving_average(closes, int(rules.get("FAST_SMA", 9)))
-    slow_sma = simple_moving_average(closes, int(rules.get("SLOW_SMA", 21)))
-    current_rsi = rsi(closes, int(rules.get("RSI_PERIOD", 14)))
-    atr = _calculate_atr(klines, risk.atr_period)
-
     reasons = list(signal.reasons)
     if current_rsi is not None:
         reasons.append(f"RSI: {current_rsi:.2f}")
@@ -95,7 +88,7 @@ def build_trade_plan(
         reasons.append("Brak ATR do wyliczenia ryzyka/pozycji")
 
     return TradePlan(
-        symbol=symbol,
+        symbol=signal.symbol,
         action=action,
         score=signal.score,
         order_size_usdt=order_size_usdt,
@@ -103,3 +96,26 @@ def build_trade_plan(
         take_profit=take_profit,
         reasons=reasons,
     )
+
+
+def build_trade_plan(
+    symbol: str,
+    interval: str,
+    rules: Dict[str, float],
+    risk: RiskConfig,
+    available_quote: Decimal,
+    signal: Optional[SignalResult] = None,
+    source=None,
+) -> TradePlan:
+    source = source or rest_market_data
+    if signal is None:
+        signal = build_signal(symbol, interval, rules, source=source)
+    klines = source.klines(symbol, interval)
+    closes = [k["close"] for k in klines]
+
+    fast_sma = simple_moving_average(closes, int(rules.get("FAST_SMA", 9)))
+    slow_sma = simple_moving_average(closes, int(rules.get("SLOW_SMA", 21)))
+    current_rsi = rsi(closes, int(rules.get("RSI_PERIOD", 14)))
+    atr = _calculate_atr(klines, risk.atr_period)
+
+    return plan_from_signal(signal, risk, available_quote, fast_sma, slow_sma, current_rsi, atr)
@@ -0,0 +1,193 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import ta
+
+
+@dataclass
+class BacktestResult:
+    trade_log: List[Tuple] = field(default_factory=list)
+    final_balance: float = 0.0
+
+
+def _wilder_sum(seed: float, values: List[float], length: int, window: int) -> List[float]:
+    out = [seed]
+    append = out.append
+    previous = seed
+    divisor = float(window)
+    # Zakres i kolejność działań jak w ta.trend.ADXIndicator (ostatni element zostaje 0).
+    for value in values[window + 1 : window + length - 1]:
+        previous = previous - (previous / divisor) + value
+        append(previous)
+    append(0.0)
+    return out
+
+
+def adx(high: pd.Series, low: pd.Series, close: pd.Series, window: int = 14) -> np.ndarray:
+    """ADX zgodny co do bitu z `ta.trend.ADXIndicator(...).adx()`.
+
+    `ta` liczy wygładzanie Wildera pętlą po indeksach `pandas.Series`, co
+    przy setkach tysięcy świec trwa sekundy; tu te same rekurencje idą po
+    listach Pythona, a reszta obliczeń na tablicach NumPy.
+    """
+    n = len(close)
+    length = n - (window - 1)
+    if length <= window:
+        return np.zeros(n)
+
+    close_shift = close.shift(1)
+    high_values = np.asarray(high, dtype=float)
+    low_values = np.asarray(low, dtype=float)
+    true_range = pd.Series(
+        np.amax([high_values, np.asarray(close_shift, dtype=float)], axis=0)
+        - np.amin([low_values, np.asarray(close_shift, dtype=float)], axis=0)
+    )
+    diff_up = high - high.shift(1)
+    diff_down = low.shift(1) - low
+    pos = abs(((diff_up > diff_down) & (diff_up > 0)) * diff_up)
+    neg = abs(((diff_down > diff_up) & (diff_down > 0)) * diff_down)
+
+    trs = np.array(
+        _wilder_sum(float(true_range.dropna().iloc[0:window].sum()), true_range.tolist(), length, window)
+    )
+    dip = np.array(_wilder_sum(float(pos.dropna().iloc[0:window].sum()), pos.tolist(), length, window))
+    din = np.array(_wilder_sum(float(neg.dropna().iloc[0:window].sum()), neg.tolist(), length, window))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dip_pct = np.where(trs != 0, 100 * (dip / trs), 0.0)
+        din_pct = np.where(trs != 0, 100 * (din / trs), 0.0)
+        total = dip_pct + din_pct
+        directional_index = np.where(total != 0, 100 * np.abs((dip_pct - din_pct) / total), 0.0)
+
+    series = [0.0] * (window + window - 1)
+    append = series.append
+    previous = float(directional_index[0:window].mean())
+    append(previous)
+    divisor = float(window)
+    for value in directional_index[window : length - 1].tolist():
+        previous = ((previous * (window - 1)) + value) / divisor
+        append(previous)
+    return np.array(series)
+
+
+def average_true_range(high, low, close, window: int = 14) -> np.ndarray:
+    """ATR zgodny co do bitu z `ta.volatility.AverageTrueRange(...).average_true_range()`."""
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    atr = np.zeros(n)
+    if n < window:
+        return atr
+    previous_close = np.concatenate(([np.nan], close[:-1]))
+    with np.errstate(invalid="ignore"):
+        true_range = np.fmax(np.fmax(high - low, np.abs(high - previous_close)), np.abs(low - previous_close))
+    series = [0.0] * (window - 1)
+    append = series.append
+    previous = float(pd.Series(true_range[0:window]).mean())
+    append(previous)
+    divisor = float(window)
+    for value in true_range[window:].tolist():
+        previous = (previous * (window - 1) + value) / divisor
+        append(previous)
+    return np.array(series)
+
+
+def strategy_indicators(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Wskaźniki strategii z `backtesting.py` jako tablice NumPy."""
+    close = df["close"]
+    bb = ta.volatility.BollingerBands(close)
+    return {
+        "close": close.to_numpy(dtype=float),
+        "ema_9": ta.trend.EMAIndicator(close, window=9).ema_indicator().to_numpy(),
+        "ema_21": ta.trend.EMAIndicator(close, window=21).ema_indicator().to_numpy(),
+        "macd": ta.trend.MACD(close).macd().to_numpy(),
+        "rsi": ta.momentum.RSIIndicator(close).rsi().to_numpy(),
+        "adx": adx(df["high"], df["low"], close),
+        "bb_upper": bb.bollinger_hband().to_numpy(),
+        "bb_lower": bb.bollinger_lband().to_numpy(),
+    }
+
+
+def strategy_masks(indicators: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Maski wejścia i wyjścia reguły EMA/MACD/RSI/ADX/Bollinger (NaN = brak sygnału)."""
+    close = indicators["close"]
+    ema_9, ema_21 = indicators["ema_9"], indicators["ema_21"]
+    macd, rsi = indicators["macd"], indicators["rsi"]
+    with np.errstate(invalid="ignore"):
+        entries = (
+            (ema_9 > ema_21)
+            & (macd > 0)
+            & (rsi < 70)
+            & (indicators["adx"] > 25)
+            & (close < indicators["bb_lower"])
+        )
+        exits = (ema_9 < ema_21) | (macd < 0) | (rsi > 70) | (close > indicators["bb_upper"])
+    return entries, exits
+
+
+def next_true_index(indices: np.ndarray, start: int) -> Optional[int]:
+    """Pierwszy indeks z posortowanej tablicy `indices` (np. `np.flatnonzero(mask)`) >= `start`."""
+    k = np.searchsorted(indices, start)
+    return int(indices[k]) if k < len(indices) else None
+
+
+def run_backtest(
+    timestamps: np.ndarray,
+    close: np.ndarray,
+    entries: np.ndarray,
+    exits: np.ndarray,
+    initial_balance: float = 1000,
+    trade_risk: float = 0.02,
+    start: int = 1,
+) -> BacktestResult:
+    """Przechodzi po maskach skokami do następnego wejścia/wyjścia.
+
+    Stan pozycji i saldo są liczone tylko w świecach z transakcją, tymi
+    samymi działaniami co pętla w `backtesting.py`, więc dziennik
+    transakcji i saldo końcowe są identyczne.
+    """
+    entry_indices = np.flatnonzero(entries)
+    exit_indices = np.flatnonzero(exits)
+    balance = initial_balance
+    position = 0
+    trade_log = []
+    cursor = start
+    while True:
+        i = next_true_index(entry_indices, cursor)
+        if i is None:
+            break
+        price = close[i]
+        position = (trade_risk * balance) / price
+        balance -= position * price
+        trade_log.append((timestamps[i], "BUY", price, balance))
+        if position == 0:
+            cursor = i + 1
+            continue
+        if position < 0:
+            break
+        j = next_true_index(exit_indices, i + 1)
+        if j is None:
+            break
+        price = close[j]
+        balance += position * price
+        trade_log.append((timestamps[j], "SELL", price, balance))
+        position = 0
+        cursor = j + 1
+
+    return BacktestResult(trade_log=trade_log, final_balance=balance + (position * close[-1]))
+
+
+def vector_backtest(df: pd.DataFrame, initial_balance: float = 1000, trade_risk: float = 0.02) -> BacktestResult:
+    indicators = strategy_indicators(df)
+    entries, exits = strategy_masks(indicators)
+    return run_backtest(
+        df["timestamp"].to_numpy(),
+        indicators["close"],
+        entries,
+        exits,
+        initial_balance=initial_balance,
+        trade_risk=trade_risk,
+    )
@@ -0,0 +1,266 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from trading.param_search import (
+    TREND_EMA_LONG,
+    TREND_EMA_SHORT,
+    TREND_RSI_PERIOD,
+    IndicatorCache,
+    StrategyParams,
+    TrendParams,
+    sample_params,
+    simulate,
+    trend_grid_search,
+)
+
+STRATEGY_AUTOML = "automl"
+STRATEGY_TREND = "trend"
+STRATEGIES = (STRATEGY_AUTOML, STRATEGY_TREND)
+
+TrendGrid = Tuple[Sequence[int], Sequence[int], Sequence[int]]
+
+
+@dataclass(frozen=True)
+class Fold:
+    """Indeksy świec: trening `[train_start, train_end)`, test `[test_start, test_end)`."""
+
+    index: int
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+
+@dataclass
+class FoldResult:
+    fold: Fold
+    params: Union[StrategyParams, TrendParams]
+    train_return_pct: float
+    test_return_pct: float
+    test_trades: Optional[int]
+    evaluations: int
+    seconds: float
+
+
+@dataclass
+class WalkForwardReport:
+    strategy: str
+    folds: List[FoldResult]
+    elapsed_seconds: float
+    workers: int
+
+    @property
+    def out_of_sample_return_pct(self) -> float:
+        """Wynik złożony z kolejnych okresów testowych (przy `step == test_size` rozłącznych)."""
+        growth = np.prod([1 + result.test_return_pct / 100 for result in self.folds])
+        return float((growth - 1) * 100)
+
+    @property
+    def mean_test_return_pct(self) -> float:
+        return float(np.mean([result.test_return_pct for result in self.folds])) if self.folds else 0.0
+
+    @property
+    def mean_train_return_pct(self) -> float:
+        return float(np.mean([result.train_return_pct for result in self.folds])) if self.folds else 0.0
+
+    @property
+    def profitable_folds(self) -> float:
+        """Odsetek foldów z dodatnim wynikiem poza próbą."""
+        if not self.folds:
+            return 0.0
+        return sum(result.test_return_pct > 0 for result in self.folds) / len(self.folds)
+
+    @property
+    def efficiency(self) -> float:
+        """Średni wynik testowy względem treningowego (walk-forward efficiency)."""
+        train = self.mean_train_return_pct
+        return self.mean_test_return_pct / train if train > 0 else 0.0
+
+
+def walk_forward_folds(length: int, train_size: int, test_size: int, step: Optional[int] = None) -> List[Fold]:
+    """Kroczące okna: trening `train_size` świec, po nim test `test_size` świec, przesunięcie o `step`."""
+    step = step or test_size
+    if train_size <= 0 or test_size <= 0 or step <= 0:
+        raise ValueError("Rozmiary okien i krok muszą być dodatnie")
+    folds = []
+    start = 0
+    while start + train_size + test_size <= length:
+        train_end = start + train_size
+        folds.append(Fold(len(folds), start, train_end, train_end, train_end + test_size))
+        start += step
+    return folds
+
+
+def run_fold(
+    cache: IndicatorCache,
+    fold: Fold,
+    strategy: str,
+    trials: Optional[List[StrategyParams]] = None,
+    grid: Optional[TrendGrid] = None,
+    initial_balance: float = 1000,
+) -> FoldResult:
+    """Optymalizacja na oknie treningowym i ocena najlepszych parametrów na testowym."""
+    started = time.perf_counter()
+    train = cache.window(fold.train_start, fold.train_end)
+    test = cache.window(fold.test_start, fold.test_end)
+    if strategy == STRATEGY_AUTOML:
+        best = None
+        for params in trials:
+            result = simulate(train, params, initial_balance)
+            if best is None or result.final_balance > best.final_balance:
+                best = result
+        tested = simulate(test, best.params, initial_balance)
+        return FoldResult(
+            fold=fold,
+            params=best.params,
+            train_return_pct=(best.final_balance / initial_balance - 1) * 100,
+            test_return_pct=(tested.final_balance / initial_balance - 1) * 100,
+            test_trades=tested.trades,
+            evaluations=len(trials),
+            seconds=time.perf_counter() - started,
+        )
+
+    report = trend_grid_search(None, *grid, workers=1, cache=train)
+    params, score = report.best
+    tested = trend_grid_search(None, [params.ema_short], [params.ema_long], [params.rsi_period], workers=1, cache=test)
+    return FoldResult(
+        fold=fold,
+        params=params,
+        train_return_pct=score * 100,
+        test_return_pct=float(tested.scores[0, 0, 0]) * 100,
+        test_trades=None,
+        evaluations=report.evaluations,
+        seconds=time.perf_counter() - started,
+    )
+
+
+class SharedIndicators:
+    """Ceny i wszystkie serie wskaźników w jednym bloku `SharedMemory`.
+
+    Workery dołączają się do bloku po nazwie i budują `IndicatorCache` z
+    widoków, więc serie nie są serializowane (pickle) do każdego procesu.
+    """
+
+    def __init__(self, cache: IndicatorCache):
+        items = cache.items()
+        self.keys = [key for key, _ in items]
+        self.shape = (len(items) + 1, len(cache.close))
+        self.memory = SharedMemory(create=True, size=max(int(np.prod(self.shape)) * 8, 1))
+        table = np.ndarray(self.shape, dtype=np.float64, buffer=self.memory.buf)
+        table[0] = cache.close
+        for row, (_, values) in enumerate(items, start=1):
+            table[row] = values
+        del table  # Blok można zamknąć dopiero, gdy nie ma na niego widoków.
+
+    @property
+    def spec(self) -> Tuple[str, Tuple[int, int], List[Tuple[str, int]]]:
+        return self.memory.name, self.shape, self.keys
+
+    def release(self) -> None:
+        self.memory.close()
+        self.memory.unlink()
+
+
+def attach_shared(name: str, shape: Tuple[int, int], keys: List[Tuple[str, int]]) -> Tuple[SharedMemory, IndicatorCache]:
+    memory = SharedMemory(name=name)
+    table = np.ndarray(shape, dtype=np.float64, buffer=memory.buf)
+    cache = IndicatorCache(table[0])
+    for row, key in enumerate(keys, start=1):
+        cache.add(key, table[row])
+    return memory, cache
+
+
+_worker_memory: Optional[SharedMemory] = None
+_worker_cache: Optional[IndicatorCache] = None
+
+
+def _init_worker(name: str, shape: Tuple[int, int], keys: List[Tuple[str, int]]) -> None:
+    global _worker_memory, _worker_cache
+    _worker_memory, _worker_cache = attach_shared(name, shape, keys)
+
+
+def _run_shared_fold(
+    fold: Fold,
+    strategy: str,
+    trials: Optional[List[StrategyParams]],
+    grid: Optional[TrendGrid],
+    initial_balance: float,
+) -> FoldResult:
+    return run_fold(_worker_cache, fold, strategy, trials, grid, initial_balance)
+
+
+def walk_forward(
+    close: np.ndarray,
+    train_size: int,
+    test_size: int,
+    step: Optional[int] = None,
+    strategy: str = STRATEGY_AUTOML,
+    trials: Optional[List[StrategyParams]] = None,
+    iterations: int = 50,
+    seed: Optional[int] = None,
+    grid: Optional[TrendGrid] = None,
+    workers: Optional[int] = None,
+    initial_balance: float = 1000,
+) -> WalkForwardReport:
+    """Walk-forward: optymalizacja na każdym oknie treningowym, wynik na następnym testowym.
+
+    `automl` to reguły `ai_automl.optimize_strategy` (losowe próby
+    `StrategyParams`, te same dla każdego foldu), `trend` – siatka
+    `rldc_quantum_ai.quantum_optimization`. Wskaźniki liczone są raz dla
+    całej historii; foldy trafiają do puli procesów (domyślnie wszystkie
+    rdzenie), a serie – do pamięci współdzielonej.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Nieznana strategia: {strategy} (dostępne: {', '.join(STRATEGIES)})")
+    started = time.perf_counter()
+    close = np.asarray(close, dtype=float)
+    folds = walk_forward_folds(len(close), train_size, test_size, step)
+    if not folds:
+        raise ValueError(f"Za mało świec ({len(close)}) na okno treningowe {train_size} i testowe {test_size}")
+
+    cache = IndicatorCache(close)
+    if strategy == STRATEGY_AUTOML:
+        if trials is None:
+            rng = random.Random(seed) if seed is not None else random
+            trials = [sample_params(rng) for _ in range(iterations)]
+        cache.prepare(trials)
+    else:
+        grid = tuple(list(windows) for windows in (grid or (TREND_EMA_SHORT, TREND_EMA_LONG, TREND_RSI_PERIOD)))
+        for window in set(grid[0]) | set(grid[1]):
+            cache.ema(window)
+        for window in grid[2]:
+            cache.rsi(window)
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(folds)))
+    if workers == 1:
+        results = [run_fold(cache, fold, strategy, trials, grid, initial_balance) for fold in folds]
+    else:
+        shared = SharedIndicators(cache)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=shared.spec) as executor:
+                results = list(
+                    executor.map(
+                        _run_shared_fold,
+                        folds,
+                        repeat(strategy),
+                        repeat(trials),
+                        repeat(grid),
+                        repeat(initial_balance),
+                    )
+                )
+        finally:
+            shared.release()
+    return WalkForwardReport(
+        strategy=strategy,
+        folds=results,
+        elapsed_seconds=time.perf_counter() - started,
+        workers=workers,
+    )
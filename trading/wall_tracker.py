@@ -0,0 +1,333 @@
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from threading import Lock
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from trading.order_book import BookListener, LevelChange, OrderBook
+
+WALL_APPEARED = "appeared"
+WALL_RESIZED = "resized"
+WALL_MOVED = "moved"
+WALL_FILLED = "filled"
+WALL_PULLED = "pulled"
+
+RESIZE_PCT = 20.0
+SPOOF_SECONDS = 60.0
+MOVE_SECONDS = 5.0
+MOVE_TOLERANCE_PCT = 30.0
+FILL_WINDOW_SECONDS = 2.0
+FILL_RATIO = 0.5
+EVENT_HISTORY = 1000
+TRADE_HISTORY = 1000
+
+
+@dataclass
+class Wall:
+    symbol: str
+    is_bid: bool
+    price: float
+    qty: float
+    first_seen_ms: int
+    last_change_ms: int
+    peak_qty: float
+    reported_qty: float
+
+    @property
+    def side(self) -> str:
+        return "bid" if self.is_bid else "ask"
+
+    def lifetime_seconds(self, now_ms: int) -> float:
+        return max(now_ms - self.first_seen_ms, 0) / 1000
+
+
+@dataclass
+class WallEvent:
+    symbol: str
+    side: str
+    kind: str
+    price: float
+    qty: float
+    previous_qty: float
+    timestamp_ms: int
+    lifetime_seconds: float
+    spoof: bool = False
+    from_price: Optional[float] = None
+
+    def format(self) -> str:
+        icon = "🐳" if self.side == "bid" else "🐋"
+        text = f"{icon} {self.symbol} {self.side} {self.kind} @ {self.price:g}: {self.previous_qty:g} → {self.qty:g}"
+        if self.from_price is not None:
+            text += f" (z {self.from_price:g})"
+        text += f", czas życia {self.lifetime_seconds:.0f}s"
+        if self.spoof:
+            text += " ⚠️ możliwy spoofing"
+        return text
+
+
+Key = Tuple[bool, float]
+# Najlepszy bid i ask książki.
+Best = Tuple[Optional[float], Optional[float]]
+
+
+class WallTracker(BookListener):
+    """Indeks ścian (poziomów > `threshold`) per symbol i zdarzenia z ich życia.
+
+    Działa na dwa sposoby:
+    - jako `BookListener` książek z `OrderBookRegistry` (strumień diff
+      depth) – przetwarza tylko zmienione poziomy każdego zdarzenia, a pełną
+      książkę przegląda wyłącznie po nowym snapshocie,
+    - przez `observe_snapshot()` dla okresowo pobieranych snapshotów REST,
+      porównując duże poziomy z poprzednim stanem.
+
+    Zdarzenia: `appeared`, `resized` (zmiana o >= `resize_pct` od ostatnio
+    zgłoszonej wielkości), `moved` (ściana podobnej wielkości po tej samej
+    stronie w ciągu `move_seconds` od zniknięcia poprzedniej), `filled`
+    i `pulled`. Gdy tracker dostaje transakcje (`on_trade`, np. strumień
+    `aggTrade` z `MarketStream(subscribe_trades=True)`), zniknięcie ściany
+    jest wypełnieniem tylko wtedy, gdy w ciągu `fill_window_seconds`
+    przed nim po jej stronie przehandlowano po jej cenie (lub gorszej)
+    co najmniej `fill_ratio` jej wielkości. Bez transakcji decyduje
+    książka: wypełnienie to przejście ceny przez ścianę – przed zmianą
+    najlepsza cena była przed ścianą, a po zmianie sięga jej lub dalej.
+    Ściana na najlepszej cenie, która znika bez transakcji, jest więc
+    wycofaniem. Wycofanie ściany żyjącej krócej niż `spoof_seconds` jest
+    oznaczane jako możliwy spoofing.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 500,
+        thresholds: Optional[Dict[str, float]] = None,
+        resize_pct: float = RESIZE_PCT,
+        spoof_seconds: float = SPOOF_SECONDS,
+        move_seconds: float = MOVE_SECONDS,
+        move_tolerance_pct: float = MOVE_TOLERANCE_PCT,
+        fill_window_seconds: float = FILL_WINDOW_SECONDS,
+        fill_ratio: float = FILL_RATIO,
+        on_event: Optional[Callable[[WallEvent], None]] = None,
+        history: int = EVENT_HISTORY,
+    ):
+        self.threshold = float(threshold)
+        self.thresholds = {symbol.upper(): float(value) for symbol, value in (thresholds or {}).items()}
+        self.resize_ratio = resize_pct / 100
+        self.spoof_ms = spoof_seconds * 1000
+        self.move_ms = move_seconds * 1000
+        self.move_tolerance = move_tolerance_pct / 100
+        self.fill_window_ms = fill_window_seconds * 1000
+        self.fill_ratio = fill_ratio
+        self.on_event = on_event
+        self.events: Deque[WallEvent] = deque(maxlen=history)
+        self.counts: Dict[str, int] = {}
+        self._walls: Dict[str, Dict[Key, Wall]] = {}
+        self._recent_pulls: Dict[str, Deque[Tuple[int, Wall]]] = {}
+        # (czas, cena, ilość, czy sprzedający był agresorem) – tylko dla symboli ze strumieniem transakcji.
+        self._trades: Dict[str, Deque[Tuple[int, float, float, bool]]] = {}
+        self._best: Dict[str, Best] = {}
+        self._collected: Optional[List[WallEvent]] = None
+        self._lock = Lock()
+
+    def threshold_for(self, symbol: str) -> float:
+        return self.thresholds.get(symbol.upper(), self.threshold)
+
+    def set_threshold(self, symbol: str, threshold: float) -> None:
+        self.thresholds[symbol.upper()] = float(threshold)
+
+    def walls(self, symbol: str) -> Tuple[List[Wall], List[Wall]]:
+        """Aktywne ściany (bidy, aski), od najlepszej ceny."""
+        with self._lock:
+            walls = [replace(wall) for wall in self._walls.get(symbol.upper(), {}).values()]
+        bids = sorted((wall for wall in walls if wall.is_bid), key=lambda wall: -wall.price)
+        asks = sorted((wall for wall in walls if not wall.is_bid), key=lambda wall: wall.price)
+        return bids, asks
+
+    def on_trade(self, symbol: str, price: float, qty: float, is_buyer_maker: bool, timestamp_ms: int) -> None:
+        """Transakcja rynkowa; `is_buyer_maker` oznacza sprzedaż uderzającą w bidy."""
+        with self._lock:
+            trades = self._trades.get(symbol)
+            if trades is None:
+                trades = self._trades[symbol] = deque(maxlen=TRADE_HISTORY)
+            trades.append((int(timestamp_ms), float(price), float(qty), bool(is_buyer_maker)))
+
+    @staticmethod
+    def _book_best(book: OrderBook) -> Best:
+        best_bid, best_ask = book.best_bid(), book.best_ask()
+        return best_bid[0] if best_bid else None, best_ask[0] if best_ask else None
+
+    def on_book_changes(self, book: OrderBook, changes: List[LevelChange], timestamp_ms: int) -> None:
+        threshold = self.threshold_for(book.symbol)
+        relevant = [change for change in changes if change[2] > threshold or change[3] > threshold]
+        after = self._book_best(book)
+        with self._lock:
+            before = self._best.get(book.symbol)
+            self._best[book.symbol] = after
+            for is_bid, price, _old, qty in relevant:
+                self._apply(book.symbol, is_bid, price, qty, threshold, timestamp_ms, before, after)
+
+    def on_book_snapshot(self, book: OrderBook, timestamp_ms: int) -> None:
+        threshold = self.threshold_for(book.symbol)
+        large = {(True, price): qty for price, qty in book.bids.levels.items() if qty > threshold}
+        large.update({(False, price): qty for price, qty in book.asks.levels.items() if qty > threshold})
+        after = self._book_best(book)
+        with self._lock:
+            before = self._best.get(book.symbol)
+            self._best[book.symbol] = after
+            self._reconcile(book.symbol, large, threshold, timestamp_ms, before, after)
+
+    def observe_snapshot(self, symbol: str, snapshot: Dict, timestamp_ms: Optional[int] = None) -> List[WallEvent]:
+        """Porównuje snapshot `/api/v3/depth` z indeksem i zwraca nowe zdarzenia."""
+        symbol = symbol.upper()
+        threshold = self.threshold_for(symbol)
+        timestamp_ms = int(timestamp_ms if timestamp_ms is not None else time.time() * 1000)
+        large: Dict[Key, float] = {}
+        best: Dict[bool, Optional[float]] = {}
+        for is_bid, levels in ((True, snapshot.get("bids", [])), (False, snapshot.get("asks", []))):
+            values = np.array(levels, dtype=float).reshape(-1, 2)
+            best[is_bid] = float(values[0, 0]) if len(values) else None
+            selected = values[values[:, 1] > threshold]
+            large.update(((is_bid, price), qty) for price, qty in selected.tolist())
+        with self._lock:
+            self._collected = []
+            before = self._best.get(symbol)
+            after = self._best[symbol] = (best[True], best[False])
+            try:
+                self._reconcile(symbol, large, threshold, timestamp_ms, before, after)
+                return self._collected
+            finally:
+                self._collected = None
+
+    def _reconcile(
+        self,
+        symbol: str,
+        large: Dict[Key, float],
+        threshold: float,
+        timestamp_ms: int,
+        before: Optional[Best],
+        after: Best,
+    ) -> None:
+        current = self._walls.get(symbol, {})
+        for key in [key for key in current if key not in large]:
+            self._apply(symbol, key[0], key[1], 0.0, threshold, timestamp_ms, before, after)
+        for (is_bid, price), qty in large.items():
+            self._apply(symbol, is_bid, price, qty, threshold, timestamp_ms, before, after)
+
+    def _apply(
+        self,
+        symbol: str,
+        is_bid: bool,
+        price: float,
+        qty: float,
+        threshold: float,
+        timestamp_ms: int,
+        before: Optional[Best],
+        after: Best,
+    ) -> None:
+        walls = self._walls.setdefault(symbol, {})
+        key = (is_bid, price)
+        wall = walls.get(key)
+        if qty > threshold:
+            if wall is None:
+                self._appear(symbol, is_bid, price, qty, timestamp_ms)
+            elif qty != wall.qty:
+                wall.qty = qty
+                wall.peak_qty = max(wall.peak_qty, qty)
+                wall.last_change_ms = timestamp_ms
+                if abs(qty - wall.reported_qty) >= self.resize_ratio * wall.reported_qty:
+                    previous = wall.reported_qty
+                    wall.reported_qty = qty
+                    self._emit(wall, WALL_RESIZED, previous, timestamp_ms)
+            return
+        if wall is None:
+            return
+
+        del walls[key]
+        kind = WALL_FILLED if self._filled(wall, timestamp_ms, before, after) else WALL_PULLED
+        spoof = kind == WALL_PULLED and timestamp_ms - wall.first_seen_ms < self.spoof_ms
+        previous = wall.qty
+        wall.qty = qty
+        self._emit(wall, kind, previous, timestamp_ms, spoof=spoof)
+        if kind == WALL_PULLED:
+            wall.qty = previous
+            pulls = self._recent_pulls.setdefault(symbol, deque(maxlen=32))
+            pulls.append((timestamp_ms, wall))
+
+    def _filled(self, wall: Wall, timestamp_ms: int, before: Optional[Best], after: Best) -> bool:
+        trades = self._trades.get(wall.symbol)
+        if trades is not None:
+            since = timestamp_ms - self.fill_window_ms
+            traded = 0.0
+            for traded_at, price, qty, is_buyer_maker in reversed(trades):
+                if traded_at < since:
+                    break
+                if wall.is_bid and is_buyer_maker and price <= wall.price:
+                    traded += qty
+                elif not wall.is_bid and not is_buyer_maker and price >= wall.price:
+                    traded += qty
+            return traded >= self.fill_ratio * wall.qty
+        side = 0 if wall.is_bid else 1
+        previous = before[side] if before is not None else None
+        current = after[side]
+        # Najlepsza cena przed zmianą przed ścianą, po zmianie – na niej albo za nią.
+        if wall.is_bid:
+            return previous is not None and previous > wall.price and (current is None or current <= wall.price)
+        return previous is not None and previous < wall.price and (current is None or current >= wall.price)
+
+    def _appear(self, symbol: str, is_bid: bool, price: float, qty: float, timestamp_ms: int) -> None:
+        moved_from = None
+        first_seen = timestamp_ms
+        pulls = self._recent_pulls.get(symbol)
+        if pulls:
+            for index in range(len(pulls) - 1, -1, -1):
+                pulled_at, pulled = pulls[index]
+                if timestamp_ms - pulled_at > self.move_ms:
+                    break
+                if pulled.is_bid == is_bid and abs(qty - pulled.qty) <= self.move_tolerance * pulled.qty:
+                    moved_from = pulled
+                    first_seen = pulled.first_seen_ms
+                    del pulls[index]
+                    break
+        wall = Wall(
+            symbol=symbol,
+            is_bid=is_bid,
+            price=price,
+            qty=qty,
+            first_seen_ms=first_seen,
+            last_change_ms=timestamp_ms,
+            peak_qty=qty,
+            reported_qty=qty,
+        )
+        self._walls[symbol][(is_bid, price)] = wall
+        if moved_from is not None:
+            self._emit(wall, WALL_MOVED, moved_from.qty, timestamp_ms, from_price=moved_from.price)
+        else:
+            self._emit(wall, WALL_APPEARED, 0.0, timestamp_ms)
+
+    def _emit(
+        self,
+        wall: Wall,
+        kind: str,
+        previous_qty: float,
+        timestamp_ms: int,
+        spoof: bool = False,
+        from_price: Optional[float] = None,
+    ) -> None:
+        event = WallEvent(
+            symbol=wall.symbol,
+            side=wall.side,
+            kind=kind,
+            price=wall.price,
+            qty=wall.qty,
+            previous_qty=previous_qty,
+            timestamp_ms=timestamp_ms,
+            lifetime_seconds=wall.lifetime_seconds(timestamp_ms),
+            spoof=spoof,
+            from_price=from_price,
+        )
+        self.events.append(event)
+        if self._collected is not None:
+            self._collected.append(event)
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if self.on_event is not None:
+            self.on_event(event)
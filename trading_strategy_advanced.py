@@ -1,7 +1,7 @@
-import os
-import pandas as pd
 import ta
 
+from trading.market_store import load_market_frame
+
 LOG_FILE = "strategy_log.txt"
 
 def log_decision(symbol, decision):
@@ -11,16 +11,14 @@ def log_decision(symbol, decision):
 
 def get_advanced_trading_signal(symbol="BTCUSDT"):
     """Zaawansowana analiza rynku i generowanie sygnału kupna/sprzedaży"""
-    file_name = f"market_data_{symbol}.csv"
+    df = load_market_frame(symbol, columns=["high", "low", "close"])
 
-    if not os.path.exists(file_name):
+    if df is None:
         print(f"🚨 Brak danych rynkowych dla {symbol}!")
         return "BRAK DANYCH"
 
-    df = pd.read_csv(file_name)
-
     if df.empty or "close" not in df:
-        print(f"🚨 Plik {file_name} jest pusty lub uszkodzony!")
+        print(f"🚨 Dane rynkowe dla {symbol} są puste lub uszkodzone!")
         return "BŁĄD DANYCH"
 
     # Obliczenie wskaźników technicznych
@@ -47,8 +45,9 @@ def get_advanced_trading_signal(symbol="BTCUSDT"):
     log_decision(symbol, decision)
     return decision
 
-# Test dla różnych par walutowych
-symbols = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
-for symbol in symbols:
-    decision = get_advanced_trading_signal(symbol)
-    print(f"📊 Zaawansowana strategia dla {symbol}: {decision}")
+if __name__ == "__main__":
+    # Test dla różnych par walutowych
+    symbols = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
+    for symbol in symbols:
+        decision = get_advanced_trading_signal(symbol)
+        print(f"📊 Zaawansowana strategia dla {symbol}: {decision}")
@@ -1,7 +1,8 @@
 from flask import Flask, render_template, request, jsonify
 import json
 import os
-import requests
+
+from trading.http_client import http_client
 
 app = Flask(__name__)
 
@@ -27,9 +28,23 @@ def update_settings():
 
 @app.route("/market_analysis", methods=["GET"])
 def market_analysis():
-    response = requests.get("https://api.binance.com/api/v3/ticker/price")
+    response = http_client.get("https://api.binance.com/api/v3/ticker/price")
     market_data = response.json()
     return jsonify(market_data)
 
+@app.route("/latency", methods=["GET"])
+def latency():
+    stats = http_client.latency_stats()
+    return jsonify({
+        endpoint: {
+            "count": item.count,
+            "errors": item.errors,
+            "mean_ms": round(item.mean_ms, 2),
+            "max_ms": round(item.max_ms, 2),
+            "last_ms": round(item.last_ms, 2),
+        }
+        for endpoint, item in stats.items()
+    })
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
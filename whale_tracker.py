@@ -1,5 +1,11 @@
-import requests
 import json
+import os
+import time
+
+from trading.http_client import http_client
+from trading.market_stream import MarketStream
+from trading.order_book import OrderBookRegistry
+from trading.wall_tracker import WallTracker
 
 CONFIG_FILE = "config.json"
 
@@ -12,15 +18,23 @@ with open(CONFIG_FILE) as config_file:
 
 BINANCE_API_URL = "https://api.binance.com/api/v3/depth"
 
+# Indeks ścian między wywołaniami – pozwala odróżnić nowe ściany od wycofanych.
+wall_tracker = WallTracker()
+
 def track_whale_activity(symbol="BTCUSDT", threshold=500):
     """Śledzenie wielkich transakcji (Whale Tracking)"""
     
     params = {"symbol": symbol, "limit": 500}
-    response = requests.get(BINANCE_API_URL, params=params)
+    response = http_client.get(BINANCE_API_URL, params=params)
     order_book = response.json()
 
-    large_bids = [float(order[1]) for order in order_book["bids"] if float(order[1]) > threshold]
-    large_asks = [float(order[1]) for order in order_book["asks"] if float(order[1]) > threshold]
+    wall_tracker.set_threshold(symbol, threshold)
+    for event in wall_tracker.observe_snapshot(symbol, order_book):
+        print(event.format())
+
+    bid_walls, ask_walls = wall_tracker.walls(symbol)
+    large_bids = [wall.qty for wall in bid_walls]
+    large_asks = [wall.qty for wall in ask_walls]
 
     if large_bids:
         print(f"🐳 Wykryto duże ZAKUPY dla {symbol}: {large_bids}")
@@ -29,5 +43,22 @@ def track_whale_activity(symbol="BTCUSDT", threshold=500):
 
     return large_bids, large_asks
 
-# Testowanie Whale Tracking na BTCUSDT
-track_whale_activity("BTCUSDT")
+def watch_walls(symbols, threshold=500, thresholds=None):
+    """Śledzenie ścian na żywo dla wielu symboli (strumień diff depth + lokalne książki)."""
+    books = OrderBookRegistry()
+    tracker = WallTracker(threshold=threshold, thresholds=thresholds, on_event=lambda event: print(event.format()))
+    books.add_listener(tracker)
+    # Transakcje odróżniają wypełnienie ściany przy najlepszej cenie od jej wycofania.
+    stream = MarketStream(symbols, "1m", books=books, subscribe_klines=False, subscribe_trades=True).start()
+    try:
+        while True:
+            time.sleep(60)
+            active = {symbol: sum(len(side) for side in tracker.walls(symbol)) for symbol in stream.symbols}
+            print(f"[walls] aktywne={sum(active.values())} zdarzenia={tracker.counts}")
+    except KeyboardInterrupt:
+        stream.stop()
+    return tracker
+
+if __name__ == "__main__":
+    # Testowanie Whale Tracking na BTCUSDT
+    track_whale_activity("BTCUSDT")